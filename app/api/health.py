@@ -0,0 +1,67 @@
+"""Liveness and readiness endpoints of the API process"""
+
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from ..core.config import settings
+from ..core.database import engine
+from ..core.db_storage import storage
+from ..core.snapshots import PeriodicSnapshot
+
+router = APIRouter()
+
+_started = time.monotonic()
+
+# Probes and /metrics read these; only the background refresh queries the DB
+live_counters = PeriodicSnapshot("live_counters", storage.get_live_counts, settings.live_counters_refresh_seconds)
+
+# The DB check in flight; probes wait on it rather than start another worker thread
+_db_check: Optional[asyncio.Future] = None
+
+def _check_db() -> None:
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+@router.get("/health")
+async def health_check():
+    """Liveness: the process serves requests; counters come from the last background refresh"""
+    return {
+        "status": "healthy",
+        **(live_counters.get() or {}),
+        "counters": live_counters.info(),
+        "uptime_seconds": round(time.monotonic() - _started, 1),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds")
+    }
+
+@router.get("/ready")
+async def readiness_check():
+    """Readiness: a pooled DB connection answers within READY_TIMEOUT_SECONDS
+
+    A check that hangs in engine.connect() keeps its thread; later probes
+    wait on that same check, so a stuck database ties up one worker thread.
+    """
+    global _db_check
+    if _db_check is None or _db_check.done():
+        _db_check = asyncio.ensure_future(asyncio.to_thread(_check_db))
+    started = time.perf_counter()
+    try:
+        # shield: a timed out probe leaves the check running for the next one
+        await asyncio.wait_for(asyncio.shield(_db_check), timeout=settings.ready_timeout_seconds)
+    except asyncio.TimeoutError:
+        return JSONResponse(
+            status_code=503,
+            content={"status": "unavailable", "database": f"no answer within {settings.ready_timeout_seconds} s"}
+        )
+    except Exception as e:
+        return JSONResponse(status_code=503, content={"status": "unavailable", "database": str(e)})
+    return {
+        "status": "ready",
+        "database": "ok",
+        "db_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
@@ -1,18 +1,28 @@
 """FastAPI application main module"""
 
-from fastapi import FastAPI, HTTPException, Request
+import asyncio
+import time
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 import logging
 import uvicorn
 
+from . import health, metrics
 from .routers import admin, public
 from .deps import AdminAuth
 from ..core.config import settings
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
-from aiogram.types import Update
+from ..core.invalidation import bus
+from ..core.log import setup_logging
+from ..core.querycount import QueryStats, track_queries
+from ..core.tracing import (
+    PARENT_HEADER, SIGNATURE_HEADER, TRACE_HEADER, remote_parent, set_process_name, start_trace
+)
+
+# Log records are written by a background thread
+setup_logging()
+set_process_name("api")
 
 # Create FastAPI app
 app = FastAPI(
@@ -30,42 +40,123 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Simple access log middleware
+# Compress large responses (question listings) for clients sending Accept-Encoding: gzip
+if settings.api_gzip_min_bytes > 0:
+    app.add_middleware(GZipMiddleware, minimum_size=settings.api_gzip_min_bytes)
+
+# Access log middleware
 logger = logging.getLogger("api.access")
 
-class AccessLogMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request, call_next):
-        method = request.method
-        path = request.url.path
-        response = await call_next(request)
+class AccessLogMiddleware:
+    """Raw ASGI middleware: timing, query counts, metrics and one log line per request"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+        request_headers = Headers(scope=scope)
+        # Bound before the try, so a failing start_trace or track_queries is reported as itself
+        span = None
+        queries = QueryStats()
+
+        async def send_with_headers(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers.append("X-DB-Queries", str(queries.count))
+                headers.append("X-DB-Time-Ms", str(queries.duration_ms))
+                if span is not None:
+                    headers.append(TRACE_HEADER, span.trace_id)
+            await send(message)
+
+        # Continues the bot's trace; other clients' trace headers are ignored
+        trace_id, parent_id = remote_parent(
+            request_headers.get(TRACE_HEADER),
+            request_headers.get(PARENT_HEADER),
+            request_headers.get(SIGNATURE_HEADER)
+        )
+
+        metrics.http_in_flight.inc()
         try:
-            logger.info(f"{method} {path} -> {response.status_code}")
-        except Exception:
-            pass
-        return response
+            with start_trace(
+                f"{scope['method']} {scope['path']}",
+                trace_id=trace_id,
+                parent_id=parent_id
+            ) as span, track_queries() as queries:
+                await self.app(scope, receive, send_with_headers)
+                if span is not None:
+                    span.name = f"{scope['method']} {getattr(scope.get('route'), 'path', scope['path'])}"
+                    span.attrs["status"] = status_code
+        finally:
+            metrics.http_in_flight.dec()
+            duration = time.perf_counter() - started
+            method = scope["method"]
+            # Route template keeps label cardinality bounded
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.http_request_seconds.observe(duration, method=method, route=route)
+            metrics.http_requests_total.inc(method=method, route=route, status=str(status_code))
+
+            duration_ms = round(duration * 1000, 2)
+            line = f"{method} {scope['path']} -> {status_code} {duration_ms} ms ({queries.count} queries, {queries.duration_ms} ms db)"
+            fields = {
+                "method": method,
+                "path": scope["path"],
+                "route": route,
+                "status": status_code,
+                "duration_ms": duration_ms,
+                "db_queries": queries.count,
+                "db_ms": queries.duration_ms,
+                "trace_id": span.trace_id if span is not None else None
+            }
+            if queries.count > settings.db_query_warn_threshold:
+                logger.warning(f"{line}: too many queries", extra={"fields": fields})
+            else:
+                logger.info(line, extra={"fields": fields})
 
 app.add_middleware(AccessLogMiddleware)
 
 # Include routers
 app.include_router(admin.router, prefix="/admin", tags=["admin"], dependencies=[AdminAuth])
 app.include_router(public.router, prefix="/public", tags=["public"])
+app.include_router(metrics.router)
+app.include_router(health.router)
+
+async def start_invalidation_listener():
+    """Evict local caches on writes made by other processes"""
+    bus.start(asyncio.get_running_loop())
+
+async def stop_invalidation_listener():
+    bus.stop()
+
+async def start_live_counters():
+    """Refresh health counters in the background"""
+    health.live_counters.start()
+
+async def stop_live_counters():
+    await health.live_counters.stop()
+
+async def stop_admin_stats():
+    await admin.stats_snapshot.stop()
+
+app.add_event_handler("startup", start_invalidation_listener)
+app.add_event_handler("shutdown", stop_invalidation_listener)
+app.add_event_handler("startup", start_live_counters)
+app.add_event_handler("shutdown", stop_live_counters)
+app.add_event_handler("shutdown", stop_admin_stats)
 
 # Optional: webhook for Telegram bot (prod)
 if settings.webhook_enabled:
-    bot = Bot(token=settings.bot_token, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
-    dp = Dispatcher()
-    from ..bot.handlers import register_handlers
-    register_handlers(dp)
-
-    @app.post(f"{settings.webhook_path_prefix}")
-    async def telegram_webhook(request: Request):
-        try:
-            data = await request.json()
-            update = Update.model_validate(data)
-            await dp.feed_update(bot, update)
-            return {"ok": True}
-        except Exception as e:
-            return {"ok": False, "error": str(e)}
+    from . import webhook
+    app.include_router(webhook.router)
+    app.add_event_handler("startup", webhook.startup)
+    app.add_event_handler("shutdown", webhook.shutdown)
 
 @app.get("/")
 async def root():
@@ -77,27 +168,6 @@ async def root():
         "status": "healthy"
     }
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint for deployment monitoring"""
-    try:
-        from ..core.storage import storage
-        
-        return {
-            "status": "healthy",
-            "questions_count": len(storage.get_all_questions()),
-            "users_count": len(storage.users),
-            "active_sessions": len([s for s in storage.quiz_sessions.values() if s.finished_at is None]),
-            "timestamp": "2025-08-24T19:11:32Z"
-        }
-    except Exception as e:
-        # Return healthy status even if storage isn't fully initialized
-        return {
-            "status": "healthy", 
-            "message": "API is running",
-            "timestamp": "2025-08-24T19:11:32Z"
-        }
-
 if __name__ == "__main__":
     from ..core.config import settings
     uvicorn.run(
@@ -0,0 +1,67 @@
+"""Prometheus metrics of the API process"""
+
+from typing import Dict
+
+from fastapi import APIRouter
+from fastapi.responses import Response
+
+from ..core.config import settings
+from ..core.database import engine
+from ..core.db_storage import storage
+from ..core.metrics import CONTENT_TYPE, LabelValues, registry
+from .health import live_counters
+
+router = APIRouter()
+
+# Request metrics, updated by the access log middleware
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "API request latency by route", ("method", "route")
+)
+http_requests_total = registry.counter(
+    "http_requests_total", "API requests by route and status", ("method", "route", "status")
+)
+http_in_flight = registry.gauge("http_requests_in_flight", "API requests being handled")
+
+def _pool_usage() -> Dict[LabelValues, float]:
+    pool = engine.pool
+    return {
+        ("size",): pool.size(),
+        ("checked_out",): pool.checkedout(),
+        ("overflow",): pool.overflow()
+    }
+
+def _cache_lookups(field: str) -> Dict[LabelValues, float]:
+    return {(name,): stats[field] for name, stats in _cache_stats().items()}
+
+def _cache_hit_ratio() -> Dict[LabelValues, float]:
+    return {
+        (name,): stats["hits"] / (stats["hits"] + stats["misses"])
+        for name, stats in _cache_stats().items()
+        if stats["hits"] + stats["misses"]
+    }
+
+def _cache_stats() -> Dict[str, Dict[str, int]]:
+    stats = {f"storage_{name}": value for name, value in storage.cache_stats().items()}
+    # Bot caches live in this process in webhook mode
+    if settings.webhook_enabled:
+        from ..bot.handlers import stats_cache
+        from ..bot.render import render_cache_stats
+        stats["bot_render"] = render_cache_stats()
+        stats["bot_user_stats"] = {"hits": stats_cache.hits, "misses": stats_cache.misses}
+    return stats
+
+def _active_session_count() -> Dict[LabelValues, float]:
+    # Refreshed in the background with the health counters
+    counts = live_counters.get()
+    return {(): counts["active_sessions"]} if counts else {}
+
+registry.gauge("db_pool_connections", "SQLAlchemy pool connections", ("state",), callback=_pool_usage)
+registry.gauge("cache_hits", "Cache hits since start", ("cache",), callback=lambda: _cache_lookups("hits"))
+registry.gauge("cache_misses", "Cache misses since start", ("cache",), callback=lambda: _cache_lookups("misses"))
+registry.gauge("cache_hit_ratio", "Cache hits / lookups since start", ("cache",), callback=_cache_hit_ratio)
+registry.gauge("quiz_active_sessions", "Quiz sessions not finished yet", callback=_active_session_count)
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Metrics of this process in the Prometheus text format"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -1,12 +1,27 @@
 """Admin API routes for question management"""
 
+import asyncio
+import json
 from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi.responses import HTMLResponse, PlainTextResponse, StreamingResponse
+from typing import AsyncIterator, List, Optional
+from ...core.admin_stats import admin_stats
+from ...core.config import settings
+from ...core.profiler import ProfilerBusy, collapsed, cpu_profiler, function_totals, html_report, memory_profiler
 from ...core.models import QuestionInput, TestRequest, TestResponse, SuccessResponse, ErrorResponse
 from ...core.services import QuestionService, TestService
+from ...core.slowquery import slow_queries
+from ...core.snapshots import PeriodicSnapshot
+from ...core.tracing import traces
 
 router = APIRouter()
 
+QUESTIONS_PAGE_DEFAULT = 100
+QUESTIONS_PAGE_MAX = 1000
+QUESTIONS_STREAM_PAGE = 500
+
+stats_snapshot = PeriodicSnapshot("admin_stats", admin_stats.compute, settings.admin_stats_refresh_seconds)
+
 # Test endpoints
 @router.post("/tests", response_model=TestResponse)
 async def create_test(request: TestRequest):
@@ -24,18 +39,43 @@ async def create_test(request: TestRequest):
 async def get_all_tests():
     """Get all tests"""
     tests = TestService.get_all_tests()
+    questions_counts = TestService.get_question_counts()
     result = []
     for test in tests:
-        questions_count = len(TestService.get_questions_by_test(test.id))
         result.append(TestResponse(
             id=test.id,
             name=test.name,
             description=test.description,
-            questions_count=questions_count,
+            questions_count=questions_counts.get(test.id, 0),
             created_at=test.created_at.isoformat()
         ))
     return result
 
+@router.get("/tests/{test_id}/analytics", response_model=List[dict])
+async def get_test_analytics(test_id: str):
+    """Get per-question correct rate, option choices and median time to answer, hardest first"""
+    if not TestService.get_test(test_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    return await asyncio.to_thread(TestService.get_question_analytics, test_id)
+
+@router.post("/analytics/rebuild", response_model=dict)
+async def rebuild_analytics():
+    """Recompute question analytics from all recorded answers"""
+    return await asyncio.to_thread(TestService.rebuild_question_analytics)
+
+@router.post("/leaderboards/rebuild", response_model=dict)
+async def rebuild_leaderboards():
+    """Recompute per-test leaderboards from all finished sessions"""
+    return await asyncio.to_thread(TestService.rebuild_leaderboards)
+
+@router.post("/score-histograms/rebuild", response_model=dict)
+async def rebuild_score_histograms():
+    """Recompute per-test score histograms from all finished sessions"""
+    return await asyncio.to_thread(TestService.rebuild_score_histograms)
+
 @router.post("/tests/{test_id}/questions/import", response_model=SuccessResponse)
 async def import_questions_to_test(
     test_id: str,
@@ -93,31 +133,77 @@ async def import_questions(
         message=result["message"]
     )
 
-@router.get("/questions", response_model=List[dict])
-async def get_all_questions():
-    """Get all questions"""
-    questions = QuestionService.get_all_questions()
-    
-    result = []
-    for question in questions:
-        question_data = {
-            "id": question.id,
-            "title": question.title,
-            "text": question.text,
-            "options": []
-        }
-        
+def _question_data(question, include_options: bool = True, include_comments: bool = True) -> dict:
+    question_data = {
+        "id": question.id,
+        "title": question.title,
+        "text": question.text
+    }
+    if include_options:
+        question_data["options"] = []
         for option in question.options:
-            question_data["options"].append({
+            option_data = {
                 "id": option.id,
                 "text": option.text,
-                "is_correct": option.is_correct,
-                "comment": option.comment
-            })
-        
-        result.append(question_data)
+                "is_correct": option.is_correct
+            }
+            if include_comments:
+                option_data["comment"] = option.comment
+            question_data["options"].append(option_data)
+    return question_data
+
+async def _stream_all_questions(test_id: Optional[str], include_options: bool,
+                                include_comments: bool) -> AsyncIterator[bytes]:
+    # The full listing as one JSON array, built page by page
+    after_id = None
+    separator = b"["
+    while True:
+        page = await asyncio.to_thread(
+            QuestionService.get_questions_page, after_id, QUESTIONS_STREAM_PAGE, test_id, include_options
+        )
+        for question in page:
+            question_data = _question_data(question, include_options, include_comments)
+            yield separator + json.dumps(question_data, ensure_ascii=False).encode()
+            separator = b","
+        if len(page) < QUESTIONS_STREAM_PAGE:
+            break
+        after_id = page[-1].id
+    yield b"[]" if separator == b"[" else b"]"
+
+@router.get("/questions", response_model=None)
+async def get_all_questions(
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    test_id: Optional[str] = None,
+    include_options: bool = True,
+    include_comments: bool = True
+):
+    """
+    Get questions ordered by ID
     
-    return result
+    With `limit` or `cursor`, returns one page and `next_cursor` (keyset pagination).
+    Without them, streams all questions as a JSON array.
+    """
+    if limit is None and cursor is None:
+        return StreamingResponse(
+            _stream_all_questions(test_id, include_options, include_comments),
+            media_type="application/json"
+        )
+    
+    if limit is None:
+        limit = QUESTIONS_PAGE_DEFAULT
+    if not 1 <= limit <= QUESTIONS_PAGE_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"limit must be between 1 and {QUESTIONS_PAGE_MAX}"
+        )
+    
+    page = await asyncio.to_thread(QuestionService.get_questions_page, cursor, limit, test_id, include_options)
+    
+    return {
+        "items": [_question_data(question, include_options, include_comments) for question in page],
+        "next_cursor": page[-1].id if len(page) == limit else None
+    }
 
 @router.delete("/questions/clear", response_model=SuccessResponse)
 async def clear_questions():
@@ -132,17 +218,136 @@ async def clear_questions():
 
 @router.get("/stats", response_model=dict)
 async def get_admin_stats():
-    """Get statistics"""
-    from ...core.storage import storage
+    """Get statistics from the last aggregate snapshot"""
+    if stats_snapshot.get() is None:
+        await stats_snapshot.refresh()
+    # Refreshed in the background only once someone looks at the dashboard
+    stats_snapshot.start()
+    if stats_snapshot.get() is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Stats are not available: {stats_snapshot.error}"
+        )
     
-    finished_sessions = [s for s in storage.quiz_sessions.values() if s.finished_at is not None]
-    active_sessions = [s for s in storage.quiz_sessions.values() if s.finished_at is None]
+    return {**stats_snapshot.get(), "snapshot": stats_snapshot.info()}
+
+@router.get("/slow-queries", response_model=List[dict])
+async def get_slow_queries(limit: int = 20):
+    """Get slowest statements of this process by total time"""
+    return slow_queries.top(limit)
+
+@router.delete("/slow-queries", response_model=SuccessResponse)
+async def reset_slow_queries():
+    """Reset the slow query log"""
+    slow_queries.reset()
     
-    return {
-        "questions_count": len(storage.questions),
-        "users_count": len(storage.users),
-        "total_sessions": len(storage.quiz_sessions),
-        "finished_sessions": len(finished_sessions),
-        "active_sessions": len(active_sessions),
-        "total_answers": len(storage.user_answers)
-    }
+    return SuccessResponse(
+        success=True,
+        message="Slow query log cleared"
+    )
+
+@router.get("/traces", response_model=List[dict])
+async def get_recent_traces(limit: int = 50, min_duration_ms: float = 0.0):
+    """Get latest traces recorded by this process"""
+    if traces is None:
+        return []
+    return traces.recent(limit, min_duration_ms)
+
+@router.get("/traces/{trace_id}", response_model=List[dict])
+async def get_trace(trace_id: str):
+    """Get all spans of a trace (this process and the shared trace file)"""
+    spans = await asyncio.to_thread(traces.find, trace_id) if traces is not None else []
+    if not spans:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trace not found"
+        )
+    return spans
+
+@router.get("/profile/cpu")
+async def profile_cpu(seconds: float = 10.0, interval_ms: float = 5.0, format: str = "collapsed", include_idle: bool = False):
+    """Sample stacks of this process for N seconds (collapsed, html or json)"""
+    if not 0 < seconds <= 120 or not 1 <= interval_ms <= 1000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="seconds must be in (0, 120], interval_ms in [1, 1000]"
+        )
+    if format not in ("collapsed", "html", "json"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="format must be collapsed, html or json"
+        )
+    
+    try:
+        # The sampler runs in a thread so the event loop keeps serving the traffic being profiled
+        profile = await asyncio.to_thread(cpu_profiler.run, seconds, interval_ms / 1000, include_idle)
+    except ProfilerBusy as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+    
+    if format == "html":
+        return HTMLResponse(html_report(profile))
+    if format == "json":
+        return {
+            "seconds": profile["seconds"],
+            "samples": profile["samples"],
+            "functions": [
+                {"function": label, "self": own, "total": total}
+                for label, own, total in function_totals(profile)[:200]
+            ]
+        }
+    return PlainTextResponse(collapsed(profile))
+
+@router.post("/profile/memory/start", response_model=dict)
+async def start_memory_profile(frames: int = 25):
+    """Start tracemalloc with the given traceback depth"""
+    memory_profiler.start(frames)
+    return memory_profiler.status()
+
+@router.post("/profile/memory/stop", response_model=dict)
+async def stop_memory_profile():
+    """Stop tracemalloc and drop its snapshots"""
+    memory_profiler.stop()
+    return memory_profiler.status()
+
+@router.get("/profile/memory", response_model=dict)
+async def get_memory_profile_status():
+    """Get tracemalloc state and traced memory"""
+    return memory_profiler.status()
+
+@router.post("/profile/memory/snapshot", response_model=dict)
+async def take_memory_snapshot():
+    """Take a tracemalloc snapshot; the previous one becomes the diff baseline"""
+    try:
+        return await asyncio.to_thread(memory_profiler.snapshot)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
+
+@router.get("/profile/memory/top", response_model=List[dict])
+async def get_memory_top(limit: int = 30, group_by: str = "lineno"):
+    """Get largest allocation sites of the latest snapshot"""
+    return await _memory_report(memory_profiler.top, group_by, limit)
+
+@router.get("/profile/memory/diff", response_model=List[dict])
+async def get_memory_diff(limit: int = 30, group_by: str = "lineno"):
+    """Get allocation growth between the last two snapshots"""
+    return await _memory_report(memory_profiler.diff, group_by, limit)
+
+async def _memory_report(report, group_by: str, limit: int) -> List[dict]:
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="group_by must be lineno, filename or traceback"
+        )
+    try:
+        return await asyncio.to_thread(report, group_by, limit)
+    except RuntimeError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
@@ -6,7 +6,7 @@ from typing import Optional, List
 from ...core.models import (
     SessionStartRequest, SessionStartResponse, QuestionWithOptions,
     AnswerRequest, AnswerResponse, FinishResponse, UserStats,
-    UserRegisterRequest, TestResponse
+    UserRegisterRequest, TestResponse, LeaderboardResponse
 )
 from ...core.services import UserService, QuizService, TestService
 
@@ -16,18 +16,34 @@ router = APIRouter()
 async def get_available_tests():
     """Get all available tests"""
     tests = TestService.get_all_tests()
+    questions_counts = TestService.get_question_counts()
     result = []
     for test in tests:
-        questions_count = len(TestService.get_questions_by_test(test.id))
         result.append(TestResponse(
             id=test.id,
             name=test.name,
             description=test.description,
-            questions_count=questions_count,
+            questions_count=questions_counts.get(test.id, 0),
             created_at=test.created_at.isoformat()
         ))
     return result
 
+@router.get("/tests/{test_id}/leaderboard", response_model=LeaderboardResponse)
+async def get_test_leaderboard(test_id: str, limit: int = 10, telegram_id: Optional[int] = None):
+    """Get best results of a test (best attempt per user, faster wins ties)"""
+    if not 1 <= limit <= 1000:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="limit must be between 1 and 1000"
+        )
+    if not TestService.get_test(test_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Test not found"
+        )
+    
+    return LeaderboardResponse(**TestService.get_leaderboard(test_id, limit, telegram_id))
+
 @router.get("/users/{telegram_id}/stats", response_model=UserStats)
 async def get_user_stats(telegram_id: int):
     """Get user statistics"""
@@ -115,7 +131,8 @@ async def finish_session(session_id: str):
         score_percent=result["score_percent"],
         correct_count=result["correct_count"],
         total_count=result["total_count"],
-        session_id=result["session_id"]
+        session_id=result["session_id"],
+        percentile=result["percentile"]
     )
 
 @router.get("/sessions/{session_id}")
@@ -0,0 +1,162 @@
+"""Telegram webhook with background update processing"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request, status
+from aiogram import Dispatcher
+from aiogram.types import Update
+
+from .deps import AdminAuth
+from ..core.config import settings
+from ..bot.client import create_bot
+from ..bot.dedup import deduplicator
+from ..bot.handlers import register_handlers
+from ..bot.mailbox import mailboxes
+from ..bot.outbound import outbound
+from ..bot.storage import PostgreSQLStorage
+
+logger = logging.getLogger(__name__)
+
+def _percentile(values: List[float], percent: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(len(values) * percent))]
+
+class UpdateWorkerPool:
+    """Bounded queue of updates processed by a fixed set of asyncio workers"""
+
+    def __init__(self, process: Callable[[Update], Awaitable[Any]], workers: int, queue_size: int):
+        self.process = process
+        self.workers = workers
+        self.queue_size = queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+        # Metrics
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self._latencies: Deque[Tuple[float, float]] = deque(maxlen=1000)  # (queue wait, processing)
+
+    async def start(self) -> None:
+        """Start workers"""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        logger.info(f"Webhook worker pool started: workers={self.workers} queue_size={self.queue_size}")
+
+    def submit(self, update: Update) -> bool:
+        """Queue update; False when the queue is full"""
+        try:
+            self._queue.put_nowait((time.monotonic(), update))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.accepted += 1
+        return True
+
+    async def _worker(self, number: int) -> None:
+        while True:
+            enqueued_at, update = await self._queue.get()
+            started_at = time.monotonic()
+            try:
+                await self.process(update)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Webhook worker {number} failed on update {update.update_id}: {e}")
+            finally:
+                self._latencies.append((started_at - enqueued_at, time.monotonic() - started_at))
+                self._queue.task_done()
+
+    async def stop(self, timeout: float) -> None:
+        """Drain queued updates for up to `timeout` seconds, then stop workers"""
+        if self._queue is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Webhook queue not drained on shutdown, {self._queue.qsize()} updates dropped")
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, counters and per-update latency"""
+        waits = sorted(wait for wait, _ in self._latencies)
+        totals = sorted(wait + processing for wait, processing in self._latencies)
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_size": self.queue_size,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "queue_wait_p50_ms": round(_percentile(waits, 0.5) * 1000, 1),
+            "queue_wait_p95_ms": round(_percentile(waits, 0.95) * 1000, 1),
+            "latency_p50_ms": round(_percentile(totals, 0.5) * 1000, 1),
+            "latency_p95_ms": round(_percentile(totals, 0.95) * 1000, 1),
+            "latency_p99_ms": round(_percentile(totals, 0.99) * 1000, 1),
+            "latency_max_ms": round(totals[-1] * 1000, 1) if totals else 0.0
+        }
+
+# FSM state lives in PostgreSQL so any worker process can continue a dialog
+bot = create_bot()
+fsm_storage = PostgreSQLStorage()
+dp = Dispatcher(storage=fsm_storage)
+register_handlers(dp)
+
+pool = UpdateWorkerPool(
+    lambda update: dp.feed_update(bot, update),
+    workers=settings.webhook_workers,
+    queue_size=settings.webhook_queue_size
+)
+
+router = APIRouter()
+
+@router.post(f"{settings.webhook_path_prefix}")
+async def telegram_webhook(request: Request):
+    """Validate update and queue it for background processing"""
+    try:
+        data = await request.json()
+        # Mounting the bot here spares feed_update a JSON roundtrip of the update
+        update = Update.model_validate(data, context={"bot": bot})
+    except Exception as e:
+        return {"ok": False, "error": str(e)}
+
+    if not pool.submit(update):
+        # Telegram redelivers the update later
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Update queue is full"
+        )
+
+    return {"ok": True}
+
+@router.get(f"{settings.webhook_path_prefix}/stats", dependencies=[AdminAuth])
+async def webhook_stats():
+    """Webhook queue, deduplication, mailbox and outbound scheduler metrics"""
+    return {
+        "updates": pool.stats(),
+        "dedup": deduplicator.stats(),
+        "mailboxes": mailboxes.stats(),
+        "outbound": outbound.stats()
+    }
+
+async def startup() -> None:
+    """Start update workers"""
+    await pool.start()
+
+async def shutdown() -> None:
+    """Drain queued updates and pending sends, close bot session"""
+    await pool.stop(settings.webhook_shutdown_timeout)
+    await outbound.close()
+    await bot.session.close()
+    await fsm_storage.close()
@@ -2,21 +2,19 @@
 
 import asyncio
 import logging
-import sys
-from aiogram import Bot, Dispatcher
-from aiogram.client.default import DefaultBotProperties
-from aiogram.enums import ParseMode
+from aiogram import Dispatcher
 
 from ..core.config import settings
+from ..core.invalidation import bus
+from ..core.log import setup_logging
+from .client import create_bot
+from .dedup import deduplicator
 from .handlers import register_handlers
+from .outbound import outbound
 from .storage import PostgreSQLStorage
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    stream=sys.stdout
-)
+# Configure logging (records are written by a background thread)
+setup_logging()
 
 logger = logging.getLogger(__name__)
 
@@ -28,10 +26,7 @@ async def main():
         return
     
     # Initialize bot and dispatcher with persistent storage
-    bot = Bot(
-        token=settings.bot_token,
-        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
-    )
+    bot = create_bot()
     
     # Initialize persistent storage
     storage = PostgreSQLStorage()
@@ -40,6 +35,14 @@ async def main():
     # Register handlers
     register_handlers(dp)
     
+    # Evict bot caches on writes made by API processes
+    bus.start(asyncio.get_running_loop())
+    
+    metrics_runner = None
+    if settings.bot_metrics_port:
+        from .metrics import start_metrics_server
+        metrics_runner = await start_metrics_server(settings.api_host, settings.bot_metrics_port)
+    
     logger.info("🤖 Starting Telegram bot...")
     
     try:
@@ -50,8 +53,13 @@ async def main():
         raise  # Re-raise to allow retry logic to work
     finally:
         try:
+            await outbound.close()
+            if metrics_runner is not None:
+                await metrics_runner.cleanup()
+            logger.info(f"Duplicate updates skipped: {deduplicator.skipped}")
             await bot.session.close()
             await storage.close()
+            bus.stop()
         except Exception as e:
             logger.warning(f"Error during cleanup: {e}")
             pass
@@ -0,0 +1,21 @@
+"""Bot client factory"""
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import ParseMode
+
+from ..core.config import settings
+
+def create_bot() -> Bot:
+    """Create bot, pointed at a custom Bot API server if configured"""
+    session = None
+    if settings.telegram_api_server:
+        session = AiohttpSession(api=TelegramAPIServer.from_base(settings.telegram_api_server))
+    
+    return Bot(
+        token=settings.bot_token,
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML)
+    )
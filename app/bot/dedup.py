@@ -0,0 +1,108 @@
+"""Deduplication of redelivered Telegram updates"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+from sqlalchemy.exc import IntegrityError
+
+from ..core.config import settings
+from ..core.database import SessionLocal, ProcessedUpdate
+
+logger = logging.getLogger(__name__)
+
+class UpdateDeduplicator(BaseMiddleware):
+    """Outer update middleware that drops already seen update_ids
+
+    Recent update_ids are kept in a bounded in-process LRU. With `shared`
+    enabled every new update_id is also claimed in the `processed_updates`
+    table so several workers never handle the same update twice.
+    """
+
+    def __init__(self, maxsize: int, shared: bool = False, shared_ttl_seconds: int = 86400):
+        self.maxsize = maxsize
+        self.shared = shared
+        self.shared_ttl_seconds = shared_ttl_seconds
+        self._seen: "OrderedDict[int, None]" = OrderedDict()
+        self._claims = 0
+        self.skipped = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        if await self.is_duplicate(event.update_id):
+            self.skipped += 1
+            logger.info(f"Skipping duplicate update {event.update_id}")
+            return None
+        return await handler(event, data)
+
+    async def is_duplicate(self, update_id: int) -> bool:
+        """Check and remember update_id"""
+        if update_id in self._seen:
+            self._seen.move_to_end(update_id)
+            return True
+
+        self._seen[update_id] = None
+        while len(self._seen) > self.maxsize:
+            self._seen.popitem(last=False)
+
+        if self.shared:
+            return not await asyncio.to_thread(self._claim_shared, update_id)
+        return False
+
+    def _claim_shared(self, update_id: int) -> bool:
+        """Insert update_id into the shared table; False if it is already there"""
+        db = SessionLocal()
+        try:
+            db.add(ProcessedUpdate(update_id=update_id))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            return False
+        except Exception as e:
+            # Shared table unavailable: fall back to in-process deduplication
+            db.rollback()
+            logger.error(f"Failed to claim update {update_id}: {e}")
+            return True
+        finally:
+            db.close()
+
+        self._claims += 1
+        if self._claims % 1000 == 0:
+            self._prune_shared()
+        return True
+
+    def _prune_shared(self) -> None:
+        """Delete claims older than the shared TTL"""
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.shared_ttl_seconds)
+        db = SessionLocal()
+        try:
+            db.query(ProcessedUpdate).filter(ProcessedUpdate.received_at < cutoff).delete()
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Failed to prune processed updates: {e}")
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Deduplication counters"""
+        return {
+            "tracked": len(self._seen),
+            "skipped": self.skipped,
+            "shared": self.shared
+        }
+
+# Global deduplicator installed in front of the dispatcher
+deduplicator = UpdateDeduplicator(
+    maxsize=settings.bot_dedup_cache_size,
+    shared=settings.bot_dedup_shared,
+    shared_ttl_seconds=settings.bot_dedup_shared_ttl_seconds
+)
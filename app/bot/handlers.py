@@ -1,23 +1,34 @@
 """Telegram bot handlers"""
 
+import html
 import logging
 import aiohttp
 import json
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 
 from aiogram import Router, F
 from aiogram.filters import CommandStart, Command
-from aiogram.types import Message, CallbackQuery
+from aiogram.types import Message, CallbackQuery, InlineKeyboardMarkup
 from aiogram.fsm.context import FSMContext
 
 from .keyboards import (
-    get_start_keyboard, get_quiz_keyboard, 
+    get_start_keyboard,
     get_continue_keyboard, get_main_menu_keyboard,
-    get_test_selection_keyboard, get_back_to_menu_keyboard
+    get_test_selection_keyboard, get_back_to_menu_keyboard,
+    get_leaderboard_tests_keyboard, get_leaderboard_keyboard
 )
 from .texts import TEXTS
 from .states import QuizStates
+from .dedup import deduplicator
+from .instrumentation import instrumentation
+from .mailbox import mailboxes
+from .outbound import outbound
+from .prefetch import QuestionPrefetcher
+from .render import render_question
+from ..core.cache import TTLCache
 from ..core.config import settings
+from ..core.invalidation import bus
+from ..core.tracing import start_span, trace_headers
 
 logger = logging.getLogger(__name__)
 
@@ -27,42 +38,120 @@ router = Router()
 # API base URL
 API_BASE = f"http://127.0.0.1:{settings.api_port}"
 
+# Next questions prefetched while users read answer feedback
+prefetcher = QuestionPrefetcher(
+    maxsize=settings.bot_prefetch_cache_size,
+    ttl=settings.bot_prefetch_ttl_seconds
+)
+
+# Short-lived user stats to keep menu navigation off the stats endpoint
+stats_cache = TTLCache(
+    maxsize=settings.bot_stats_cache_size,
+    ttl=settings.bot_stats_cache_ttl_seconds
+)
+
+def _invalidate_user_stats(key: Optional[str], version: Optional[str]) -> None:
+    """Drop cached stats changed by another process"""
+    telegram_id = int(key)
+    user_stats = stats_cache.peek(telegram_id)
+    # Finish already applied in place by this process
+    if user_stats and version is not None and user_stats.get("finished_session_id") == version:
+        return
+    stats_cache.pop(telegram_id)
+
+def _invalidate_quiz_session(key: Optional[str], version: Optional[str]) -> None:
+    """Drop prefetched question outdated by an answer recorded elsewhere"""
+    if version is not None:
+        prefetcher.invalidate_session(key, int(version))
+
+bus.subscribe("user_stats", _invalidate_user_stats)
+bus.subscribe("quiz_session", _invalidate_quiz_session)
+bus.on_reconnect(stats_cache.clear)
+
 async def api_request(method: str, url: str, data: Optional[Dict] = None) -> Optional[Dict[str, Any]]:
     """Make API request"""
-    try:
-        async with aiohttp.ClientSession() as session:
-            if method == "GET":
-                full_url = f"{API_BASE}{url}"
-                async with session.get(full_url) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    elif response.status == 404:
-                        return None
-                    else:
-                        body = await response.text()
-                        logger.error(f"API GET {full_url} failed: {response.status} body={body[:200]}")
-                        return None
-            elif method == "POST":
-                headers = {"Content-Type": "application/json"}
-                full_url = f"{API_BASE}{url}"
-                async with session.post(
-                    full_url, 
-                    json=data, 
-                    headers=headers
-                ) as response:
-                    if response.status in [200, 201]:
-                        return await response.json()
-                    else:
-                        body = await response.text()
-                        logger.error(f"API POST {full_url} failed: {response.status} body={body[:200]} data={data}")
-                        return None
-    except Exception as e:
-        logger.error(f"API request error: {e}")
+    with start_span(f"api {method} {url}"):
+        try:
+            async with aiohttp.ClientSession() as session:
+                if method == "GET":
+                    full_url = f"{API_BASE}{url}"
+                    async with session.get(full_url, headers=trace_headers()) as response:
+                        if response.status == 200:
+                            return await response.json()
+                        elif response.status == 404:
+                            return None
+                        else:
+                            body = await response.text()
+                            logger.error(f"API GET {full_url} failed: {response.status} body={body[:200]}")
+                            return None
+                elif method == "POST":
+                    headers = {"Content-Type": "application/json", **trace_headers()}
+                    full_url = f"{API_BASE}{url}"
+                    async with session.post(
+                        full_url, 
+                        json=data, 
+                        headers=headers
+                    ) as response:
+                        if response.status in [200, 201]:
+                            return await response.json()
+                        else:
+                            body = await response.text()
+                            logger.error(f"API POST {full_url} failed: {response.status} body={body[:200]} data={data}")
+                            return None
+        except Exception as e:
+            logger.error(f"API request error: {e}")
+            return None
+
+async def get_user_stats(telegram_id: int) -> Optional[Dict[str, Any]]:
+    """Get user stats from cache or API"""
+    user_stats = stats_cache.get(telegram_id)
+    if user_stats is not None:
+        return user_stats
+    
+    user_stats = await api_request("GET", f"/public/users/{telegram_id}/stats")
+    if user_stats:
+        stats_cache.set(telegram_id, user_stats)
+    return user_stats
+
+async def finish_quiz(telegram_id: int, session_id: str) -> Optional[Dict[str, Any]]:
+    """Finish session and apply its result to the cached user stats"""
+    user_stats = stats_cache.pop(telegram_id)
+    finish_result = await api_request("POST", f"/public/sessions/{session_id}/finish")
+    
+    if user_stats and user_stats.get("finished_session_id") == session_id:
+        # A repeated finish of the same session is already counted
+        stats_cache.set(telegram_id, user_stats)
+    elif finish_result and user_stats:
+        score = finish_result["score_percent"]
+        best = max(user_stats["best_score_percent"], score) if user_stats["attempts"] > 0 else score
+        stats_cache.set(telegram_id, {
+            **user_stats,
+            "attempts": user_stats["attempts"] + 1,
+            "last_score_percent": score,
+            "best_score_percent": best,
+            "last_score_percentile": finish_result.get("percentile"),
+            "finished_session_id": session_id
+        })
+    return finish_result
+
+async def load_next_question(session_id: str) -> Optional[Tuple[Dict[str, Any], str, InlineKeyboardMarkup]]:
+    """Fetch next question from API and render it"""
+    question_data = await api_request("GET", f"/public/sessions/{session_id}/next")
+    if not question_data:
         return None
+    question_text, keyboard = render_question(question_data)
+    return question_data, question_text, keyboard
 
 def register_handlers(dp):
     """Register all handlers"""
     logger.info("🔧 Registering bot handlers...")
+    # Updates of one user are handled in order, different users in parallel;
+    # first, so nothing awaits before an update takes its place
+    dp.update.outer_middleware(mailboxes)
+    # Redelivered updates are dropped before any handler runs
+    dp.update.outer_middleware(deduplicator)
+    # Latency, queries and DB time of each handled update
+    dp.update.outer_middleware(instrumentation)
     dp.include_router(router)
     logger.info("✅ Bot handlers registered successfully")
 
@@ -73,17 +162,18 @@ async def cmd_start(message: Message, state: FSMContext):
     
     user = message.from_user
     if not user or not user.id:
-        await message.answer("❌ Ошибка получения данных пользователя")
+        outbound.answer(message, "❌ Ошибка получения данных пользователя")
         return
         
     telegram_id = user.id
     
     # Check if user exists
-    user_stats = await api_request("GET", f"/public/users/{telegram_id}/stats")
+    user_stats = await get_user_stats(telegram_id)
     
     if user_stats:
         # User exists, show welcome back message
-        await message.answer(
+        outbound.answer(
+            message,
             TEXTS["welcome_back"].format(
                 name=user_stats["full_name"],
                 attempts=user_stats["attempts"],
@@ -93,14 +183,14 @@ async def cmd_start(message: Message, state: FSMContext):
         )
     else:
         # New user, ask for registration
-        await message.answer(TEXTS["welcome_new"])
+        outbound.answer(message, TEXTS["welcome_new"])
         await state.set_state(QuizStates.waiting_for_name)
 
 @router.message(QuizStates.waiting_for_name)
 async def process_name(message: Message, state: FSMContext):
     """Process user's full name"""
     if not message.text:
-        await message.answer("❌ Пожалуйста, введите текст")
+        outbound.answer(message, "❌ Пожалуйста, введите текст")
         return
         
     full_name = message.text.strip()
@@ -108,7 +198,7 @@ async def process_name(message: Message, state: FSMContext):
     # Simple validation for first name and last name
     name_parts = full_name.split()
     if len(name_parts) < 2:
-        await message.answer(TEXTS["invalid_name"])
+        outbound.answer(message, TEXTS["invalid_name"])
         return
     
     first_name = name_parts[0]
@@ -116,7 +206,7 @@ async def process_name(message: Message, state: FSMContext):
     
     # Check if user exists
     if not message.from_user or not message.from_user.id:
-        await message.answer("❌ Ошибка получения данных пользователя")
+        outbound.answer(message, "❌ Ошибка получения данных пользователя")
         return
     
     # Register user
@@ -127,13 +217,15 @@ async def process_name(message: Message, state: FSMContext):
     })
     
     if result and result.get("success"):
+        stats_cache.pop(message.from_user.id)
         await state.clear()
-        await message.answer(
+        outbound.answer(
+            message,
             TEXTS["registration_success"].format(name=full_name),
             reply_markup=get_main_menu_keyboard()
         )
     else:
-        await message.answer(TEXTS["registration_error"])
+        outbound.answer(message, TEXTS["registration_error"])
 
 @router.callback_query(F.data == "select_test")
 async def select_test(callback: CallbackQuery, state: FSMContext):
@@ -147,13 +239,15 @@ async def select_test(callback: CallbackQuery, state: FSMContext):
     tests = await api_request("GET", "/public/tests")
     
     if not tests:
-        await callback.message.edit_text(
+        outbound.edit_text(
+            callback.message,
             "❌ Нет доступных тестов",
             reply_markup=get_back_to_menu_keyboard()
         )
         return
     
-    await callback.message.edit_text(
+    outbound.edit_text(
+        callback.message,
         "📝 Выберите тест:",
         reply_markup=get_test_selection_keyboard(tests)
     )
@@ -177,7 +271,8 @@ async def start_test(callback: CallbackQuery, state: FSMContext):
     })
     
     if not result or not result.get("session_id"):
-        await callback.message.edit_text(
+        outbound.edit_text(
+            callback.message,
             "❌ Ошибка при запуске теста",
             reply_markup=get_back_to_menu_keyboard()
         )
@@ -186,6 +281,9 @@ async def start_test(callback: CallbackQuery, state: FSMContext):
     session_id = result["session_id"]
     total_questions = result["total"]
     
+    # Previous session's prefetched question is no longer valid
+    prefetcher.discard(callback.from_user.id)
+    
     # Save session ID in state
     await state.update_data(session_id=session_id)
     await state.set_state(QuizStates.in_quiz)
@@ -207,7 +305,7 @@ async def process_answer(callback: CallbackQuery, state: FSMContext):
     
     if not session_id:
         try:
-            await callback.message.edit_text(TEXTS["session_error"])
+            outbound.edit_text(callback.message, TEXTS["session_error"])
         except Exception as e:
             logger.error(f"Failed to edit message: {e}")
         return
@@ -221,7 +319,7 @@ async def process_answer(callback: CallbackQuery, state: FSMContext):
     })
     
     if not result:
-        await callback.message.edit_text(TEXTS["answer_error"])
+        outbound.edit_text(callback.message, TEXTS["answer_error"])
         return
     
     # Show feedback
@@ -236,22 +334,35 @@ async def process_answer(callback: CallbackQuery, state: FSMContext):
     # Check if quiz is finished
     if progress["current"] >= progress["total"]:
         # Finish session
-        finish_result = await api_request("POST", f"/public/sessions/{session_id}/finish")
+        finish_result = await finish_quiz(callback.from_user.id, session_id)
         
         if finish_result:
             feedback_text += f"\n\n🎉 Тест завершён!\n"
             feedback_text += f"Результат: {finish_result['correct_count']}/{finish_result['total_count']} ({finish_result['score_percent']}%)"
+            if finish_result.get("percentile") is not None:
+                feedback_text += "\n" + TEXTS["percentile"].format(percent=round(finish_result["percentile"]))
             
-            await callback.message.edit_text(
+            outbound.edit_text(
+                callback.message,
                 feedback_text,
                 reply_markup=get_main_menu_keyboard()
             )
             await state.clear()
         else:
-            await callback.message.edit_text(TEXTS["finish_error"])
+            outbound.edit_text(callback.message, TEXTS["finish_error"])
     else:
+        # Prepare next question while the user reads the comment
+        if settings.bot_prefetch_enabled:
+            prefetcher.schedule(
+                callback.from_user.id,
+                session_id,
+                progress["current"] + 1,
+                lambda: load_next_question(session_id)
+            )
+        
         # Continue to next question
-        await callback.message.edit_text(
+        outbound.edit_text(
+            callback.message,
             feedback_text,
             reply_markup=get_continue_keyboard()
         )
@@ -259,69 +370,56 @@ async def process_answer(callback: CallbackQuery, state: FSMContext):
 @router.callback_query(F.data == "next_question")
 async def next_question(callback: CallbackQuery, state: FSMContext):
     """Go to next question"""
-    logger.info(f"🔄 next_question handler called by user {callback.from_user.id}")
-    
     try:
         await callback.answer()
-        logger.info(f"✅ Callback answered successfully")
     except Exception as e:
         logger.error(f"❌ Failed to answer callback: {e}")
     
     data = await state.get_data()
     session_id = data.get("session_id")
-    logger.info(f"📊 State data: session_id={session_id}")
+    logger.debug(f"next_question: user={callback.from_user.id} session_id={session_id}")
     
     if not session_id:
         logger.error(f"❌ No session_id found in state")
-        await callback.message.edit_text(TEXTS["session_error"])
+        outbound.edit_text(callback.message, TEXTS["session_error"])
+        return
+    
+    prefetched = await prefetcher.take(callback.from_user.id, session_id)
+    if prefetched:
+        logger.debug(f"next_question: prefetched question {prefetched.current} for session_id={session_id}")
+        outbound.edit_text(callback.message, prefetched.text, reply_markup=prefetched.keyboard)
         return
     
-    logger.info(f"🚀 Calling send_next_question with session_id={session_id}")
     await send_next_question(callback.message, session_id, state)
 
 async def send_next_question(message: Message, session_id: str, state: FSMContext):
     """Send next question to user"""
-    logger.info(f"📤 send_next_question called with session_id={session_id}")
-    
     # Get next question
-    logger.info(f"🔍 Requesting next question from API...")
-    question_data = await api_request("GET", f"/public/sessions/{session_id}/next")
-    logger.info(f"📥 API response: {question_data is not None}")
+    loaded = await load_next_question(session_id)
+    logger.debug(f"send_next_question: session_id={session_id} has_question={loaded is not None}")
     
-    if not question_data:
-        logger.info(f"🏁 No more questions, finishing quiz...")
+    if not loaded:
         # No more questions, finish quiz
-        finish_result = await api_request("POST", f"/public/sessions/{session_id}/finish")
+        finish_result = await finish_quiz(state.key.user_id, session_id)
         
         if finish_result:
             result_text = f"🎉 Тест завершён!\n"
             result_text += f"Результат: {finish_result['correct_count']}/{finish_result['total_count']} ({finish_result['score_percent']}%)"
             
-            logger.info(f"✅ Quiz finished, showing results")
-            await message.edit_text(
+            logger.debug(f"send_next_question: session_id={session_id} finished")
+            outbound.edit_text(
+                message,
                 result_text,
                 reply_markup=get_main_menu_keyboard()
             )
             await state.clear()
         else:
             logger.error(f"❌ Failed to finish quiz")
-            await message.edit_text(TEXTS["finish_error"])
+            outbound.edit_text(message, TEXTS["finish_error"])
         return
     
-    # Format question with answer options
-    question_text = f"❓ <b>{question_data['title']}</b>\n\n"
-    question_text += f"{question_data['text']}\n\n"
-    
-    # Add answer options to the question text
-    for i, option in enumerate(question_data['options']):
-        question_text += f"<b>{chr(65 + i)}.</b> {option['text']}\n"
-    
-    question_text += f"\n📊 Вопрос {question_data['current']} из {question_data['total']}"
-    
-    # Create keyboard with answer options
-    keyboard = get_quiz_keyboard(question_data['options'])
-    
-    await message.edit_text(question_text, reply_markup=keyboard)
+    _, question_text, keyboard = loaded
+    outbound.edit_text(message, question_text, reply_markup=keyboard)
 
 @router.callback_query(F.data == "view_stats")
 async def view_stats(callback: CallbackQuery):
@@ -331,7 +429,7 @@ async def view_stats(callback: CallbackQuery):
     except Exception as e:
         logger.error(f"Failed to answer callback: {e}")
     
-    user_stats = await api_request("GET", f"/public/users/{callback.from_user.id}/stats")
+    user_stats = await get_user_stats(callback.from_user.id)
     
     if user_stats:
         stats_text = f"📊 <b>Ваша статистика</b>\n\n"
@@ -341,14 +439,74 @@ async def view_stats(callback: CallbackQuery):
         
         if user_stats['attempts'] > 0:
             stats_text += f"📈 Последний результат: {user_stats['last_score_percent']}%\n"
+            if user_stats.get("last_score_percentile") is not None:
+                stats_text += TEXTS["percentile"].format(percent=round(user_stats["last_score_percentile"])) + "\n"
             stats_text += f"🏆 Лучший результат: {user_stats['best_score_percent']}%"
         
-        await callback.message.edit_text(
+        outbound.edit_text(
+            callback.message,
             stats_text,
             reply_markup=get_main_menu_keyboard()
         )
     else:
-        await callback.message.edit_text(TEXTS["stats_error"])
+        outbound.edit_text(callback.message, TEXTS["stats_error"])
+
+@router.callback_query(F.data == "leaderboard")
+async def select_leaderboard(callback: CallbackQuery):
+    """Choose a test to show its leaderboard"""
+    try:
+        await callback.answer()
+    except Exception as e:
+        logger.error(f"Failed to answer callback: {e}")
+    
+    tests = await api_request("GET", "/public/tests")
+    
+    if not tests:
+        outbound.edit_text(
+            callback.message,
+            "❌ Нет доступных тестов",
+            reply_markup=get_back_to_menu_keyboard()
+        )
+        return
+    
+    outbound.edit_text(
+        callback.message,
+        "🏆 Рейтинг какого теста показать?",
+        reply_markup=get_leaderboard_tests_keyboard(tests)
+    )
+
+@router.callback_query(F.data.startswith("leaderboard:"))
+async def show_leaderboard(callback: CallbackQuery):
+    """Show top results of a test and the user's place"""
+    try:
+        await callback.answer()
+    except Exception as e:
+        logger.error(f"Failed to answer callback: {e}")
+    
+    test_id = callback.data.split(":", 1)[1]
+    board = await api_request("GET", f"/public/tests/{test_id}/leaderboard?limit=10&telegram_id={callback.from_user.id}")
+    
+    if not board:
+        outbound.edit_text(callback.message, TEXTS["leaderboard_error"], reply_markup=get_leaderboard_keyboard())
+        return
+    
+    if not board["entries"]:
+        outbound.edit_text(callback.message, TEXTS["leaderboard_empty"], reply_markup=get_leaderboard_keyboard())
+        return
+    
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    text = "🏆 <b>Рейтинг</b>\n\n"
+    for entry in board["entries"]:
+        place = medals.get(entry["rank"], f"{entry['rank']}.")
+        text += f"{place} {html.escape(entry['full_name'])} — {entry['score_percent']}% ({round(entry['duration_seconds'])} с)\n"
+    
+    me = board["me"]
+    if me:
+        text += f"\n📍 Ваше место: {me['rank']} ({me['score_percent']}%)"
+    else:
+        text += "\n📍 Вы ещё не проходили этот тест"
+    
+    outbound.edit_text(callback.message, text, reply_markup=get_leaderboard_keyboard())
 
 @router.callback_query(F.data == "main_menu")
 async def main_menu(callback: CallbackQuery, state: FSMContext):
@@ -359,15 +517,17 @@ async def main_menu(callback: CallbackQuery, state: FSMContext):
         logger.error(f"Failed to answer callback: {e}")
     await state.clear()
     
-    user_stats = await api_request("GET", f"/public/users/{callback.from_user.id}/stats")
+    user_stats = await get_user_stats(callback.from_user.id)
     
     if user_stats:
-        await callback.message.edit_text(
+        outbound.edit_text(
+            callback.message,
             TEXTS["main_menu"].format(name=user_stats["full_name"]),
             reply_markup=get_main_menu_keyboard()
         )
     else:
-        await callback.message.edit_text(
+        outbound.edit_text(
+            callback.message,
             "Главное меню",
             reply_markup=get_main_menu_keyboard()
         )
@@ -376,10 +536,10 @@ async def main_menu(callback: CallbackQuery, state: FSMContext):
 async def cmd_stats(message: Message):
     """Handle /stats command"""
     if not message.from_user or not message.from_user.id:
-        await message.answer("❌ Ошибка получения данных пользователя")
+        outbound.answer(message, "❌ Ошибка получения данных пользователя")
         return
         
-    user_stats = await api_request("GET", f"/public/users/{message.from_user.id}/stats")
+    user_stats = await get_user_stats(message.from_user.id)
     
     if user_stats:
         stats_text = f"📊 <b>Ваша статистика</b>\n\n"
@@ -389,11 +549,13 @@ async def cmd_stats(message: Message):
         
         if user_stats['attempts'] > 0:
             stats_text += f"📈 Последний результат: {user_stats['last_score_percent']}%\n"
+            if user_stats.get("last_score_percentile") is not None:
+                stats_text += TEXTS["percentile"].format(percent=round(user_stats["last_score_percentile"])) + "\n"
             stats_text += f"🏆 Лучший результат: {user_stats['best_score_percent']}%"
         
-        await message.answer(stats_text)
+        outbound.answer(message, stats_text)
     else:
-        await message.answer("❌ Не удалось получить статистику")
+        outbound.answer(message, "❌ Не удалось получить статистику")
 
 @router.message(Command("help"))
 async def cmd_help(message: Message):
@@ -416,7 +578,7 @@ async def cmd_help(message: Message):
 
 Удачи в тестировании! 🚀
     """
-    await message.answer(help_text)
+    outbound.answer(message, help_text)
 
 # Handle messages when user is in quiz
 @router.message(QuizStates.in_quiz)
@@ -427,7 +589,7 @@ async def handle_in_quiz_message(message: Message, state: FSMContext):
     session_id = data.get("session_id")
     
     if not session_id:
-        await message.answer("❌ Сессия не найдена. Начните новый тест.")
+        outbound.answer(message, "❌ Сессия не найдена. Начните новый тест.")
         await state.clear()
         return
     
@@ -437,41 +599,34 @@ async def handle_in_quiz_message(message: Message, state: FSMContext):
         
         if not question_data:
             # Quiz might be finished, redirect to results
-            finish_result = await api_request("POST", f"/public/sessions/{session_id}/finish")
+            finish_result = await finish_quiz(state.key.user_id, session_id)
             
             if finish_result:
                 result_text = f"🎉 Тест завершён!\n"
                 result_text += f"Результат: {finish_result['correct_count']}/{finish_result['total_count']} ({finish_result['score_percent']}%)"
                 
-                await message.answer(
+                outbound.answer(
+                    message,
                     result_text,
                     reply_markup=get_main_menu_keyboard()
                 )
             else:
-                await message.answer("❌ Ошибка при завершении теста")
+                outbound.answer(message, "❌ Ошибка при завершении теста")
                 
             await state.clear()
             return
         
         # Show current question
-        question_text = f"📝 <b>Продолжаем тест...</b>\n\n"
-        question_text += f"❓ <b>{question_data['title']}</b>\n\n"
-        question_text += f"{question_data['text']}\n\n"
-        
-        # Add answer options to the question text
-        for i, option in enumerate(question_data['options']):
-            question_text += f"<b>{chr(65 + i)}.</b> {option['text']}\n"
-        
-        question_text += f"\n📊 Вопрос {question_data['current']} из {question_data['total']}"
-        
-        # Create keyboard with answer options
-        keyboard = get_quiz_keyboard(question_data['options'])
+        question_text, keyboard = render_question(
+            question_data,
+            prefix="📝 <b>Продолжаем тест...</b>\n\n"
+        )
         
-        await message.answer(question_text, reply_markup=keyboard)
+        outbound.answer(message, question_text, reply_markup=keyboard)
         
     except Exception as e:
         logger.error(f"Error restoring quiz state: {e}")
-        await message.answer("❌ Ошибка восстановления теста. Начните новый тест.")
+        outbound.answer(message, "❌ Ошибка восстановления теста. Начните новый тест.")
         await state.clear()
 
 # Handle text messages that are NOT in name input state  
@@ -494,13 +649,15 @@ async def handle_unexpected_text(message: Message, state: FSMContext):
     
     # Send rejection message with appropriate response based on current state
     if current_state == QuizStates.in_quiz.state:
-        await message.answer(
+        outbound.answer(
+            message,
             "❌ Во время теста используйте только кнопки для ответов.\n"
             "📝 Выберите вариант ответа из предложенных кнопок.",
             reply_markup=None
         )
     else:
-        await message.answer(
+        outbound.answer(
+            message,
             "🔘 Используйте кнопки меню для управления ботом",
             reply_markup=get_main_menu_keyboard()
         )
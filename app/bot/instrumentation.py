@@ -0,0 +1,60 @@
+"""Per-update instrumentation of bot handlers: latency and database queries"""
+
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from ..core.config import settings
+from ..core.metrics import bot_handler_seconds
+from ..core.querycount import track_queries
+from ..core.tracing import start_trace
+
+logger = logging.getLogger(__name__)
+
+# Labels come from user input, so only known values become metric series
+COMMANDS = frozenset({"/start", "/stats", "/help"})
+CALLBACK_ACTIONS = frozenset({
+    "select_test", "start_test", "start_quiz", "answer", "next_question",
+    "view_stats", "leaderboard", "main_menu"
+})
+
+def update_label(update: Update) -> str:
+    """Handler-level label: command, callback action or update type"""
+    if update.callback_query and update.callback_query.data:
+        action = update.callback_query.data.split(":", 1)[0]
+        return f"callback:{action if action in CALLBACK_ACTIONS else 'other'}"
+    if update.message and update.message.text and update.message.text.startswith("/"):
+        command = update.message.text.split()[0].split("@", 1)[0]
+        return f"command:{command if command in COMMANDS else 'other'}"
+    return update.event_type
+
+class HandlerInstrumentation(BaseMiddleware):
+    """Outer update middleware that records latency, queries and DB time of each update
+
+    Every update also starts a (sampled) trace that api_request carries to the API.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        started = time.perf_counter()
+        label = update_label(event)
+        with start_trace(f"bot {label}", update_id=event.update_id), track_queries() as queries:
+            try:
+                return await handler(event, data)
+            finally:
+                bot_handler_seconds.observe(time.perf_counter() - started, handler=label)
+                line = f"{label}: {queries.count} queries, {queries.duration_ms} ms db"
+                if queries.count > settings.db_query_warn_threshold:
+                    logger.warning(f"{line}: too many queries")
+                else:
+                    logger.debug(line)
+
+# Global handler instrumentation
+instrumentation = HandlerInstrumentation()
@@ -3,18 +3,45 @@
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 from typing import List, Dict
 
+# Static keyboards are built once at import and shared between messages
+MAIN_MENU_BUTTON = InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")
+
+START_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🎯 Начать тест", callback_data="start_quiz")]
+])
+
+MAIN_MENU_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🎯 Выбрать тест", callback_data="select_test")],
+    [InlineKeyboardButton(text="📊 Моя статистика", callback_data="view_stats")],
+    [InlineKeyboardButton(text="🏆 Рейтинг", callback_data="leaderboard")],
+])
+
+CONTINUE_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="➡️ Следующий вопрос", callback_data="next_question")]
+])
+
+FINISH_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🎯 Пройти еще раз", callback_data="start_quiz")],
+    [InlineKeyboardButton(text="📊 Моя статистика", callback_data="view_stats")],
+    [MAIN_MENU_BUTTON]
+])
+
+LEADERBOARD_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [InlineKeyboardButton(text="🏆 Другой тест", callback_data="leaderboard")],
+    [MAIN_MENU_BUTTON]
+])
+
+BACK_TO_MENU_KEYBOARD = InlineKeyboardMarkup(inline_keyboard=[
+    [MAIN_MENU_BUTTON]
+])
+
 def get_start_keyboard() -> InlineKeyboardMarkup:
     """Keyboard for start message"""
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🎯 Начать тест", callback_data="start_quiz")]
-    ])
+    return START_KEYBOARD
 
 def get_main_menu_keyboard() -> InlineKeyboardMarkup:
     """Main menu keyboard"""
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🎯 Выбрать тест", callback_data="select_test")],
-        [InlineKeyboardButton(text="📊 Моя статистика", callback_data="view_stats")],
-    ])
+    return MAIN_MENU_KEYBOARD
 
 def get_quiz_keyboard(options: List[Dict[str, str]]) -> InlineKeyboardMarkup:
     """Keyboard for quiz questions"""
@@ -22,36 +49,27 @@ def get_quiz_keyboard(options: List[Dict[str, str]]) -> InlineKeyboardMarkup:
     
     # Add option buttons with just letters (A, B, C, etc.)
     for i, option in enumerate(options):
-        button_text = f"{chr(65 + i)}"  # Just the letter: A, B, C, etc.
         buttons.append([InlineKeyboardButton(
-            text=button_text,
+            text=chr(65 + i),  # Just the letter: A, B, C, etc.
             callback_data=f"answer:{option['id']}"
         )])
     
     # Add main menu button
-    buttons.append([InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")])
+    buttons.append([MAIN_MENU_BUTTON])
     
     return InlineKeyboardMarkup(inline_keyboard=buttons)
 
 def get_continue_keyboard() -> InlineKeyboardMarkup:
     """Keyboard to continue to next question"""
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="➡️ Следующий вопрос", callback_data="next_question")]
-    ])
+    return CONTINUE_KEYBOARD
 
 def get_finish_keyboard() -> InlineKeyboardMarkup:
     """Keyboard for finished quiz"""
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🎯 Пройти еще раз", callback_data="start_quiz")],
-        [InlineKeyboardButton(text="📊 Моя статистика", callback_data="view_stats")],
-        [InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")]
-    ])
+    return FINISH_KEYBOARD
 
 def get_back_to_menu_keyboard() -> InlineKeyboardMarkup:
     """Simple keyboard to return to main menu"""
-    return InlineKeyboardMarkup(inline_keyboard=[
-        [InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")]
-    ])
+    return BACK_TO_MENU_KEYBOARD
 
 def get_test_selection_keyboard(tests: list) -> InlineKeyboardMarkup:
     """Test selection keyboard"""
@@ -62,6 +80,19 @@ def get_test_selection_keyboard(tests: list) -> InlineKeyboardMarkup:
         keyboard.append([InlineKeyboardButton(text=text, callback_data=callback_data)])
     
     # Add back to menu button
-    keyboard.append([InlineKeyboardButton(text="🏠 Главное меню", callback_data="main_menu")])
+    keyboard.append([MAIN_MENU_BUTTON])
     
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_leaderboard_tests_keyboard(tests: list) -> InlineKeyboardMarkup:
+    """Test selection keyboard for the leaderboard"""
+    keyboard = [
+        [InlineKeyboardButton(text=f"🏆 {test['name']}", callback_data=f"leaderboard:{test['id']}")]
+        for test in tests
+    ]
+    keyboard.append([MAIN_MENU_BUTTON])
+    return InlineKeyboardMarkup(inline_keyboard=keyboard)
+
+def get_leaderboard_keyboard() -> InlineKeyboardMarkup:
+    """Keyboard under a leaderboard"""
+    return LEADERBOARD_KEYBOARD
@@ -0,0 +1,95 @@
+"""Per-user ordered processing of Telegram updates"""
+
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Tuple
+
+from aiogram import BaseMiddleware
+from aiogram.types import Update
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class _Mailbox:
+    """Updates of one user queued behind the one being handled"""
+    queue: Deque[Tuple[Callable[[Update, Dict[str, Any]], Awaitable[Any]], Update, Dict[str, Any]]] = field(
+        default_factory=deque
+    )
+
+class UserMailboxScheduler(BaseMiddleware):
+    """Outer update middleware that runs each user's updates strictly in order
+
+    Register it before any middleware that awaits, so updates take their
+    place in the mailbox in arrival order. The first update of an idle user
+    is handled by its caller, which then drains everything queued for the
+    user meanwhile. Later updates only queue and return at once, so a busy
+    user never holds a webhook worker that waits. Handlers of different
+    users run in parallel limited by a shared semaphore. A mailbox is
+    removed as soon as it becomes empty.
+    """
+
+    def __init__(self, max_concurrency: int, mailbox_size: int):
+        self.max_concurrency = max_concurrency
+        self.mailbox_size = mailbox_size
+        self._workers = asyncio.Semaphore(max_concurrency)
+        self._mailboxes: Dict[int, _Mailbox] = {}
+        self.dropped = 0
+
+    async def __call__(
+        self,
+        handler: Callable[[Update, Dict[str, Any]], Awaitable[Any]],
+        event: Update,
+        data: Dict[str, Any]
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            async with self._workers:
+                return await handler(event, data)
+
+        # No await before the update is placed, so arrival order is kept
+        mailbox = self._mailboxes.get(user.id)
+        if mailbox is not None:
+            if len(mailbox.queue) + 1 >= self.mailbox_size:
+                self.dropped += 1
+                logger.warning(f"Mailbox of user {user.id} is full, dropping update {event.update_id}")
+            else:
+                mailbox.queue.append((handler, event, data))
+            return None
+
+        mailbox = self._mailboxes[user.id] = _Mailbox()
+        try:
+            async with self._workers:
+                return await handler(event, data)
+        finally:
+            await self._drain(user.id, mailbox)
+
+    async def _drain(self, user_id: int, mailbox: _Mailbox) -> None:
+        try:
+            while mailbox.queue:
+                handler, event, data = mailbox.queue.popleft()
+                try:
+                    async with self._workers:
+                        await handler(event, data)
+                except Exception as e:
+                    logger.error(f"Queued update {event.update_id} of user {user_id} failed: {e}")
+        finally:
+            del self._mailboxes[user_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Mailbox counters"""
+        return {
+            "mailboxes": len(self._mailboxes),
+            "pending": sum(len(mailbox.queue) + 1 for mailbox in self._mailboxes.values()),
+            "dropped": self.dropped,
+            "max_concurrency": self.max_concurrency
+        }
+
+# Global scheduler installed in front of the dispatcher
+mailboxes = UserMailboxScheduler(
+    max_concurrency=settings.bot_user_concurrency,
+    mailbox_size=settings.bot_user_mailbox_size
+)
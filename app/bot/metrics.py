@@ -0,0 +1,50 @@
+"""Prometheus metrics endpoint of the polling bot process"""
+
+import logging
+from typing import Dict
+
+from aiohttp import web
+
+from .dedup import deduplicator
+from .handlers import stats_cache
+from .mailbox import mailboxes
+from .outbound import outbound
+from .render import render_cache_stats
+from ..core.metrics import CONTENT_TYPE, LabelValues, registry
+
+logger = logging.getLogger(__name__)
+
+def _cache_stats() -> Dict[str, Dict[str, int]]:
+    return {
+        "bot_render": render_cache_stats(),
+        "bot_user_stats": {"hits": stats_cache.hits, "misses": stats_cache.misses}
+    }
+
+def _cache_hit_ratio() -> Dict[LabelValues, float]:
+    return {
+        (name,): stats["hits"] / (stats["hits"] + stats["misses"])
+        for name, stats in _cache_stats().items()
+        if stats["hits"] + stats["misses"]
+    }
+
+def _outbound_queue() -> Dict[LabelValues, float]:
+    stats = outbound.stats()
+    return {(name,): stats[name] for name in ("queue_depth", "in_flight") if name in stats}
+
+registry.gauge("cache_hit_ratio", "Cache hits / lookups since start", ("cache",), callback=_cache_hit_ratio)
+registry.gauge("bot_outbound_requests", "Outbound Bot API requests waiting or in flight", ("state",), callback=_outbound_queue)
+registry.gauge("bot_mailbox_pending", "Updates waiting in user mailboxes", callback=lambda: {(): mailboxes.stats()["pending"]})
+registry.gauge("bot_duplicate_updates", "Redelivered updates skipped since start", callback=lambda: {(): deduplicator.skipped})
+
+async def _metrics(request: web.Request) -> web.Response:
+    return web.Response(body=registry.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+async def start_metrics_server(host: str, port: int) -> web.AppRunner:
+    """Serve /metrics on a separate port"""
+    app = web.Application()
+    app.router.add_get("/metrics", _metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"📈 Bot metrics on http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,333 @@
+"""Outbound Telegram send scheduler with global and per-chat rate limiting"""
+
+import asyncio
+import contextvars
+import logging
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.types import Message
+
+from ..core.config import settings
+from ..core.tracing import start_span
+
+logger = logging.getLogger(__name__)
+
+async def _traced(name: str, request: Awaitable[Any]) -> Any:
+    with start_span(name):
+        return await request
+
+def _log_failure(future: asyncio.Future) -> None:
+    # Most sends are not awaited, so their errors would otherwise go unseen
+    if not future.cancelled() and future.exception() is not None:
+        logger.error(f"Outbound Bot API request failed: {future.exception()}")
+
+class TokenBucket:
+    """Token bucket refilled at `rate` tokens per second up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until one token is available"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        """Consume one token"""
+        self._refill(now)
+        self.tokens -= 1
+
+    def is_full(self, now: float) -> bool:
+        """Whether the bucket has refilled completely"""
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+@dataclass
+class _Outbound:
+    """Queued send or edit"""
+    send: Callable[[], Awaitable[Any]]
+    futures: List[asyncio.Future]
+    enqueued_at: float
+    message_id: Optional[int] = None  # set for edits, used for coalescing
+    attempts: int = 0
+    context: contextvars.Context = field(default_factory=contextvars.copy_context)  # trace of the handler
+
+@dataclass
+class _ChatQueue:
+    """Pending sends of one chat"""
+    bucket: TokenBucket
+    items: Deque[_Outbound] = field(default_factory=deque)
+    in_flight: bool = False
+    blocked_until: float = 0.0
+    last: Optional[asyncio.Future] = None  # resolves once everything queued so far is done
+
+class OutboundScheduler:
+    """Queues sends and edits and releases them within Telegram rate limits
+
+    Chats are served round-robin, one request in flight per chat so messages
+    keep their order. Consecutive edits of the same message are coalesced
+    into the latest one. `TelegramRetryAfter` pauses the chat and requeues
+    the request.
+
+    `edit_text` and `answer` return without waiting for the rate limit;
+    await the returned future only when the result is needed. Failures are
+    logged. Limits apply per process.
+    """
+
+    def __init__(self, global_rate: float, per_chat_rate: float, per_chat_burst: float, max_retries: int):
+        self.global_rate = global_rate
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.max_retries = max_retries
+
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: Dict[int, _ChatQueue] = {}
+        self._active: "OrderedDict[int, None]" = OrderedDict()  # chats with pending items, round-robin order
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._deliveries: Set[asyncio.Task] = set()
+        self._last_sweep = time.monotonic()
+
+        # Metrics
+        self.enqueued = 0
+        self.sent = 0
+        self.coalesced = 0
+        self.retried = 0
+        self.failed = 0
+        self.delay_max = 0.0
+        self._delays: Deque[float] = deque(maxlen=1000)
+
+    def edit_text(self, message: Message, text: str, **kwargs) -> asyncio.Future:
+        """Queue an edit of the message text"""
+        return self.submit(
+            message.chat.id,
+            lambda: _traced("telegram.edit_text", message.edit_text(text, **kwargs)),
+            message_id=message.message_id
+        )
+
+    def answer(self, message: Message, text: str, **kwargs) -> asyncio.Future:
+        """Queue a message to the chat"""
+        return self.submit(message.chat.id, lambda: _traced("telegram.send_message", message.answer(text, **kwargs)))
+
+    async def wait_sent(self, chat_id: int) -> None:
+        """Wait until everything queued for the chat so far is sent or failed"""
+        chat = self._chats.get(chat_id)
+        if chat is not None and chat.last is not None:
+            await asyncio.wait([chat.last])
+
+    def submit(self, chat_id: int, send: Callable[[], Awaitable[Any]], message_id: Optional[int] = None) -> asyncio.Future:
+        """Queue a request; the returned future resolves with its result"""
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(_log_failure)
+        self.enqueued += 1
+
+        chat = self._chats.get(chat_id)
+        if chat is None:
+            chat = _ChatQueue(bucket=TokenBucket(self.per_chat_rate, self.per_chat_burst))
+            self._chats[chat_id] = chat
+        chat.last = future
+
+        # Only the latest text of a message matters while its edits wait in queue
+        if message_id is not None and chat.items and chat.items[-1].message_id == message_id:
+            tail = chat.items[-1]
+            tail.send = send
+            tail.futures.append(future)
+            self.coalesced += 1
+            return future
+
+        chat.items.append(_Outbound(
+            send=send,
+            futures=[future],
+            enqueued_at=time.monotonic(),
+            message_id=message_id
+        ))
+        self._active[chat_id] = None
+        self._ensure_started()
+        self._wakeup.set()
+        return future
+
+    def _ensure_started(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            wait = self._dispatch(time.monotonic())
+            if wait == 0:
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def _dispatch(self, now: float) -> Optional[float]:
+        """Start one ready request; return 0 on success or how long to wait"""
+        if now - self._last_sweep > 60:
+            self._sweep(now)
+
+        if not self._active:
+            return None
+
+        global_wait = self._global.delay(now)
+        if global_wait > 0:
+            return global_wait
+
+        min_wait: Optional[float] = None
+        for chat_id in self._active:
+            chat = self._chats[chat_id]
+            if chat.in_flight:
+                continue
+
+            wait = max(chat.blocked_until - now, chat.bucket.delay(now))
+            if wait > 0:
+                min_wait = wait if min_wait is None else min(min_wait, wait)
+                continue
+
+            item = chat.items.popleft()
+            if chat.items:
+                self._active.move_to_end(chat_id)
+            else:
+                del self._active[chat_id]
+
+            chat.in_flight = True
+            chat.bucket.take(now)
+            self._global.take(now)
+
+            task = asyncio.create_task(self._deliver(chat_id, chat, item), context=item.context)
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+            return 0
+
+        # Every pending chat is in flight: a delivery will wake us up
+        return min_wait
+
+    async def _deliver(self, chat_id: int, chat: _ChatQueue, item: _Outbound) -> None:
+        try:
+            result = await item.send()
+        except TelegramRetryAfter as e:
+            item.attempts += 1
+            if item.attempts <= self.max_retries:
+                logger.warning(f"Flood limit for chat {chat_id}, retry after {e.retry_after}s")
+                self.retried += 1
+                chat.blocked_until = time.monotonic() + e.retry_after
+                chat.items.appendleft(item)
+                self._active[chat_id] = None
+            else:
+                self._fail(item, e)
+        except Exception as e:
+            self._fail(item, e)
+        else:
+            delay = time.monotonic() - item.enqueued_at
+            self.sent += 1
+            self.delay_max = max(self.delay_max, delay)
+            self._delays.append(delay)
+            for future in item.futures:
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            chat.in_flight = False
+            self._wakeup.set()
+
+    def _fail(self, item: _Outbound, error: Exception) -> None:
+        self.failed += 1
+        for future in item.futures:
+            if not future.done():
+                future.set_exception(error)
+
+    def _sweep(self, now: float) -> None:
+        """Forget idle chats whose buckets have refilled"""
+        self._last_sweep = now
+        idle = [
+            chat_id for chat_id, chat in self._chats.items()
+            if not chat.items and not chat.in_flight and chat.bucket.is_full(now)
+        ]
+        for chat_id in idle:
+            del self._chats[chat_id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, counters and delay metrics"""
+        delays = sorted(self._delays)
+        return {
+            "queue_depth": sum(len(chat.items) for chat in self._chats.values()),
+            "chats_pending": len(self._active),
+            "in_flight": len(self._deliveries),
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "retried": self.retried,
+            "failed": self.failed,
+            "delay_avg_ms": round(sum(delays) / len(delays) * 1000, 1) if delays else 0.0,
+            "delay_p95_ms": round(delays[int(len(delays) * 0.95)] * 1000, 1) if delays else 0.0,
+            "delay_max_ms": round(self.delay_max * 1000, 1)
+        }
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Wait for queued requests to drain, then stop"""
+        deadline = time.monotonic() + timeout
+        while (self._active or self._deliveries) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+class DirectSender:
+    """Sends without queueing or rate limits, used when the scheduler is disabled"""
+
+    def __init__(self):
+        self._last: Dict[int, asyncio.Task] = {}  # chat_id -> latest request
+
+    def _start(self, chat_id: int, request: Awaitable[Any]) -> asyncio.Task:
+        task = asyncio.ensure_future(request)
+        task.add_done_callback(_log_failure)
+        self._last[chat_id] = task
+        task.add_done_callback(lambda _: self._forget(chat_id, task))
+        return task
+
+    def _forget(self, chat_id: int, task: asyncio.Task) -> None:
+        if self._last.get(chat_id) is task:
+            del self._last[chat_id]
+
+    def edit_text(self, message: Message, text: str, **kwargs) -> asyncio.Task:
+        return self._start(message.chat.id, _traced("telegram.edit_text", message.edit_text(text, **kwargs)))
+
+    def answer(self, message: Message, text: str, **kwargs) -> asyncio.Task:
+        return self._start(message.chat.id, _traced("telegram.send_message", message.answer(text, **kwargs)))
+
+    async def wait_sent(self, chat_id: int) -> None:
+        task = self._last.get(chat_id)
+        if task is not None:
+            await asyncio.wait([task])
+
+    def stats(self) -> Dict[str, Any]:
+        return {}
+
+    async def close(self, timeout: float = 5.0) -> None:
+        """Wait for requests still running"""
+        if self._last:
+            await asyncio.wait(list(self._last.values()), timeout=timeout)
+
+# Global outbound scheduler used by handlers. Telegram limits the token, not
+# the process, so webhook workers split the global rate between them.
+_workers = settings.api_workers if settings.webhook_enabled else 1
+outbound = OutboundScheduler(
+    global_rate=settings.bot_send_global_rate / max(1, _workers),
+    per_chat_rate=settings.bot_send_per_chat_rate,
+    per_chat_burst=settings.bot_send_per_chat_burst,
+    max_retries=settings.bot_send_max_retries
+) if settings.bot_send_scheduler_enabled else DirectSender()
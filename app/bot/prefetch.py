@@ -0,0 +1,93 @@
+"""Background prefetch of the next quiz question"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+
+from ..core.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class PrefetchedQuestion:
+    """Next question fetched and rendered while the user reads feedback"""
+    session_id: str
+    current: int
+    text: str
+    keyboard: InlineKeyboardMarkup
+
+# Loader returns (question_data, text, keyboard) or None when there is no next question
+Loader = Callable[[], Awaitable[Optional[Tuple[Dict[str, Any], str, InlineKeyboardMarkup]]]]
+
+class QuestionPrefetcher:
+    """Per-user bounded cache of prefetched questions"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._sessions = TTLCache(maxsize=maxsize, ttl=ttl)  # session_id -> user_id
+        self._tasks: Dict[int, Tuple[str, asyncio.Task]] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def schedule(self, user_id: int, session_id: str, expected: int, loader: Loader) -> None:
+        """Start loading the question number `expected` of the session in background"""
+        self.discard(user_id)
+        task = asyncio.create_task(self._load(user_id, session_id, expected, loader))
+        self._tasks[user_id] = (session_id, task)
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _load(self, user_id: int, session_id: str, expected: int, loader: Loader) -> None:
+        try:
+            loaded = await loader()
+        except Exception as e:
+            logger.warning(f"Prefetch failed for user {user_id}: {e}")
+            return
+        finally:
+            pending = self._tasks.get(user_id)
+            if pending and pending[1] is asyncio.current_task():
+                del self._tasks[user_id]
+
+        if not loaded:
+            return
+
+        question_data, text, keyboard = loaded
+        if question_data.get("current") != expected:
+            return
+
+        self._sessions.set(session_id, user_id)
+        self._cache.set(user_id, PrefetchedQuestion(
+            session_id=session_id,
+            current=expected,
+            text=text,
+            keyboard=keyboard
+        ))
+
+    async def take(self, user_id: int, session_id: str) -> Optional[PrefetchedQuestion]:
+        """Pop prefetched question for the session, waiting for an in-flight prefetch"""
+        pending = self._tasks.get(user_id)
+        if pending and pending[0] == session_id:
+            await asyncio.wait({pending[1]})
+
+        entry = self._cache.pop(user_id)
+        if entry is None or entry.session_id != session_id:
+            return None
+        return entry
+
+    def invalidate_session(self, session_id: str, completed: int) -> None:
+        """Drop prefetched question once `completed` answers make it outdated"""
+        user_id = self._sessions.peek(session_id)
+        if user_id is None:
+            return
+        entry = self._cache.peek(user_id)
+        if entry is not None and entry.session_id == session_id and entry.current <= completed:
+            self._cache.pop(user_id)
+
+    def discard(self, user_id: int) -> None:
+        """Drop cached and in-flight prefetch for the user"""
+        self._cache.pop(user_id)
+        pending = self._tasks.pop(user_id, None)
+        if pending and not pending[1].done():
+            pending[1].cancel()
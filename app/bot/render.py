@@ -0,0 +1,56 @@
+"""Rendering of quiz question messages"""
+
+from typing import Any, Dict, Tuple
+
+from aiogram.types import InlineKeyboardMarkup
+
+from .keyboards import get_quiz_keyboard
+from ..core.cache import TTLCache
+from ..core.config import settings
+
+# (question_id, content_version, option_order) -> (body text, keyboard)
+_question_cache = TTLCache(maxsize=settings.bot_render_cache_size)
+
+def content_version(question_data: Dict[str, Any]) -> int:
+    """Fingerprint of question content shown to the user"""
+    return hash((
+        question_data['title'],
+        question_data['text'],
+        tuple(option['text'] for option in question_data['options'])
+    ))
+
+def _render_body(question_data: Dict[str, Any]) -> str:
+    question_text = f"❓ <b>{question_data['title']}</b>\n\n"
+    question_text += f"{question_data['text']}\n\n"
+
+    # Add answer options to the question text
+    question_text += "".join(
+        f"<b>{chr(65 + i)}.</b> {option['text']}\n"
+        for i, option in enumerate(question_data['options'])
+    )
+    return question_text
+
+def render_question(question_data: Dict[str, Any], prefix: str = "") -> Tuple[str, InlineKeyboardMarkup]:
+    """Render question text with answer options and its keyboard"""
+    key = (
+        question_data['question_id'],
+        content_version(question_data),
+        tuple(option['id'] for option in question_data['options'])
+    )
+
+    rendered = _question_cache.get(key)
+    if rendered is None:
+        rendered = (_render_body(question_data), get_quiz_keyboard(question_data['options']))
+        _question_cache.set(key, rendered)
+
+    body, keyboard = rendered
+    progress = f"\n📊 Вопрос {question_data['current']} из {question_data['total']}"
+    return prefix + body + progress, keyboard
+
+def render_cache_stats() -> Dict[str, int]:
+    """Hit/miss counters of the question render cache"""
+    return {
+        "size": len(_question_cache),
+        "hits": _question_cache.hits,
+        "misses": _question_cache.misses
+    }
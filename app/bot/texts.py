@@ -90,6 +90,10 @@ TEXTS = {
 {grade_message}
 """,
 
+    "percentile": "👥 Лучше, чем {percent}% коллег",
+    "leaderboard_empty": "🏆 Этот тест ещё никто не завершил. Станьте первым!",
+    "leaderboard_error": "❌ Не удалось загрузить рейтинг. Попробуйте позже.",
+
     "grade_excellent": "🏆 Отличный результат!",
     "grade_good": "👍 Хороший результат!",
     "grade_satisfactory": "📚 Есть над чем поработать.",
@@ -0,0 +1,74 @@
+"""Admin dashboard statistics from aggregate queries"""
+
+import threading
+from datetime import date, timedelta
+from typing import Any, Dict
+
+from .config import settings
+from .db_storage import storage
+
+class AdminStats:
+    """Builds the /admin/stats snapshot
+
+    Sessions are counted with one GROUP BY per refresh. Answers per day are
+    kept incrementally: rows up to the settled watermark are folded into
+    running totals and never read again. The last `overlap` IDs are
+    recounted on every refresh, so rows whose transaction committed after
+    a higher ID was already seen are not lost.
+    """
+
+    def __init__(self, days: int, overlap: int = 1000):
+        self.days = days
+        self.overlap = overlap
+        self._settled_id = 0
+        self._settled_by_day: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def _answers_by_day(self) -> Dict[str, int]:
+        max_id = storage.get_max_answer_id()
+        if max_id < self._settled_id:  # answers were deleted
+            self._settled_id, self._settled_by_day = 0, {}
+        settled_id = max(self._settled_id, max_id - self.overlap)
+
+        by_day = dict(self._settled_by_day)
+        for day, settled, count in storage.count_answers_by_day(self._settled_id, settled_id):
+            if settled:
+                self._settled_by_day[day] = self._settled_by_day.get(day, 0) + count
+            by_day[day] = by_day.get(day, 0) + count
+        self._settled_id = settled_id
+        return by_day
+
+    def compute(self) -> Dict[str, Any]:
+        """Blocking; run in a worker thread"""
+        with self._lock:
+            by_day = self._answers_by_day()
+        counts = storage.get_live_counts()
+        sessions = storage.get_session_counts_by_test()
+        tests = {test.id: test.name for test in storage.get_all_tests()}
+
+        total_sessions = sum(c["attempts"] for c in sessions.values())
+        finished_sessions = sum(c["finished"] for c in sessions.values())
+        first_day = (date.today() - timedelta(days=self.days - 1)).isoformat()
+
+        return {
+            "questions_count": counts["questions_count"],
+            "users_count": counts["users_count"],
+            "total_sessions": total_sessions,
+            "finished_sessions": finished_sessions,
+            "active_sessions": total_sessions - finished_sessions,
+            "total_answers": sum(by_day.values()),
+            "answers_per_day": [
+                {"date": day, "answers": by_day[day]}
+                for day in sorted(by_day) if day >= first_day
+            ],
+            "tests": sorted(
+                (
+                    {"test_id": test_id, "name": tests.get(test_id, test_id), **c}
+                    for test_id, c in sessions.items()
+                ),
+                key=lambda t: -t["attempts"]
+            )
+        }
+
+# Global admin stats of this process
+admin_stats = AdminStats(days=settings.admin_stats_days)
@@ -0,0 +1,158 @@
+"""Per-question answer analytics: option choices and time-to-answer buckets
+
+Counters live in question_option_stats and question_time_stats. They are
+upserted in the same transaction as each answer and can be rebuilt from
+user_answers with two INSERT ... SELECT statements. An option's correctness
+can change on reimport, so each answer counts as correct or not by its own
+is_correct, and the report takes the option's current flag from answer_options.
+"""
+
+import bisect
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .database import QuestionOptionStats, QuestionTimeStats, dialect_insert
+
+# Upper bounds of time-to-answer buckets, seconds; the last bucket is open
+TIME_BUCKETS = [1, 2, 3, 5, 7, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300, 600]
+
+def time_bucket(seconds: float) -> int:
+    return bisect.bisect_left(TIME_BUCKETS, seconds)
+
+def median_seconds(buckets: Dict[int, int]) -> Optional[float]:
+    """Median time to answer, interpolated inside its bucket"""
+    total = sum(buckets.values())
+    if not total:
+        return None
+    half = total / 2
+    seen = 0
+    for bucket in sorted(buckets):
+        count = buckets[bucket]
+        lower = TIME_BUCKETS[bucket - 1] if bucket > 0 else 0
+        upper = TIME_BUCKETS[bucket] if bucket < len(TIME_BUCKETS) else lower
+        if seen + count >= half:
+            return round(lower + (upper - lower) * (half - seen) / count, 1)
+        seen += count
+    return None
+
+def record_answer(db: Session, test_id: str, question_id: str, option_id: str, is_correct: bool,
+                  elapsed_seconds: Optional[float]) -> None:
+    """Count one answer; the caller commits"""
+    stmt = dialect_insert(db, QuestionOptionStats).values(
+        question_id=question_id, option_id=option_id, test_id=test_id, choices=1,
+        correct_choices=1 if is_correct else 0
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["question_id", "option_id"],
+        set_={
+            "choices": QuestionOptionStats.choices + 1,
+            "correct_choices": QuestionOptionStats.correct_choices + stmt.excluded.correct_choices
+        }
+    ))
+    if elapsed_seconds is None:
+        return
+    stmt = dialect_insert(db, QuestionTimeStats).values(
+        question_id=question_id, bucket=time_bucket(elapsed_seconds), test_id=test_id, answers=1
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["question_id", "bucket"],
+        set_={"answers": QuestionTimeStats.answers + 1}
+    ))
+
+def _seconds_between(later: str, earlier: str, dialect: str) -> str:
+    if dialect == "postgresql":
+        return f"EXTRACT(EPOCH FROM ({later} - {earlier}))"
+    return f"((julianday({later}) - julianday({earlier})) * 86400)"
+
+def rebuild(db: Session) -> Dict[str, int]:
+    """Recompute all counters from user_answers in one pass per table; the caller commits"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Answers recorded meanwhile wait for the rebuild, so none is lost or counted twice
+        db.execute(text("LOCK TABLE question_option_stats, question_time_stats IN EXCLUSIVE MODE"))
+    db.execute(text("DELETE FROM question_option_stats"))
+    db.execute(text("DELETE FROM question_time_stats"))
+
+    # A question belongs to one test; MAX only keeps (question_id, option_id) unique
+    options = db.execute(text("""
+        INSERT INTO question_option_stats (question_id, option_id, test_id, choices, correct_choices)
+        SELECT ua.question_id, ua.chosen_option_id, MAX(qs.test_id), COUNT(*),
+               SUM(CASE WHEN ua.is_correct THEN 1 ELSE 0 END)
+        FROM user_answers ua JOIN quiz_sessions qs ON qs.id = ua.session_id
+        GROUP BY ua.question_id, ua.chosen_option_id
+    """)).rowcount
+
+    # Time to answer: since the previous answer of the session, or since its start
+    elapsed = _seconds_between(
+        "ua.answered_at",
+        "COALESCE(LAG(ua.answered_at) OVER (PARTITION BY ua.session_id ORDER BY ua.id), qs.started_at)",
+        dialect
+    )
+    cases = " ".join(f"WHEN elapsed <= {bound} THEN {i}" for i, bound in enumerate(TIME_BUCKETS))
+    times = db.execute(text(f"""
+        INSERT INTO question_time_stats (question_id, bucket, test_id, answers)
+        SELECT question_id, bucket, test_id, COUNT(*)
+        FROM (
+            SELECT question_id, test_id, CASE {cases} ELSE {len(TIME_BUCKETS)} END AS bucket
+            FROM (
+                SELECT ua.question_id, qs.test_id, {elapsed} AS elapsed
+                FROM user_answers ua JOIN quiz_sessions qs ON qs.id = ua.session_id
+            ) answers
+        ) bucketed
+        GROUP BY question_id, bucket, test_id
+    """)).rowcount
+    return {"option_rows": options, "time_rows": times}
+
+def load(db: Session, test_id: str) -> Tuple[List[Any], List[Any]]:
+    """Counter rows of one test (two indexed reads, independent of history size)"""
+    options = db.query(
+        QuestionOptionStats.question_id, QuestionOptionStats.option_id,
+        QuestionOptionStats.choices, QuestionOptionStats.correct_choices
+    ).filter(QuestionOptionStats.test_id == test_id).all()
+    times = db.query(
+        QuestionTimeStats.question_id, QuestionTimeStats.bucket, QuestionTimeStats.answers
+    ).filter(QuestionTimeStats.test_id == test_id).all()
+    return options, times
+
+def report(questions: Iterable[Any], options: Iterable[Tuple], times: Iterable[Tuple]) -> List[Dict[str, Any]]:
+    """Per-question analytics from counter rows, hardest questions first
+
+    `options` rows are (question_id, option_id, choices, correct_choices),
+    `times` rows are (question_id, bucket, answers).
+    """
+    choices: Dict[str, Dict[str, int]] = {}
+    correct: Dict[str, int] = {}
+    for question_id, option_id, count, correct_count in options:
+        choices.setdefault(question_id, {})[option_id] = count
+        correct[question_id] = correct.get(question_id, 0) + correct_count
+    buckets: Dict[str, Dict[int, int]] = {}
+    for question_id, bucket, count in times:
+        buckets.setdefault(question_id, {})[bucket] = count
+
+    result = []
+    for question in questions:
+        question_choices = choices.get(question.id, {})
+        attempts = sum(question_choices.values())
+        result.append({
+            "question_id": question.id,
+            "title": question.title,
+            "attempts": attempts,
+            "correct": correct.get(question.id, 0),
+            "correct_rate": round(correct.get(question.id, 0) / attempts, 3) if attempts else None,
+            "median_seconds": median_seconds(buckets.get(question.id, {})),
+            "options": [
+                {
+                    "option_id": option.id,
+                    "text": option.text,
+                    "is_correct": option.is_correct,
+                    "choices": question_choices.get(option.id, 0),
+                    "share": round(question_choices.get(option.id, 0) / attempts, 3) if attempts else None
+                }
+                for option in question.options
+            ]
+        })
+    # Unanswered questions go last
+    result.sort(key=lambda q: (q["correct_rate"] is None, q["correct_rate"] or 0))
+    return result
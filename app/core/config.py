@@ -12,10 +12,13 @@ class Settings(BaseModel):
     
     # Bot configuration
     bot_token: str = os.getenv("BOT_TOKEN", "your_bot_token_here").strip()
+    # Custom Bot API server base URL, e.g. a local Bot API server
+    telegram_api_server: str = os.getenv("TELEGRAM_API_SERVER", "").strip()
     
     # API configuration
     api_host: str = os.getenv("API_HOST", "0.0.0.0")
     api_port: int = int(os.getenv("API_PORT", "5000"))
+    api_workers: int = int(os.getenv("API_WORKERS", "1"))
     
     # Admin API key for question management
     admin_api_key: str = os.getenv("ADMIN_API_KEY", "admin_secret_key_123")
@@ -28,6 +31,87 @@ class Settings(BaseModel):
     webhook_enabled: bool = os.getenv("BOT_WEBHOOK_ENABLED", "false").lower() in ("1", "true", "yes")
     webhook_url: str = os.getenv("WEBHOOK_URL", "").strip()
     webhook_path_prefix: str = os.getenv("WEBHOOK_PATH_PREFIX", "/webhook")
+    webhook_workers: int = int(os.getenv("WEBHOOK_WORKERS", "8"))
+    webhook_queue_size: int = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+    webhook_shutdown_timeout: float = float(os.getenv("WEBHOOK_SHUTDOWN_TIMEOUT", "10"))
+    
+    # Cross-process cache invalidation (PostgreSQL LISTEN/NOTIFY)
+    cache_invalidation_enabled: bool = os.getenv("CACHE_INVALIDATION_ENABLED", "true").lower() in ("1", "true", "yes")
+    cache_invalidation_channel: str = os.getenv("CACHE_INVALIDATION_CHANNEL", "cache_invalidation")
+    
+    # Storage read caches (evicted by invalidation events, TTL as fallback)
+    storage_cache_enabled: bool = os.getenv("STORAGE_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    storage_cache_size: int = int(os.getenv("STORAGE_CACHE_SIZE", "10000"))
+    storage_cache_ttl_seconds: int = int(os.getenv("STORAGE_CACHE_TTL_SECONDS", "300"))
+    
+    # Logging: json or text lines written by a background thread; share of DEBUG records kept
+    log_level: str = os.getenv("LOG_LEVEL", "INFO")
+    log_format: str = os.getenv("LOG_FORMAT", "json").lower()
+    log_debug_sample_rate: float = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))
+    
+    # Span tracing (bot handler -> API route -> storage -> SQL); X-Trace-Id links processes
+    tracing_enabled: bool = os.getenv("TRACING_ENABLED", "true").lower() in ("1", "true", "yes")
+    trace_sample_rate: float = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+    trace_buffer_size: int = int(os.getenv("TRACE_BUFFER_SIZE", "20000"))  # spans kept in memory
+    trace_file: str = os.getenv("TRACE_FILE", "")  # JSON lines; each process writes TRACE_FILE.<pid>
+    trace_file_max_bytes: int = int(os.getenv("TRACE_FILE_MAX_BYTES", str(20 * 1024 * 1024)))
+    trace_file_backups: int = int(os.getenv("TRACE_FILE_BACKUPS", "3"))
+    
+    # Per-request query counting: requests and bot updates above this are logged as warnings
+    db_query_warn_threshold: int = int(os.getenv("DB_QUERY_WARN_THRESHOLD", "20"))
+    
+    # Prometheus /metrics of the polling bot process (0 disables; the API always serves /metrics)
+    bot_metrics_port: int = int(os.getenv("BOT_METRICS_PORT", "0"))
+    
+    # Slow query log: statements above the threshold (0 disables), sampled EXPLAIN for SELECTs
+    slow_query_threshold_ms: float = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "200"))
+    slow_query_explain_sample_rate: float = float(os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", "0"))
+    slow_query_log_size: int = int(os.getenv("SLOW_QUERY_LOG_SIZE", "200"))
+    
+    # Health endpoints: counters refreshed in the background, readiness DB check timeout
+    live_counters_refresh_seconds: float = float(os.getenv("LIVE_COUNTERS_REFRESH_SECONDS", "15"))
+    ready_timeout_seconds: float = float(os.getenv("READY_TIMEOUT_SECONDS", "2"))
+    
+    # Gzip API responses larger than this many bytes (0 disables)
+    api_gzip_min_bytes: int = int(os.getenv("API_GZIP_MIN_BYTES", "1000"))
+    
+    # Admin dashboard stats: snapshot refresh interval and days of answers-per-day history
+    admin_stats_refresh_seconds: float = float(os.getenv("ADMIN_STATS_REFRESH_SECONDS", "10"))
+    admin_stats_days: int = int(os.getenv("ADMIN_STATS_DAYS", "30"))
+    
+    # Leaderboard entries kept in memory per test (longer pages are read from the table)
+    leaderboard_size: int = int(os.getenv("LEADERBOARD_SIZE", "100"))
+    
+    # Telegram update deduplication
+    bot_dedup_cache_size: int = int(os.getenv("BOT_DEDUP_CACHE_SIZE", "10000"))
+    # Several API workers share webhook traffic, so claims must be shared too
+    bot_dedup_shared: bool = os.getenv(
+        "BOT_DEDUP_SHARED", "true" if int(os.getenv("API_WORKERS", "1")) > 1 else "false"
+    ).lower() in ("1", "true", "yes")
+    bot_dedup_shared_ttl_seconds: int = int(os.getenv("BOT_DEDUP_SHARED_TTL_SECONDS", "86400"))
+    
+    # Per-user ordered update processing
+    bot_user_concurrency: int = int(os.getenv("BOT_USER_CONCURRENCY", "64"))
+    bot_user_mailbox_size: int = int(os.getenv("BOT_USER_MAILBOX_SIZE", "5"))
+    
+    # Bot next-question prefetch
+    bot_prefetch_enabled: bool = os.getenv("BOT_PREFETCH_ENABLED", "true").lower() in ("1", "true", "yes")
+    bot_prefetch_cache_size: int = int(os.getenv("BOT_PREFETCH_CACHE_SIZE", "10000"))
+    bot_prefetch_ttl_seconds: int = int(os.getenv("BOT_PREFETCH_TTL_SECONDS", "900"))
+    
+    # Rendered question messages kept by the bot
+    bot_render_cache_size: int = int(os.getenv("BOT_RENDER_CACHE_SIZE", "5000"))
+    
+    # User stats cached by the bot
+    bot_stats_cache_size: int = int(os.getenv("BOT_STATS_CACHE_SIZE", "10000"))
+    bot_stats_cache_ttl_seconds: int = int(os.getenv("BOT_STATS_CACHE_TTL_SECONDS", "60"))
+    
+    # Outbound Telegram send scheduler
+    bot_send_scheduler_enabled: bool = os.getenv("BOT_SEND_SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes")
+    bot_send_global_rate: float = float(os.getenv("BOT_SEND_GLOBAL_RATE", "30"))
+    bot_send_per_chat_rate: float = float(os.getenv("BOT_SEND_PER_CHAT_RATE", "1"))
+    bot_send_per_chat_burst: float = float(os.getenv("BOT_SEND_PER_CHAT_BURST", "3"))
+    bot_send_max_retries: int = int(os.getenv("BOT_SEND_MAX_RETRIES", "3"))
     
     class Config:
         case_sensitive = False
@@ -1,7 +1,7 @@
 """Database models and connection setup"""
 
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, Text, ForeignKey
+from sqlalchemy import create_engine, Column, Index, Integer, BigInteger, Float, String, Boolean, DateTime, Text, ForeignKey
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session, relationship
 from sqlalchemy.sql import func
@@ -79,12 +79,15 @@ class Question(Base):
     # Relationships
     test = relationship("Test", back_populates="questions")
     options = relationship("AnswerOption", back_populates="question", cascade="all, delete-orphan")
+    
+    # Keyset pages of one test: WHERE test_id = ? AND id > ? ORDER BY id
+    __table_args__ = (Index("ix_questions_test_id_id", "test_id", "id"),)
 
 class AnswerOption(Base):
     __tablename__ = "answer_options"
     
     id = Column(String, primary_key=True)
-    question_id = Column(String, ForeignKey("questions.id"), nullable=False)
+    question_id = Column(String, ForeignKey("questions.id"), nullable=False, index=True)
     text = Column(Text, nullable=False)
     is_correct = Column(Boolean, nullable=False)
     comment = Column(Text, nullable=False)
@@ -114,7 +117,7 @@ class UserAnswer(Base):
     __tablename__ = "user_answers"
     
     id = Column(Integer, primary_key=True, index=True)
-    session_id = Column(String, ForeignKey("quiz_sessions.id"), nullable=False)
+    session_id = Column(String, ForeignKey("quiz_sessions.id"), nullable=False, index=True)
     user_telegram_id = Column(Integer, ForeignKey("users.telegram_id"), nullable=False)
     question_id = Column(String, nullable=False)
     chosen_option_id = Column(String, nullable=False)
@@ -125,6 +128,51 @@ class UserAnswer(Base):
     session = relationship("QuizSession", back_populates="answers")
     user = relationship("User", back_populates="answers")
 
+class QuestionOptionStats(Base):
+    """Answers per (question, chosen option), kept up to date by add_user_answer"""
+    __tablename__ = "question_option_stats"
+    
+    question_id = Column(String, primary_key=True)
+    option_id = Column(String, primary_key=True)
+    test_id = Column(String, nullable=False, index=True)
+    choices = Column(Integer, nullable=False, default=0)
+    correct_choices = Column(Integer, nullable=False, default=0)  # choices that were correct when answered
+
+class QuestionTimeStats(Base):
+    """Answers per (question, time-to-answer bucket), see app/core/analytics.py"""
+    __tablename__ = "question_time_stats"
+    
+    question_id = Column(String, primary_key=True)
+    bucket = Column(Integer, primary_key=True)
+    test_id = Column(String, nullable=False, index=True)
+    answers = Column(Integer, nullable=False, default=0)
+
+class LeaderboardEntry(Base):
+    """Best finished attempt of a user in a test, upserted by finish_quiz_session"""
+    __tablename__ = "leaderboard_entries"
+    
+    test_id = Column(String, primary_key=True)
+    user_telegram_id = Column(Integer, primary_key=True)
+    full_name = Column(String, nullable=False)
+    score_percent = Column(Float, nullable=False)
+    correct_count = Column(Integer, nullable=False)
+    total_count = Column(Integer, nullable=False)
+    duration_seconds = Column(Float, nullable=False)
+    achieved_at = Column(DateTime(timezone=True), nullable=False)
+    
+    # Ranking order: best score, then fastest, then earliest
+    __table_args__ = (
+        Index("ix_leaderboard_rank", test_id, score_percent.desc(), duration_seconds, achieved_at),
+    )
+
+class ScoreHistogram(Base):
+    """Finished sessions per (test, whole score percent), see app/core/histograms.py"""
+    __tablename__ = "score_histograms"
+    
+    test_id = Column(String, primary_key=True)
+    bucket = Column(Integer, primary_key=True)  # 0..100
+    sessions = Column(Integer, nullable=False, default=0)
+
 class UserState(Base):
     __tablename__ = "user_states"
     
@@ -133,6 +181,20 @@ class UserState(Base):
     data = Column(Text, nullable=True)  # JSON string with state data
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
+class ProcessedUpdate(Base):
+    __tablename__ = "processed_updates"
+    
+    update_id = Column(BigInteger, primary_key=True)  # Telegram update_id
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+
+def dialect_insert(db: Session, model):
+    """INSERT supporting ON CONFLICT for the session's database"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
 def get_db() -> Session:
     """Get database session"""
     db = SessionLocal()
@@ -1,22 +1,113 @@
 """PostgreSQL storage implementation"""
 
 import json
+import time
 import uuid
 import random
-from typing import Dict, List, Optional, Any
-from datetime import datetime
-from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import desc
+from typing import Dict, List, Optional, Any, Set, Tuple
+from datetime import datetime, timezone
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import desc, func
 
 from .database import (
     get_db, Test as DBTest, User as DBUser, Question as DBQuestion, 
     AnswerOption as DBAnswerOption, QuizSession as DBQuizSession, 
     UserAnswer as DBUserAnswer, SessionLocal
 )
+from . import analytics, histograms, leaderboard
 from .models import QuestionInput
+from .cache import TTLCache
+from .config import settings
+from .invalidation import bus
+from .tracing import traced_methods
 
+def _seconds_since(moment: Optional[datetime]) -> Optional[float]:
+    if moment is None:
+        return None
+    if moment.tzinfo is None:  # SQLite keeps naive UTC
+        moment = moment.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - moment).total_seconds()
+
+@traced_methods("storage")
 class PostgreSQLStorage:
-    """PostgreSQL storage implementation"""
+    """PostgreSQL storage implementation
+    
+    Test catalog, test content and user stats are cached in process.
+    Writers publish invalidation events so every process evicts stale
+    entries; the TTL covers events missed while the listener reconnects.
+    """
+    
+    def __init__(self):
+        size = settings.storage_cache_size
+        ttl = settings.storage_cache_ttl_seconds
+        self.cache_enabled = settings.storage_cache_enabled
+        self._tests = TTLCache(maxsize=size, ttl=ttl)  # test_id -> DBTest, "*" -> all tests
+        self._test_questions = TTLCache(maxsize=size, ttl=ttl)  # test_id -> [DBQuestion]
+        self._question_counts = TTLCache(maxsize=1, ttl=ttl)  # "*" -> {test_id: count}
+        self._questions = TTLCache(maxsize=size, ttl=ttl)  # question_id -> DBQuestion
+        self._options = TTLCache(maxsize=size, ttl=ttl)  # option_id -> DBAnswerOption
+        self._user_stats = TTLCache(maxsize=size, ttl=ttl)  # telegram_id -> stats dict
+        # Kept current by quiz_finished events; the TTL covers missed ones
+        self.leaderboards = leaderboard.Leaderboards(settings.leaderboard_size, ttl=ttl)
+        self.histograms = histograms.ScoreHistograms(ttl=ttl)
+        
+        bus.subscribe("catalog", self._on_catalog_changed)
+        bus.subscribe("test_content", self._on_test_content_changed)
+        bus.subscribe("user_stats", self._on_user_stats_changed)
+        bus.subscribe("quiz_finished", self.leaderboards.on_finished)
+        bus.subscribe("quiz_finished", self.histograms.on_finished)
+        bus.on_reconnect(self.clear_caches)
+    
+    # Cache invalidation
+    def _on_catalog_changed(self, key: Optional[str], version: Optional[str]):
+        self._tests.clear()
+        self._question_counts.clear()
+    
+    def _on_test_content_changed(self, key: Optional[str], version: Optional[str]):
+        if key is None:
+            self._test_questions.clear()
+        else:
+            self._test_questions.pop(key)
+        self._question_counts.clear()
+        # Question and option entries are not indexed by test
+        self._questions.clear()
+        self._options.clear()
+    
+    def _on_user_stats_changed(self, key: Optional[str], version: Optional[str]):
+        self._user_stats.pop(int(key))
+    
+    def clear_caches(self):
+        """Drop all cached entries"""
+        for cache in (self._tests, self._test_questions, self._question_counts, self._questions, self._options, self._user_stats):
+            cache.clear()
+        self.leaderboards.clear()
+        self.histograms.clear()
+    
+    def _cached(self, cache: TTLCache, key: Any, load):
+        """Return cached value or load and cache it (misses are not cached)"""
+        if not self.cache_enabled:
+            return load()
+        value = cache.get(key)
+        if value is None:
+            value = load()
+            if value is not None:
+                cache.set(key, value)
+        return value
+    
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Size and hit/miss counters of storage caches"""
+        caches = {
+            "tests": self._tests,
+            "test_questions": self._test_questions,
+            "question_counts": self._question_counts,
+            "questions": self._questions,
+            "options": self._options,
+            "user_stats": self._user_stats
+        }
+        return {
+            name: {"size": len(cache), "hits": cache.hits, "misses": cache.misses}
+            for name, cache in caches.items()
+        }
     
     def get_db(self) -> Session:
         """Get database session"""
@@ -38,6 +129,7 @@ class PostgreSQLStorage:
                     last_name=last_name
                 )
                 db.add(user)
+            bus.publish("user_stats", telegram_id, db=db)
             db.commit()
             db.refresh(user)
             return user
@@ -63,6 +155,7 @@ class PostgreSQLStorage:
                 description=description
             )
             db.add(test)
+            bus.publish("catalog", test_id, version=time.time_ns(), db=db)
             db.commit()
             db.refresh(test)
             return test
@@ -71,6 +164,9 @@ class PostgreSQLStorage:
     
     def get_test(self, test_id: str) -> Optional[DBTest]:
         """Get test by ID"""
+        return self._cached(self._tests, test_id, lambda: self._load_test(test_id))
+    
+    def _load_test(self, test_id: str) -> Optional[DBTest]:
         db = self.get_db()
         try:
             return db.query(DBTest).filter(DBTest.id == test_id).first()
@@ -79,6 +175,9 @@ class PostgreSQLStorage:
     
     def get_all_tests(self) -> List[DBTest]:
         """Get all tests"""
+        return self._cached(self._tests, "*", self._load_all_tests)
+    
+    def _load_all_tests(self) -> List[DBTest]:
         db = self.get_db()
         try:
             return db.query(DBTest).all()
@@ -92,6 +191,7 @@ class PostgreSQLStorage:
         try:
             db.query(DBAnswerOption).delete()
             db.query(DBQuestion).delete()
+            bus.publish("test_content", None, version=time.time_ns(), db=db)
             db.commit()
         finally:
             db.close()
@@ -120,12 +220,28 @@ class PostgreSQLStorage:
                 )
                 db.add(option)
             
+            bus.publish("test_content", test_id, version=time.time_ns(), db=db)
             db.commit()
         finally:
             db.close()
     
+    def get_question_counts(self) -> Dict[str, int]:
+        """Number of questions per test in one query"""
+        return self._cached(self._question_counts, "*", self._load_question_counts)
+    
+    def _load_question_counts(self) -> Dict[str, int]:
+        db = self.get_db()
+        try:
+            rows = db.query(DBQuestion.test_id, func.count(DBQuestion.id)).group_by(DBQuestion.test_id).all()
+            return {test_id: count for test_id, count in rows}
+        finally:
+            db.close()
+    
     def get_question(self, question_id: str) -> Optional[DBQuestion]:
         """Get question by ID"""
+        return self._cached(self._questions, question_id, lambda: self._load_question(question_id))
+    
+    def _load_question(self, question_id: str) -> Optional[DBQuestion]:
         db = self.get_db()
         try:
             question = db.query(DBQuestion).options(joinedload(DBQuestion.options)).filter(DBQuestion.id == question_id).first()
@@ -142,8 +258,28 @@ class PostgreSQLStorage:
         finally:
             db.close()
     
+    def get_questions_page(self, after_id: Optional[str], limit: int, test_id: Optional[str] = None,
+                           with_options: bool = True) -> List[DBQuestion]:
+        """Next `limit` questions ordered by ID after `after_id` (keyset pagination)"""
+        db = self.get_db()
+        try:
+            query = db.query(DBQuestion)
+            if with_options:
+                # One IN query for the page instead of a join that multiplies rows
+                query = query.options(selectinload(DBQuestion.options))
+            if test_id is not None:
+                query = query.filter(DBQuestion.test_id == test_id)
+            if after_id is not None:
+                query = query.filter(DBQuestion.id > after_id)
+            return query.order_by(DBQuestion.id).limit(limit).all()
+        finally:
+            db.close()
+    
     def get_questions_by_test(self, test_id: str) -> List[DBQuestion]:
         """Get all questions for a specific test"""
+        return self._cached(self._test_questions, test_id, lambda: self._load_questions_by_test(test_id))
+    
+    def _load_questions_by_test(self, test_id: str) -> List[DBQuestion]:
         db = self.get_db()
         try:
             questions = db.query(DBQuestion).options(joinedload(DBQuestion.options)).filter(DBQuestion.test_id == test_id).all()
@@ -161,6 +297,9 @@ class PostgreSQLStorage:
     
     def get_answer_option(self, option_id: str) -> Optional[DBAnswerOption]:
         """Get answer option by ID"""
+        return self._cached(self._options, option_id, lambda: self._load_answer_option(option_id))
+    
+    def _load_answer_option(self, option_id: str) -> Optional[DBAnswerOption]:
         db = self.get_db()
         try:
             return db.query(DBAnswerOption).filter(DBAnswerOption.id == option_id).first()
@@ -207,29 +346,142 @@ class PostgreSQLStorage:
         db = self.get_db()
         try:
             db.query(DBQuizSession).filter(DBQuizSession.id == session_id).update(updates)
+            if "current_question_index" in updates:
+                bus.publish("quiz_session", session_id, version=updates["current_question_index"], db=db)
             db.commit()
         finally:
             db.close()
     
     def finish_quiz_session(self, session_id: str) -> Optional[DBQuizSession]:
-        """Mark session as finished"""
+        """Mark session as finished; the first finish updates the leaderboard and score histogram"""
         db = self.get_db()
         try:
-            session = db.query(DBQuizSession).filter(DBQuizSession.id == session_id).first()
+            # Decided in one statement: of two racing finishes only one sets finished_at,
+            # the other waits for its row lock and then matches nothing
+            first_finish = db.query(DBQuizSession).filter(
+                DBQuizSession.id == session_id, DBQuizSession.finished_at.is_(None)
+            ).update({"finished_at": datetime.now()}, synchronize_session=False) == 1
+            session = db.query(DBQuizSession).options(joinedload(DBQuizSession.user)).filter(
+                DBQuizSession.id == session_id
+            ).first()
             if session:
-                session.finished_at = datetime.now()
+                bus.publish("user_stats", session.user_telegram_id, version=session_id, db=db)
+                # A repeated finish must not count the attempt twice
+                if first_finish:
+                    self._record_finish(db, session)
                 db.commit()
                 db.refresh(session)
             return session
         finally:
             db.close()
     
+    def _record_finish(self, db: Session, session: DBQuizSession) -> None:
+        standing = leaderboard.Standing(
+            telegram_id=session.user_telegram_id,
+            full_name=session.user.full_name,
+            score_percent=round(session.correct_count / session.total_count * 100, 1) if session.total_count else 0.0,
+            correct_count=session.correct_count,
+            total_count=session.total_count,
+            duration_seconds=round(_seconds_since(session.started_at) or 0.0, 1),
+            achieved_at=datetime.now(timezone.utc).isoformat()
+        )
+        leaderboard.record(db, session.test_id, standing)
+        if session.total_count:
+            histograms.record(db, session.test_id, histograms.bucket_for(session.correct_count, session.total_count))
+        # Every process, this one included, applies the finish to its top N and histograms;
+        # the session id lets a histogram loaded after the commit skip it
+        bus.publish("quiz_finished", session.test_id, version=standing.to_event(session.id), db=db)
+    
+    def get_score_percentile(self, test_id: str, correct_count: int, total_count: int,
+                             exclude_self: bool = False) -> Optional[float]:
+        """Share of finished sessions of the test that scored lower, percent"""
+        if not total_count:
+            return None
+        if self.cache_enabled:
+            counts = self.histograms.get(test_id, lambda: self._load_histogram(test_id))
+        else:
+            counts = self._load_histogram_counts(test_id)
+        return histograms.percentile(counts, histograms.bucket_for(correct_count, total_count), exclude_self)
+    
+    def _load_histogram(self, test_id: str) -> Tuple[List[int], Set[str]]:
+        db = self.get_db()
+        try:
+            return histograms.load(db, test_id)
+        finally:
+            db.close()
+    
+    def _load_histogram_counts(self, test_id: str) -> List[int]:
+        db = self.get_db()
+        try:
+            return histograms.load_counts(db, test_id)
+        finally:
+            db.close()
+    
+    def rebuild_score_histograms(self) -> Dict[str, int]:
+        """Recompute score histograms from all finished sessions"""
+        db = self.get_db()
+        try:
+            rows = histograms.rebuild(db)
+            bus.publish("quiz_finished", db=db)  # other processes reload on commit
+            db.commit()
+            self.histograms.clear()
+            return {"histogram_rows": rows}
+        finally:
+            db.close()
+    
+    def rebuild_leaderboards(self) -> Dict[str, int]:
+        """Recompute leaderboard entries from all finished sessions"""
+        db = self.get_db()
+        try:
+            rows = leaderboard.rebuild(db)
+            bus.publish("quiz_finished", db=db)  # other processes reload on commit
+            db.commit()
+            self.leaderboards.clear()
+            return {"leaderboard_rows": rows}
+        finally:
+            db.close()
+    
+    def get_leaderboard(self, test_id: str, limit: int) -> List[leaderboard.Standing]:
+        """Best standings of a test in ranking order"""
+        if not self.cache_enabled or limit > self.leaderboards.size:
+            return self._load_leaderboard(test_id, limit)
+        return self.leaderboards.get(test_id, lambda size: self._load_leaderboard(test_id, size)).entries[:limit]
+    
+    def _load_leaderboard(self, test_id: str, limit: int) -> List[leaderboard.Standing]:
+        db = self.get_db()
+        try:
+            return leaderboard.load_top(db, test_id, limit)
+        finally:
+            db.close()
+    
+    def get_leaderboard_rank(self, test_id: str, telegram_id: int) -> Optional[Tuple[int, leaderboard.Standing]]:
+        """Rank and best standing of a user in a test (None if never finished it)"""
+        if self.cache_enabled:
+            board = self.leaderboards.get(test_id, lambda size: self._load_leaderboard(test_id, size))
+            rank = board.rank_of(telegram_id)
+            if rank is not None:
+                return rank, board.entries[rank - 1]
+            if len(board.entries) < board.size:
+                return None  # the whole board is cached and the user is not on it
+        db = self.get_db()
+        try:
+            return leaderboard.load_rank(db, test_id, telegram_id)
+        finally:
+            db.close()
+    
     # Answer methods
     def add_user_answer(self, session_id: str, user_telegram_id: int, question_id: str, 
                        chosen_option_id: str, is_correct: bool):
-        """Add user answer"""
+        """Add user answer and update per-question analytics counters"""
         db = self.get_db()
         try:
+            last_answered_at = db.query(func.max(DBUserAnswer.answered_at)).filter(
+                DBUserAnswer.session_id == session_id
+            ).scalar_subquery()
+            session, last_answered_at = db.query(DBQuizSession, last_answered_at).filter(
+                DBQuizSession.id == session_id
+            ).first() or (None, None)
+            
             answer = DBUserAnswer(
                 session_id=session_id,
                 user_telegram_id=user_telegram_id,
@@ -239,16 +491,91 @@ class PostgreSQLStorage:
             )
             db.add(answer)
             
-            # Update session correct count if answer is correct
-            if is_correct:
-                session = db.query(DBQuizSession).filter(DBQuizSession.id == session_id).first()
-                if session:
+            if session:
+                # Update session correct count if answer is correct
+                if is_correct:
                     session.correct_count += 1
+                elapsed = _seconds_since(last_answered_at or session.started_at)
+                analytics.record_answer(db, session.test_id, question_id, chosen_option_id, is_correct, elapsed)
             
             db.commit()
         finally:
             db.close()
     
+    def get_question_analytics(self, test_id: str) -> List[Dict[str, Any]]:
+        """Per-question analytics of a test from the counter tables"""
+        db = self.get_db()
+        try:
+            options, times = analytics.load(db, test_id)
+        finally:
+            db.close()
+        return analytics.report(self.get_questions_by_test(test_id), options, times)
+    
+    def rebuild_question_analytics(self) -> Dict[str, int]:
+        """Recompute analytics counters from all recorded answers"""
+        db = self.get_db()
+        try:
+            result = analytics.rebuild(db)
+            db.commit()
+            return result
+        finally:
+            db.close()
+    
+    def count_active_sessions(self) -> int:
+        """Number of sessions not finished yet"""
+        db = self.get_db()
+        try:
+            return db.query(func.count(DBQuizSession.id)).filter(DBQuizSession.finished_at.is_(None)).scalar()
+        finally:
+            db.close()
+    
+    def get_live_counts(self) -> Dict[str, int]:
+        """Questions, users and active sessions in one round trip"""
+        db = self.get_db()
+        try:
+            row = db.query(
+                db.query(func.count(DBQuestion.id)).scalar_subquery(),
+                db.query(func.count(DBUser.id)).scalar_subquery(),
+                db.query(func.count(DBQuizSession.id)).filter(DBQuizSession.finished_at.is_(None)).scalar_subquery()
+            ).one()
+            return {"questions_count": row[0], "users_count": row[1], "active_sessions": row[2]}
+        finally:
+            db.close()
+    
+    def get_session_counts_by_test(self) -> Dict[str, Dict[str, int]]:
+        """Started and finished sessions per test in one GROUP BY"""
+        db = self.get_db()
+        try:
+            rows = db.query(
+                DBQuizSession.test_id,
+                func.count(DBQuizSession.id),
+                func.count(DBQuizSession.finished_at)
+            ).group_by(DBQuizSession.test_id).all()
+            return {test_id: {"attempts": attempts, "finished": finished} for test_id, attempts, finished in rows}
+        finally:
+            db.close()
+    
+    def get_max_answer_id(self) -> int:
+        """Highest user_answers.id (0 when there are none)"""
+        db = self.get_db()
+        try:
+            return db.query(func.max(DBUserAnswer.id)).scalar() or 0
+        finally:
+            db.close()
+    
+    def count_answers_by_day(self, after_id: int, settled_id: int) -> List[tuple]:
+        """(day, id <= settled_id, count) for answers with id > after_id; reads only the id range"""
+        db = self.get_db()
+        try:
+            day = func.date(DBUserAnswer.answered_at)
+            settled = DBUserAnswer.id <= settled_id
+            rows = db.query(day, settled, func.count(DBUserAnswer.id)).filter(
+                DBUserAnswer.id > after_id
+            ).group_by(day, settled).all()
+            return [(str(d), bool(is_settled), count) for d, is_settled, count in rows]
+        finally:
+            db.close()
+    
     def get_user_sessions(self, telegram_id: int) -> List[DBQuizSession]:
         """Get all sessions for a user"""
         db = self.get_db()
@@ -260,7 +587,20 @@ class PostgreSQLStorage:
             db.close()
     
     def get_user_stats(self, telegram_id: int) -> Dict[str, Any]:
-        """Get user statistics"""
+        """Get user statistics with the percentile rank of the last result"""
+        stats = self._cached(self._user_stats, telegram_id, lambda: self._load_user_stats(telegram_id) or None) or {}
+        last = stats.get("last_session")
+        if not last:
+            return stats
+        # Not cached with the stats: other users' finishes move it
+        return {
+            **stats,
+            "last_score_percentile": self.get_score_percentile(
+                last["test_id"], last["correct_count"], last["total_count"], exclude_self=True
+            )
+        }
+    
+    def _load_user_stats(self, telegram_id: int) -> Dict[str, Any]:
         db = self.get_db()
         try:
             user = db.query(DBUser).filter(DBUser.telegram_id == telegram_id).first()
@@ -284,10 +624,17 @@ class PostgreSQLStorage:
             
             # Calculate scores
             scores = []
+            last_session = None
             for session in sessions:
                 if session.total_count > 0:
                     score = (session.correct_count / session.total_count) * 100
                     scores.append(score)
+                    if last_session is None:
+                        last_session = {
+                            "test_id": session.test_id,
+                            "correct_count": session.correct_count,
+                            "total_count": session.total_count
+                        }
             
             last_score = scores[0] if scores else 0  # First is latest due to ORDER BY DESC
             best_score = max(scores) if scores else 0
@@ -298,7 +645,8 @@ class PostgreSQLStorage:
                 "registered_at": user.registered_at.isoformat(),
                 "attempts": len(sessions),
                 "last_score_percent": round(last_score, 1),
-                "best_score_percent": round(best_score, 1)
+                "best_score_percent": round(best_score, 1),
+                "last_session": last_session
             }
         finally:
             db.close()
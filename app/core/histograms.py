@@ -0,0 +1,131 @@
+"""Per-test score histograms for percentile ranks
+
+Every finished session adds one to its test's bucket (whole percent,
+0..100) in score_histograms, in the same transaction as the finish. Each
+process keeps the histograms of the tests it has served and applies
+finishes from the invalidation bus, so a percentile is a sum over 101
+buckets held in memory.
+
+Histograms are reloaded after a TTL in case events were missed. A finish
+can commit before a process loads a histogram while its event arrives
+after the load. The load therefore also reads the sessions
+finished just before it, and their events are not counted again.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .database import QuizSession, ScoreHistogram, dialect_insert
+
+BUCKETS = 101
+
+# Finishes whose events may still be on their way when a histogram is loaded
+RECENT_SECONDS = 600
+
+def bucket_for(correct_count: int, total_count: int) -> int:
+    """Whole percent, floored the same way as the rebuild SQL"""
+    return correct_count * 100 // total_count
+
+class ScoreHistograms:
+    """Histograms of this process, loaded per test on first use and after `ttl` seconds"""
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._counts: Dict[str, List[int]] = {}
+        self._loaded_sessions: Dict[str, Set[str]] = {}  # test_id -> recent finishes in the loaded counts
+        self._loaded_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, test_id: str, load: Callable[[], Tuple[List[int], Set[str]]]) -> List[int]:
+        with self._lock:
+            counts = self._counts.get(test_id)
+            now = time.monotonic()
+            if counts is None or now - self._loaded_at[test_id] > self.ttl:
+                counts, self._loaded_sessions[test_id] = load()
+                self._counts[test_id] = counts
+                self._loaded_at[test_id] = now
+            return counts
+
+    def add(self, test_id: str, bucket: int, session_id: Optional[str] = None) -> None:
+        """Count a finish; histograms not loaded yet will read it from the table"""
+        with self._lock:
+            counts = self._counts.get(test_id)
+            if counts is None:
+                return
+            loaded = self._loaded_sessions.get(test_id)
+            if loaded and session_id in loaded:
+                loaded.discard(session_id)  # already in the loaded counts
+                return
+            counts[bucket] += 1
+
+    def on_finished(self, key: Optional[str], version: Optional[str]) -> None:
+        """Invalidation bus handler for "quiz_finished" (version from Standing.to_event)"""
+        if key is None or version is None:
+            self.clear()
+            return
+        standing = json.loads(version)
+        if standing["total_count"]:
+            self.add(key, bucket_for(standing["correct_count"], standing["total_count"]), standing.get("session_id"))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._counts.clear()
+            self._loaded_sessions.clear()
+            self._loaded_at.clear()
+
+def percentile(counts: List[int], bucket: int, exclude_self: bool = False) -> Optional[float]:
+    """Share of finished sessions with a lower score, percent
+
+    With `exclude_self` the session being ranked is already counted in
+    `counts` and is left out of the total.
+    """
+    total = sum(counts) - (1 if exclude_self else 0)
+    if total <= 0:
+        return None
+    return round(sum(counts[:bucket]) * 100 / total, 1)
+
+def record(db: Session, test_id: str, bucket: int) -> None:
+    """Count one finished session; the caller commits"""
+    stmt = dialect_insert(db, ScoreHistogram).values(test_id=test_id, bucket=bucket, sessions=1)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["test_id", "bucket"],
+        set_={"sessions": ScoreHistogram.sessions + 1}
+    ))
+
+def load_counts(db: Session, test_id: str) -> List[int]:
+    counts = [0] * BUCKETS
+    rows = db.query(ScoreHistogram.bucket, ScoreHistogram.sessions).filter(ScoreHistogram.test_id == test_id).all()
+    for bucket, sessions in rows:
+        counts[bucket] = sessions
+    return counts
+
+def load(db: Session, test_id: str) -> Tuple[List[int], Set[str]]:
+    """Counts of a test and the sessions finished in the last RECENT_SECONDS, from one snapshot"""
+    if db.get_bind().dialect.name == "postgresql":
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    counts = load_counts(db, test_id)
+    recent = db.query(QuizSession.id).filter(
+        QuizSession.test_id == test_id,
+        QuizSession.finished_at >= datetime.now() - timedelta(seconds=RECENT_SECONDS)
+    ).all()
+    return counts, {session_id for session_id, in recent}
+
+def rebuild(db: Session) -> int:
+    """Recompute all histograms from finished sessions in one pass; the caller commits"""
+    if db.get_bind().dialect.name == "postgresql":
+        # Finishes recorded meanwhile wait for the rebuild, so none is lost or counted twice
+        db.execute(text("LOCK TABLE score_histograms IN EXCLUSIVE MODE"))
+    db.execute(text("DELETE FROM score_histograms"))
+    return db.execute(text("""
+        INSERT INTO score_histograms (test_id, bucket, sessions)
+        SELECT test_id, correct_count * 100 / total_count, COUNT(*)
+        FROM quiz_sessions
+        WHERE finished_at IS NOT NULL AND total_count > 0
+        GROUP BY test_id, correct_count * 100 / total_count
+    """)).rowcount
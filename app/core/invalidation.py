@@ -0,0 +1,179 @@
+"""Cross-process cache invalidation over PostgreSQL LISTEN/NOTIFY"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, select as sql_select
+from sqlalchemy.orm import Session
+
+from .config import settings
+from .database import engine
+
+logger = logging.getLogger(__name__)
+
+# handler(key, version)
+Handler = Callable[[Optional[str], Optional[str]], None]
+
+class InvalidationBus:
+    """Publishes invalidation events and delivers them to subscribed caches
+
+    Events are delivered to local subscribers immediately and sent to other
+    processes with NOTIFY. Each process listens on one dedicated connection
+    in a background thread; when that connection is lost, reconnect
+    handlers run so caches can drop everything they might have missed.
+    """
+
+    def __init__(self, channel: str, enabled: bool):
+        self.channel = channel
+        self.enabled = enabled and engine.dialect.name == "postgresql"
+        self.origin = uuid.uuid4().hex[:12]
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._reconnect_handlers: List[Callable[[], None]] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        # Metrics
+        self.published = 0
+        self.received = 0
+        self.reconnects = 0
+
+    def subscribe(self, entity: str, handler: Handler) -> None:
+        """Call handler(key, version) on every event for the entity"""
+        self._handlers[entity].append(handler)
+
+    def on_reconnect(self, handler: Callable[[], None]) -> None:
+        """Call handler after the listener reconnects and may have missed events"""
+        self._reconnect_handlers.append(handler)
+
+    def publish(self, entity: str, key: Any = None, version: Any = None, db: Optional[Session] = None) -> None:
+        """Invalidate entity locally and in other processes
+
+        With `db` the NOTIFY joins its transaction and is sent on commit,
+        so call it before `db.commit()`.
+        """
+        key = None if key is None else str(key)
+        version = None if version is None else str(version)
+        self._deliver(entity, key, version)
+        self.published += 1
+
+        if not self.enabled:
+            return
+
+        payload = json.dumps({"o": self.origin, "e": entity, "k": key, "v": version})
+        statement = sql_select(func.pg_notify(self.channel, payload))
+        try:
+            if db is not None:
+                db.execute(statement)
+            else:
+                with engine.begin() as conn:
+                    conn.execute(statement)
+        except Exception as e:
+            logger.error(f"Failed to publish invalidation {entity}:{key}: {e}")
+
+    def _deliver(self, entity: str, key: Optional[str], version: Optional[str]) -> None:
+        for handler in self._handlers.get(entity, ()):
+            try:
+                handler(key, version)
+            except Exception as e:
+                logger.error(f"Invalidation handler for {entity} failed: {e}")
+
+    def _dispatch(self, callback: Callable, *args) -> None:
+        """Run callback on the owning event loop if there is one"""
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(callback, *args)
+        else:
+            callback(*args)
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Start listening for events from other processes"""
+        if not self.enabled or self._thread is not None:
+            return
+        self._loop = loop
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._listen_forever, name="invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the listener thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _listen_forever(self) -> None:
+        first = True
+        while not self._stop.is_set():
+            try:
+                if not first:
+                    self.reconnects += 1
+                    for handler in self._reconnect_handlers:
+                        self._dispatch(handler)
+                first = False
+                self._listen()
+            except Exception as e:
+                logger.error(f"Invalidation listener error: {e}")
+                self._stop.wait(5)
+
+    def _listen(self) -> None:
+        # Dedicated connection outside of the pool
+        connection = engine.raw_connection()
+        connection.detach()
+        raw = connection.dbapi_connection
+        try:
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f"LISTEN {self.channel}")
+            logger.info(f"Listening for cache invalidations on '{self.channel}'")
+
+            last_ping = time.monotonic()
+            while not self._stop.is_set():
+                if select.select([raw], [], [], 1.0) == ([], [], []):
+                    # Detect dead connections while idle
+                    if time.monotonic() - last_ping > 30:
+                        with raw.cursor() as cursor:
+                            cursor.execute("SELECT 1")
+                        last_ping = time.monotonic()
+                    continue
+
+                raw.poll()
+                while raw.notifies:
+                    notify = raw.notifies.pop(0)
+                    self._handle_payload(notify.payload)
+        finally:
+            connection.close()
+
+    def _handle_payload(self, payload: str) -> None:
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Malformed invalidation payload: {payload[:200]}")
+            return
+
+        if event.get("o") == self.origin:
+            return  # already delivered locally
+        self.received += 1
+        self._dispatch(self._deliver, event.get("e"), event.get("k"), event.get("v"))
+
+    def stats(self) -> Dict[str, Any]:
+        """Bus counters"""
+        return {
+            "enabled": self.enabled,
+            "listening": self._thread is not None and self._thread.is_alive(),
+            "published": self.published,
+            "received": self.received,
+            "reconnects": self.reconnects
+        }
+
+# Global invalidation bus
+bus = InvalidationBus(
+    channel=settings.cache_invalidation_channel,
+    enabled=settings.cache_invalidation_enabled
+)
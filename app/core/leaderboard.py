@@ -0,0 +1,215 @@
+"""Per-test leaderboards: best attempt per user, ranked by score, then time
+
+The leaderboard_entries table is the projection every process can read.
+It is upserted when a session finishes and can be rebuilt from
+quiz_sessions with one INSERT ... SELECT. Each process also keeps the top N
+entries of the tests it has served. Finishes reach it over the
+invalidation bus, so reading the top of a board never touches the database.
+Boards are reloaded after a TTL in case events were missed.
+"""
+
+import json
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, or_, text
+from sqlalchemy.orm import Session
+
+from .database import LeaderboardEntry, dialect_insert
+
+@dataclass
+class Standing:
+    """A user's best attempt in a test"""
+    telegram_id: int
+    full_name: str
+    score_percent: float
+    correct_count: int
+    total_count: int
+    duration_seconds: float
+    achieved_at: str  # ISO timestamp
+
+    def sort_key(self) -> Tuple[float, float, str]:
+        return (-self.score_percent, self.duration_seconds, self.achieved_at)
+
+    def to_event(self, session_id: str) -> str:
+        """Version of the quiz_finished event: the standing and its session as JSON"""
+        return json.dumps({**asdict(self), "session_id": session_id})
+
+    @classmethod
+    def from_row(cls, row: LeaderboardEntry) -> "Standing":
+        return cls(
+            telegram_id=row.user_telegram_id,
+            full_name=row.full_name,
+            score_percent=row.score_percent,
+            correct_count=row.correct_count,
+            total_count=row.total_count,
+            duration_seconds=row.duration_seconds,
+            achieved_at=row.achieved_at.isoformat()
+        )
+
+class TopN:
+    """At most `size` best standings of one test, one per user
+
+    A user's best attempt only ever improves, so a standing that drops out
+    of the top never has to come back except through a new offer.
+    """
+
+    def __init__(self, size: int, standings: List[Standing]):
+        self.size = size
+        self.entries = sorted(standings, key=Standing.sort_key)[:size]
+
+    def offer(self, standing: Standing) -> None:
+        entries = [entry for entry in self.entries if entry.telegram_id != standing.telegram_id]
+        if len(entries) < len(self.entries):
+            current = next(entry for entry in self.entries if entry.telegram_id == standing.telegram_id)
+            if current.sort_key() <= standing.sort_key():
+                return
+        elif len(entries) >= self.size and standing.sort_key() >= entries[-1].sort_key():
+            return
+        # Readers hold no lock, so the list is replaced rather than changed in place
+        self.entries = sorted(entries + [standing], key=Standing.sort_key)[:self.size]
+
+    def rank_of(self, telegram_id: int) -> Optional[int]:
+        for i, entry in enumerate(self.entries):
+            if entry.telegram_id == telegram_id:
+                return i + 1
+        return None
+
+class Leaderboards:
+    """Top-N boards of this process, loaded per test on first read and after `ttl` seconds"""
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self._boards: Dict[str, TopN] = {}
+        self._loaded_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def get(self, test_id: str, load: Callable[[int], List[Standing]]) -> TopN:
+        with self._lock:
+            board = self._boards.get(test_id)
+            now = time.monotonic()
+            if board is None or now - self._loaded_at[test_id] > self.ttl:
+                # Loaded under the lock so an offer cannot slip in between
+                board = self._boards[test_id] = TopN(self.size, load(self.size))
+                self._loaded_at[test_id] = now
+            return board
+
+    def offer(self, test_id: str, standing: Standing) -> None:
+        """Apply a finish; boards not loaded yet will read it from the table"""
+        with self._lock:
+            board = self._boards.get(test_id)
+            if board is not None:
+                board.offer(standing)
+
+    def on_finished(self, key: Optional[str], version: Optional[str]) -> None:
+        """Invalidation bus handler: key is the test, version from Standing.to_event"""
+        if key is None or version is None:
+            self.clear()
+            return
+        event = json.loads(version)
+        event.pop("session_id", None)
+        self.offer(key, Standing(**event))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._boards.clear()
+            self._loaded_at.clear()
+
+def _better_than(standing: Standing):
+    """SQL condition: entries ranked above `standing`"""
+    return or_(
+        LeaderboardEntry.score_percent > standing.score_percent,
+        and_(
+            LeaderboardEntry.score_percent == standing.score_percent,
+            or_(
+                LeaderboardEntry.duration_seconds < standing.duration_seconds,
+                and_(
+                    LeaderboardEntry.duration_seconds == standing.duration_seconds,
+                    LeaderboardEntry.achieved_at < datetime.fromisoformat(standing.achieved_at)
+                )
+            )
+        )
+    )
+
+def record(db: Session, test_id: str, standing: Standing) -> None:
+    """Upsert the standing if it beats the user's best; the caller commits"""
+    values = {
+        "test_id": test_id,
+        "user_telegram_id": standing.telegram_id,
+        "full_name": standing.full_name,
+        "score_percent": standing.score_percent,
+        "correct_count": standing.correct_count,
+        "total_count": standing.total_count,
+        "duration_seconds": standing.duration_seconds,
+        "achieved_at": datetime.fromisoformat(standing.achieved_at)
+    }
+    stmt = dialect_insert(db, LeaderboardEntry).values(**values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["test_id", "user_telegram_id"],
+        set_={name: stmt.excluded[name] for name in values if name not in ("test_id", "user_telegram_id")},
+        where=or_(
+            stmt.excluded.score_percent > LeaderboardEntry.score_percent,
+            and_(
+                stmt.excluded.score_percent == LeaderboardEntry.score_percent,
+                stmt.excluded.duration_seconds < LeaderboardEntry.duration_seconds
+            )
+        )
+    ))
+
+def load_top(db: Session, test_id: str, limit: int) -> List[Standing]:
+    """First `limit` entries in ranking order (index range scan)"""
+    rows = db.query(LeaderboardEntry).filter(LeaderboardEntry.test_id == test_id).order_by(
+        LeaderboardEntry.score_percent.desc(),
+        LeaderboardEntry.duration_seconds,
+        LeaderboardEntry.achieved_at
+    ).limit(limit).all()
+    return [Standing.from_row(row) for row in rows]
+
+def load_rank(db: Session, test_id: str, telegram_id: int) -> Optional[Tuple[int, Standing]]:
+    """Rank and standing of a user outside the cached top"""
+    row = db.get(LeaderboardEntry, (test_id, telegram_id))
+    if row is None:
+        return None
+    standing = Standing.from_row(row)
+    above = db.query(LeaderboardEntry).filter(
+        LeaderboardEntry.test_id == test_id, _better_than(standing)
+    ).count()
+    return above + 1, standing
+
+def rebuild(db: Session) -> int:
+    """Recompute all entries from finished sessions in one pass; the caller commits"""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        # Finishes recorded meanwhile wait for the rebuild, so none is lost
+        db.execute(text("LOCK TABLE leaderboard_entries IN EXCLUSIVE MODE"))
+        duration = "ROUND(CAST(EXTRACT(EPOCH FROM (qs.finished_at - qs.started_at)) AS NUMERIC), 1)"
+    else:
+        duration = "ROUND((julianday(qs.finished_at) - julianday(qs.started_at)) * 86400, 1)"
+    db.execute(text("DELETE FROM leaderboard_entries"))
+    # Same ranking as the live upsert: best score, then shortest time, then earliest
+    return db.execute(text(f"""
+        INSERT INTO leaderboard_entries (test_id, user_telegram_id, full_name, score_percent,
+                                         correct_count, total_count, duration_seconds, achieved_at)
+        SELECT test_id, user_telegram_id, full_name, score_percent,
+               correct_count, total_count, duration_seconds, achieved_at
+        FROM (
+            SELECT qs.test_id, qs.user_telegram_id, u.first_name || ' ' || u.last_name AS full_name,
+                   CASE WHEN qs.total_count > 0
+                        THEN ROUND(qs.correct_count * 100.0 / qs.total_count, 1) ELSE 0 END AS score_percent,
+                   qs.correct_count, qs.total_count, {duration} AS duration_seconds,
+                   qs.finished_at AS achieved_at,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY qs.test_id, qs.user_telegram_id
+                       ORDER BY CASE WHEN qs.total_count > 0
+                                     THEN qs.correct_count * 100.0 / qs.total_count ELSE 0 END DESC,
+                                {duration}, qs.finished_at
+                   ) AS position
+            FROM quiz_sessions qs JOIN users u ON u.telegram_id = qs.user_telegram_id
+            WHERE qs.finished_at IS NOT NULL
+        ) ranked
+        WHERE position = 1
+    """)).rowcount
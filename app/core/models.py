@@ -77,6 +77,7 @@ class FinishResponse(BaseModel):
     correct_count: int
     total_count: int
     session_id: str
+    percentile: Optional[float] = None  # share of finished attempts of the test that scored lower
 
 # User models
 class UserRegisterRequest(BaseModel):
@@ -93,6 +94,23 @@ class UserStats(BaseModel):
     attempts: int
     last_score_percent: float
     best_score_percent: float
+    last_score_percentile: Optional[float] = None
+
+# Leaderboard models
+class LeaderboardEntryResponse(BaseModel):
+    """One row of a test leaderboard"""
+    rank: int
+    full_name: str
+    score_percent: float
+    correct_count: int
+    total_count: int
+    duration_seconds: float
+
+class LeaderboardResponse(BaseModel):
+    """Top of a test leaderboard and, if requested, the user's own row"""
+    test_id: str
+    entries: List[LeaderboardEntryResponse]
+    me: Optional[LeaderboardEntryResponse] = None
 
 # Generic responses
 class SuccessResponse(BaseModel):
@@ -0,0 +1,190 @@
+"""On-demand sampling CPU profiler and tracemalloc snapshots"""
+
+import html
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+# Leaf frames of threads that are waiting, not running
+_IDLE_LEAVES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("socket.py", "accept"),
+}
+
+class ProfilerBusy(Exception):
+    """Another CPU profile is already running"""
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})"
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_LEAVES
+
+class SamplingProfiler:
+    """Samples stacks of all threads with sys._current_frames()
+
+    Runs in its own thread, so the event loop being profiled keeps serving
+    requests. One profile at a time.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float, interval: float = 0.005, include_idle: bool = False) -> Dict[str, Any]:
+        """Sample for `seconds` and return stack counts"""
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A CPU profile is already running")
+        try:
+            return self._sample(seconds, interval, include_idle)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, interval: float, include_idle: bool) -> Dict[str, Any]:
+        own_thread = threading.get_ident()
+        thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks: Counter = Counter()
+        samples = 0
+        deadline = time.monotonic() + seconds
+
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread or (not include_idle and _is_idle(frame)):
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(thread_names.get(thread_id, str(thread_id)))
+                stacks[tuple(reversed(labels))] += 1
+            samples += 1
+            time.sleep(interval)
+
+        return {"seconds": seconds, "interval": interval, "samples": samples, "stacks": stacks}
+
+def collapsed(profile: Dict[str, Any]) -> str:
+    """Collapsed stacks ("thread;outer;inner count"), the flamegraph.pl / speedscope input"""
+    return "".join(
+        f"{';'.join(stack)} {count}\n"
+        for stack, count in profile["stacks"].most_common()
+    )
+
+def function_totals(profile: Dict[str, Any]) -> List[Tuple[str, int, int]]:
+    """(function, self samples, total samples), hottest total first"""
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    for stack, count in profile["stacks"].items():
+        self_counts[stack[-1]] += count
+        for label in set(stack[1:]):
+            total_counts[label] += count
+    return sorted(
+        ((label, self_counts[label], total) for label, total in total_counts.items()),
+        key=lambda row: (-row[2], -row[1])
+    )
+
+def html_report(profile: Dict[str, Any], limit: int = 200) -> str:
+    """Self-contained HTML page: per-function table and hottest stacks"""
+    samples = sum(profile["stacks"].values()) or 1
+    rows = "".join(
+        f"<tr><td>{html.escape(label)}</td><td>{own}</td><td>{own * 100 / samples:.1f}%</td>"
+        f"<td>{total}</td><td>{total * 100 / samples:.1f}%</td></tr>"
+        for label, own, total in function_totals(profile)[:limit]
+    )
+    stacks = "".join(
+        f"<tr><td>{count}</td><td><pre>{html.escape(chr(10).join(stack))}</pre></td></tr>"
+        for stack, count in profile["stacks"].most_common(30)
+    )
+    return (
+        "<!doctype html><html><head><meta charset='utf-8'><title>CPU profile</title>"
+        "<style>body{font-family:sans-serif}table{border-collapse:collapse}"
+        "td,th{border:1px solid #ccc;padding:2px 6px;text-align:left}pre{margin:0}</style></head><body>"
+        f"<h1>CPU profile</h1><p>{profile['seconds']} s, {profile['samples']} sampling rounds, "
+        f"{samples} thread samples</p>"
+        "<h2>Functions</h2><table><tr><th>function</th><th>self</th><th>self %</th>"
+        f"<th>total</th><th>total %</th></tr>{rows}</table>"
+        f"<h2>Hottest stacks</h2><table><tr><th>samples</th><th>stack</th></tr>{stacks}</table>"
+        "</body></html>"
+    )
+
+class MemoryProfiler:
+    """tracemalloc control with a baseline and a latest snapshot to diff"""
+
+    _FILTERS = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ]
+
+    def __init__(self):
+        self.baseline: Optional[tracemalloc.Snapshot] = None
+        self.latest: Optional[tracemalloc.Snapshot] = None
+
+    def start(self, frames: int = 25) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self.baseline = self.latest = None
+
+    def status(self) -> Dict[str, Any]:
+        current, peak = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else (0, 0)
+        return {
+            "tracing": tracemalloc.is_tracing(),
+            "traced_bytes": current,
+            "peak_bytes": peak,
+            "has_baseline": self.baseline is not None,
+            "has_latest": self.latest is not None
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Take a snapshot; the previous latest becomes the baseline"""
+        if not tracemalloc.is_tracing():
+            raise RuntimeError("tracemalloc is not running")
+        snapshot = tracemalloc.take_snapshot().filter_traces(self._FILTERS)
+        self.baseline, self.latest = self.latest, snapshot
+        return self.status()
+
+    def top(self, group_by: str = "lineno", limit: int = 30) -> List[Dict[str, Any]]:
+        """Largest allocation sites of the latest snapshot"""
+        if self.latest is None:
+            raise RuntimeError("No snapshot taken")
+        return [
+            {"site": self._site(stat.traceback, group_by), "size_bytes": stat.size, "count": stat.count}
+            for stat in self.latest.statistics(group_by)[:limit]
+        ]
+
+    def diff(self, group_by: str = "lineno", limit: int = 30) -> List[Dict[str, Any]]:
+        """Allocation growth from the baseline to the latest snapshot"""
+        if self.baseline is None or self.latest is None:
+            raise RuntimeError("Two snapshots are needed for a diff")
+        return [
+            {
+                "site": self._site(stat.traceback, group_by),
+                "size_bytes": stat.size,
+                "size_diff_bytes": stat.size_diff,
+                "count": stat.count,
+                "count_diff": stat.count_diff
+            }
+            for stat in self.latest.compare_to(self.baseline, group_by)[:limit]
+        ]
+
+    @staticmethod
+    def _site(traceback: tracemalloc.Traceback, group_by: str) -> str:
+        if group_by == "traceback":
+            return "\n".join(traceback.format())
+        frame = traceback[0]
+        return frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}"
+
+# Global profilers of this process
+cpu_profiler = SamplingProfiler()
+memory_profiler = MemoryProfiler()
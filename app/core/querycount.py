@@ -0,0 +1,66 @@
+"""Database query counting per API request and bot update"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .slowquery import normalize_sql, slow_queries
+from .tracing import current_span, record_span
+
+@dataclass
+class QueryStats:
+    """Queries issued and time spent in the database"""
+    count: int = 0
+    duration: float = 0.0  # seconds
+
+    @property
+    def duration_ms(self) -> float:
+        return round(self.duration * 1000, 2)
+
+# Stats of the request or update being handled; threads started with
+# asyncio.to_thread copy the context and share the same object
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+# Listening on the Engine class covers every engine: core storage, FSM storage, bus
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_started = time.perf_counter()
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_query_started", None)
+    duration = time.perf_counter() - started if started is not None else 0.0
+    stats = _current.get()
+    if stats is not None:
+        stats.count += 1
+        stats.duration += duration
+    slow_queries.observe(conn, statement, parameters, executemany, duration)
+    if current_span() is not None:
+        record_span("sql", duration, statement=normalize_sql(statement))
+
+def current_query_stats() -> Optional[QueryStats]:
+    """Stats of the current tracking scope, if any"""
+    return _current.get()
+
+@contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count queries issued inside the block"""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+@contextmanager
+def assert_max_queries(limit: int) -> Iterator[QueryStats]:
+    """Fail when the block issues more than `limit` queries (N+1 guard for tests)"""
+    with track_queries() as stats:
+        yield stats
+    assert stats.count <= limit, f"Expected at most {limit} queries, got {stats.count}"
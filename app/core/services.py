@@ -5,6 +5,7 @@ from typing import List, Optional, Dict, Any, TYPE_CHECKING
 if TYPE_CHECKING:
     from .database import QuizSession
 from .db_storage import storage
+from .metrics import answers_total
 from .models import QuestionInput, SessionStartRequest, AnswerRequest
 from .storage import Test
 import uuid
@@ -90,6 +91,11 @@ class QuestionService:
         """Get all questions"""
         return storage.get_all_questions()
     
+    @staticmethod
+    def get_questions_page(after_id: Optional[str], limit: int, test_id: Optional[str] = None, with_options: bool = True):
+        """Get a page of questions ordered by ID"""
+        return storage.get_questions_page(after_id, limit, test_id, with_options)
+    
     @staticmethod
     def get_question(question_id: str):
         """Get question by ID"""
@@ -123,6 +129,55 @@ class TestService:
     def get_questions_by_test(test_id: str):
         """Get all questions for a specific test"""
         return storage.get_questions_by_test(test_id)
+    
+    @staticmethod
+    def get_question_counts() -> Dict[str, int]:
+        """Get number of questions per test"""
+        return storage.get_question_counts()
+
+    @staticmethod
+    def get_question_analytics(test_id: str) -> List[Dict[str, Any]]:
+        """Get per-question analytics of a test"""
+        return storage.get_question_analytics(test_id)
+    
+    @staticmethod
+    def rebuild_question_analytics() -> Dict[str, int]:
+        """Recompute analytics counters from answer history"""
+        return storage.rebuild_question_analytics()
+
+    @staticmethod
+    def get_leaderboard(test_id: str, limit: int, telegram_id: Optional[int] = None) -> Dict[str, Any]:
+        """Get top standings of a test and, optionally, the user's rank"""
+        def row(rank: int, standing) -> Dict[str, Any]:
+            return {
+                "rank": rank,
+                "full_name": standing.full_name,
+                "score_percent": standing.score_percent,
+                "correct_count": standing.correct_count,
+                "total_count": standing.total_count,
+                "duration_seconds": standing.duration_seconds
+            }
+        
+        result = {
+            "test_id": test_id,
+            "entries": [row(i + 1, s) for i, s in enumerate(storage.get_leaderboard(test_id, limit))],
+            "me": None
+        }
+        if telegram_id is not None:
+            found = storage.get_leaderboard_rank(test_id, telegram_id)
+            if found:
+                result["me"] = row(*found)
+        return result
+
+    @staticmethod
+    def rebuild_leaderboards() -> Dict[str, int]:
+        """Recompute leaderboards from finished sessions"""
+        return storage.rebuild_leaderboards()
+
+    @staticmethod
+    def rebuild_score_histograms() -> Dict[str, int]:
+        """Recompute score histograms from finished sessions"""
+        return storage.rebuild_score_histograms()
 
 class QuizService:
     """Service for quiz session management"""
@@ -224,6 +279,8 @@ class QuizService:
             is_correct=option.is_correct
         )
         
+        answers_total.inc(correct=str(option.is_correct).lower())
+        
         # Get updated session data after recording answer
         updated_session = storage.get_quiz_session(session_id)
         
@@ -258,7 +315,10 @@ class QuizService:
             "score_percent": round(score_percent, 1),
             "correct_count": session.correct_count,
             "total_count": session.total_count,
-            "session_id": session.id
+            "session_id": session.id,
+            "percentile": storage.get_score_percentile(
+                session.test_id, session.correct_count, session.total_count, exclude_self=True
+            )
         }
     
     @staticmethod
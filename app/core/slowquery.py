@@ -0,0 +1,175 @@
+"""Slow query log with sampled EXPLAIN capture"""
+
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_BIND = re.compile(r"%\(\w+\)s|%s|:\w+|\$\d+")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE = re.compile(r"\s+")
+
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_SKIP_FILES = {os.path.abspath(__file__), os.path.join(_APP_DIR, "core", "querycount.py")}
+
+def normalize_sql(statement: str) -> str:
+    """SQL with literals and bind parameters replaced by ? and IN lists collapsed"""
+    sql = _STRING.sub("?", statement)
+    sql = _BIND.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _IN_LIST.sub("(?...)", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+def params_shape(parameters: Any, executemany: bool = False) -> str:
+    """Parameter names and types without values"""
+    if executemany and isinstance(parameters, (list, tuple)):
+        rows = len(parameters)
+        return f"{rows} x {params_shape(parameters[0]) if rows else '()'}"
+    if isinstance(parameters, dict):
+        return "{" + ", ".join(f"{name}: {type(value).__name__}" for name, value in parameters.items()) + "}"
+    if isinstance(parameters, (list, tuple)):
+        return "(" + ", ".join(type(value).__name__ for value in parameters) + ")"
+    return type(parameters).__name__
+
+def calling_method() -> str:
+    """Innermost app function on the stack, preferring storage methods"""
+    frame = sys._getframe(1)
+    fallback = "unknown"
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_APP_DIR) and filename not in _SKIP_FILES:
+            code = frame.f_code
+            name = getattr(code, "co_qualname", code.co_name)
+            if filename.endswith("storage.py"):
+                return name
+            if fallback == "unknown":
+                fallback = f"{os.path.relpath(filename, _APP_DIR)}:{name}"
+        frame = frame.f_back
+    return fallback
+
+@dataclass
+class SlowQuery:
+    """Aggregated slow executions of one normalized statement"""
+    sql: str
+    count: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+    last_seen: float = 0.0
+    params_shape: str = ""
+    callers: Dict[str, int] = field(default_factory=dict)
+    explain: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "sql": self.sql,
+            "count": self.count,
+            "total_ms": round(self.total_ms, 2),
+            "mean_ms": round(self.total_ms / self.count, 2) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 2),
+            "last_seen": self.last_seen,
+            "params_shape": self.params_shape,
+            "callers": dict(sorted(self.callers.items(), key=lambda item: -item[1])),
+            "explain": self.explain
+        }
+
+class SlowQueryLog:
+    """Statements slower than the threshold, aggregated by normalized SQL
+
+    A sampled share of slow SELECTs is re-run with EXPLAIN (ANALYZE, BUFFERS)
+    on a separate cursor of the same connection (PostgreSQL only; other
+    statements are never re-executed).
+    """
+
+    def __init__(self, threshold_ms: float, explain_sample_rate: float = 0.0, maxsize: int = 200):
+        self.threshold_ms = threshold_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.maxsize = maxsize
+        self._entries: Dict[str, SlowQuery] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, conn, statement: str, parameters: Any, executemany: bool, duration: float) -> None:
+        """Record execution if it exceeded the threshold"""
+        duration_ms = duration * 1000
+        if not self.threshold_ms or duration_ms < self.threshold_ms:
+            return
+
+        sql = normalize_sql(statement)
+        shape = params_shape(parameters, executemany)
+        caller = calling_method()
+        explain = None
+        if self.explain_sample_rate and random.random() < self.explain_sample_rate:
+            explain = self._explain(conn, statement, parameters, executemany)
+
+        with self._lock:
+            entry = self._entries.get(sql)
+            if entry is None:
+                if len(self._entries) >= self.maxsize:
+                    # Keep the heaviest statements
+                    lightest = min(self._entries.values(), key=lambda e: e.total_ms)
+                    del self._entries[lightest.sql]
+                entry = self._entries[sql] = SlowQuery(sql=sql)
+            entry.count += 1
+            entry.total_ms += duration_ms
+            entry.max_ms = max(entry.max_ms, duration_ms)
+            entry.last_seen = time.time()
+            entry.params_shape = shape
+            entry.callers[caller] = entry.callers.get(caller, 0) + 1
+            if explain:
+                entry.explain = explain
+
+        logger.warning(f"Slow query {duration_ms:.1f} ms in {caller}: {sql} params={shape}")
+
+    def _explain(self, conn, statement: str, parameters: Any, executemany: bool) -> Optional[str]:
+        if executemany or conn.dialect.name != "postgresql":
+            return None
+        if not statement.lstrip().upper().startswith("SELECT"):
+            return None
+        try:
+            cursor = conn.connection.cursor()
+        except Exception:
+            return None
+        try:
+            # A failed EXPLAIN must not abort the caller's transaction
+            cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters)
+                plan = "\n".join(row[0] for row in cursor.fetchall())
+                cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+                return plan
+            except Exception as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                logger.debug(f"EXPLAIN failed: {e}")
+                return None
+        except Exception as e:
+            logger.debug(f"EXPLAIN failed: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def top(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Statements with the largest total time first"""
+        with self._lock:
+            entries = sorted(self._entries.values(), key=lambda e: e.total_ms, reverse=True)[:limit]
+            return [entry.to_dict() for entry in entries]
+
+    def reset(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+# Global slow query log
+slow_queries = SlowQueryLog(
+    threshold_ms=settings.slow_query_threshold_ms,
+    explain_sample_rate=settings.slow_query_explain_sample_rate,
+    maxsize=settings.slow_query_log_size
+)
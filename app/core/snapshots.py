@@ -0,0 +1,73 @@
+"""Aggregates recomputed in the background and served from memory"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+class PeriodicSnapshot:
+    """Value computed by a blocking `loader` in a worker thread every `interval` seconds
+
+    Readers never touch the database: they get the last computed value
+    (None until the first refresh finishes) and its age.
+    """
+
+    def __init__(self, name: str, loader: Callable[[], Any], interval: float):
+        self.name = name
+        self.loader = loader
+        self.interval = interval
+        self.value: Any = None
+        self.refreshed_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self._refreshed_monotonic: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def get(self) -> Any:
+        return self.value
+
+    def age_seconds(self) -> Optional[float]:
+        if self._refreshed_monotonic is None:
+            return None
+        return round(time.monotonic() - self._refreshed_monotonic, 3)
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "refreshed_at": self.refreshed_at.isoformat() if self.refreshed_at else None,
+            "age_seconds": self.age_seconds(),
+            "error": self.error
+        }
+
+    async def refresh(self) -> Any:
+        """Recompute now; on failure the previous value is kept"""
+        try:
+            self.value = await asyncio.to_thread(self.loader)
+        except Exception as e:
+            self.error = str(e)
+            logger.warning(f"Snapshot {self.name} refresh failed: {e}")
+        else:
+            self.error = None
+            self.refreshed_at = datetime.now(timezone.utc)
+            self._refreshed_monotonic = time.monotonic()
+        return self.value
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Start refreshing on the running event loop"""
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
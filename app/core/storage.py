@@ -48,11 +48,15 @@ class QuizSession:
     test_id: str
     started_at: datetime
     finished_at: Optional[datetime] = None
-    question_order: List[str] = field(default_factory=list)
+    question_order: str = "[]"  # JSON string of question IDs, as in the database model
     current_question_index: int = 0
     correct_count: int = 0
     total_count: int = 0
     answers: List['UserAnswer'] = field(default_factory=list)
+    
+    @property
+    def user_telegram_id(self) -> int:
+        return self.user_id
 
 @dataclass
 class UserAnswer:
@@ -149,6 +153,13 @@ class InMemoryStorage:
         """Get all questions for a specific test"""
         return [q for q in self.questions.values() if q.test_id == test_id]
     
+    def get_question_counts(self) -> Dict[str, int]:
+        """Number of questions per test"""
+        counts: Dict[str, int] = {}
+        for question in self.questions.values():
+            counts[question.test_id] = counts.get(question.test_id, 0) + 1
+        return counts
+    
     def get_question(self, question_id: str) -> Optional[Question]:
         """Get question by ID"""
         return self.questions.get(question_id)
@@ -157,6 +168,16 @@ class InMemoryStorage:
         """Get all questions"""
         return list(self.questions.values())
     
+    def get_questions_page(self, after_id: Optional[str], limit: int, test_id: Optional[str] = None,
+                           with_options: bool = True) -> List[Question]:
+        """Next `limit` questions ordered by ID after `after_id`"""
+        questions = sorted(
+            (q for q in self.questions.values()
+             if (test_id is None or q.test_id == test_id) and (after_id is None or q.id > after_id)),
+            key=lambda q: q.id
+        )
+        return questions[:limit]
+    
     def get_question_options(self, question_id: str) -> List[AnswerOption]:
         """Get all options for a question"""
         return [opt for opt in self.answer_options.values() if opt.question_id == question_id]
@@ -180,7 +201,7 @@ class InMemoryStorage:
             user_id=user_id,
             test_id=test_id,
             started_at=datetime.now(),
-            question_order=question_ids,
+            question_order=json.dumps(question_ids),
             total_count=len(question_ids)
         )
         
@@ -191,9 +212,12 @@ class InMemoryStorage:
         """Get quiz session by ID"""
         return self.quiz_sessions.get(session_id)
     
-    def update_quiz_session(self, session: QuizSession):
+    def update_quiz_session(self, session_id: str, **updates):
         """Update quiz session"""
-        self.quiz_sessions[session.id] = session
+        session = self.quiz_sessions.get(session_id)
+        if session:
+            for name, value in updates.items():
+                setattr(session, name, value)
     
     def finish_quiz_session(self, session_id: str) -> Optional[QuizSession]:
         """Mark session as finished"""
@@ -202,15 +226,73 @@ class InMemoryStorage:
             session.finished_at = datetime.now()
         return session
     
+    def get_score_percentile(self, test_id: str, correct_count: int, total_count: int,
+                             exclude_self: bool = False) -> Optional[float]:
+        """Share of finished sessions of the test that scored lower, percent"""
+        if not total_count:
+            return None
+        bucket = correct_count * 100 // total_count
+        finished = [
+            s.correct_count * 100 // s.total_count for s in self.quiz_sessions.values()
+            if s.test_id == test_id and s.finished_at is not None and s.total_count
+        ]
+        total = len(finished) - (1 if exclude_self else 0)
+        if total <= 0:
+            return None
+        return round(sum(1 for b in finished if b < bucket) * 100 / total, 1)
+    
     # Answer methods
-    def add_user_answer(self, answer: UserAnswer):
+    def add_user_answer(self, session_id: str, user_telegram_id: int, question_id: str,
+                       chosen_option_id: str, is_correct: bool):
         """Add user answer"""
+        answer = UserAnswer(
+            session_id=session_id,
+            user_id=user_telegram_id,
+            question_id=question_id,
+            chosen_option_id=chosen_option_id,
+            is_correct=is_correct
+        )
         self.user_answers.append(answer)
         
         # Update session correct count
-        session = self.quiz_sessions.get(answer.session_id)
-        if session and answer.is_correct:
-            session.correct_count += 1
+        session = self.quiz_sessions.get(session_id)
+        if session:
+            session.answers.append(answer)
+            if is_correct:
+                session.correct_count += 1
+    
+    def count_active_sessions(self) -> int:
+        """Number of sessions not finished yet"""
+        return sum(1 for s in self.quiz_sessions.values() if s.finished_at is None)
+    
+    def get_live_counts(self) -> Dict[str, int]:
+        """Questions, users and active sessions"""
+        return {
+            "questions_count": len(self.questions),
+            "users_count": len(self.users),
+            "active_sessions": self.count_active_sessions()
+        }
+    
+    def get_session_counts_by_test(self) -> Dict[str, Dict[str, int]]:
+        """Started and finished sessions per test"""
+        counts: Dict[str, Dict[str, int]] = {}
+        for s in self.quiz_sessions.values():
+            test_counts = counts.setdefault(s.test_id, {"attempts": 0, "finished": 0})
+            test_counts["attempts"] += 1
+            test_counts["finished"] += s.finished_at is not None
+        return counts
+    
+    def get_max_answer_id(self) -> int:
+        """Answers have no IDs here; their list position stands in for one"""
+        return len(self.user_answers)
+    
+    def count_answers_by_day(self, after_id: int, settled_id: int) -> List[tuple]:
+        """(day, id <= settled_id, count) for answers with id > after_id"""
+        counts: Dict[tuple, int] = {}
+        for answer_id, answer in enumerate(self.user_answers[after_id:], start=after_id + 1):
+            key = (answer.answered_at.date().isoformat(), answer_id <= settled_id)
+            counts[key] = counts.get(key, 0) + 1
+        return [(day, settled, count) for (day, settled), count in counts.items()]
     
     def get_user_sessions(self, telegram_id: int) -> List[QuizSession]:
         """Get all sessions for a user"""
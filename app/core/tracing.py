@@ -0,0 +1,265 @@
+"""Lightweight span tracing from bot handler to API route to SQL
+
+A trace starts in the bot handler (or at the API for direct calls) and its
+ID travels to the API in the X-Trace-Id header, signed with the admin key so
+other clients cannot force tracing. Finished spans go to an in-memory ring
+buffer and, optionally, to rotating JSON-lines files next to TRACE_FILE, one
+per process, so one slow quiz step can be read end to end.
+"""
+
+import atexit
+import functools
+import glob
+import hashlib
+import hmac
+import inspect
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import settings
+
+TRACE_HEADER = "X-Trace-Id"
+PARENT_HEADER = "X-Parent-Span-Id"
+SIGNATURE_HEADER = "X-Trace-Signature"
+
+_TRACE_ID = re.compile(r"[0-9a-f]{32}")
+_SPAN_ID = re.compile(r"[0-9a-f]{16}")
+
+def _new_id(size: int) -> str:
+    return os.urandom(size).hex()
+
+@dataclass
+class Span:
+    """One timed operation of a trace"""
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    process: str
+    start: float  # unix time
+    duration_ms: float = 0.0
+    local_root: bool = False  # first span of the trace in this process
+    attrs: Dict[str, Any] = field(default_factory=dict)
+
+_current: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+class TraceBuffer:
+    """Ring buffer of finished spans plus optional rotating file export
+
+    Rotation is not safe across processes, so each process writes its own
+    `<path>.<pid>` file and `find` reads the files of all processes.
+    """
+
+    def __init__(self, maxsize: int, path: str = "", max_bytes: int = 0, backups: int = 0):
+        self._spans: "deque[Span]" = deque(maxlen=maxsize)
+        self.path = path
+        self._file_logger: Optional[logging.Logger] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self._lock = threading.Lock()
+        if path:
+            self._open_file(f"{path}.{os.getpid()}", max_bytes, backups)
+
+    def _open_file(self, path: str, max_bytes: int, backups: int) -> None:
+        output = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+        output.setFormatter(logging.Formatter("%(message)s"))
+        records: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+        # Spans are written by a background thread, like the other logs
+        self._listener = logging.handlers.QueueListener(records, output)
+        self._listener.start()
+        self._file_logger = logging.getLogger("app.trace.export")
+        self._file_logger.propagate = False
+        self._file_logger.setLevel(logging.INFO)
+        self._file_logger.addHandler(logging.handlers.QueueHandler(records))
+        atexit.register(self.close)
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self._spans.append(span)
+        if self._file_logger is not None:
+            self._file_logger.info(json.dumps(asdict(span), ensure_ascii=False, default=str))
+
+    def recent(self, limit: int = 50, min_duration_ms: float = 0.0) -> List[Dict[str, Any]]:
+        """Latest traces of this process, newest first"""
+        with self._lock:
+            spans = list(self._spans)
+        counts: Dict[str, int] = {}
+        for span in spans:
+            counts[span.trace_id] = counts.get(span.trace_id, 0) + 1
+        roots = [span for span in reversed(spans) if span.local_root and span.duration_ms >= min_duration_ms]
+        return [
+            {
+                "trace_id": span.trace_id,
+                "name": span.name,
+                "process": span.process,
+                "start": span.start,
+                "duration_ms": span.duration_ms,
+                "spans": counts[span.trace_id]
+            }
+            for span in roots[:limit]
+        ]
+
+    def find(self, trace_id: str) -> List[Dict[str, Any]]:
+        """Spans of a trace from the buffer and the shared file, ordered by start
+
+        Blocking (reads every process file and its backups); run in a worker thread.
+        """
+        with self._lock:
+            found = {span.span_id: asdict(span) for span in self._spans if span.trace_id == trace_id}
+        if self.path:
+            for path in glob.glob(f"{glob.escape(self.path)}.*"):
+                with open(path, encoding="utf-8") as f:
+                    for line in f:
+                        # The substring test only skips parsing lines that cannot match
+                        if trace_id not in line:
+                            continue
+                        span = json.loads(line)
+                        if span["trace_id"] == trace_id:
+                            found.setdefault(span["span_id"], span)
+        return sorted(found.values(), key=lambda span: span["start"])
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+# Global trace buffer of this process
+traces = TraceBuffer(
+    maxsize=settings.trace_buffer_size,
+    path=settings.trace_file,
+    max_bytes=settings.trace_file_max_bytes,
+    backups=settings.trace_file_backups
+) if settings.tracing_enabled else None
+
+_process = "bot"
+
+def set_process_name(name: str) -> None:
+    """Label spans of this process ("api", "bot")"""
+    global _process
+    _process = name
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+def _sign(trace_id: str, parent_id: str) -> str:
+    return hmac.new(settings.admin_api_key.encode(), f"{trace_id}:{parent_id}".encode(), hashlib.sha256).hexdigest()
+
+def trace_headers() -> Dict[str, str]:
+    """Headers propagating the current trace to the API"""
+    span = _current.get()
+    if span is None:
+        return {}
+    return {
+        TRACE_HEADER: span.trace_id,
+        PARENT_HEADER: span.span_id,
+        SIGNATURE_HEADER: _sign(span.trace_id, span.span_id)
+    }
+
+def remote_parent(trace_id: Optional[str], parent_id: Optional[str],
+                  signature: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """Trace and parent span of a request, if well-formed and signed by trace_headers"""
+    if not (trace_id and parent_id and signature):
+        return None, None
+    if not (_TRACE_ID.fullmatch(trace_id) and _SPAN_ID.fullmatch(parent_id)):
+        return None, None
+    if not hmac.compare_digest(signature, _sign(trace_id, parent_id)):
+        return None, None
+    return trace_id, parent_id
+
+def _finish(span: Span, started: float) -> None:
+    span.duration_ms = round((time.perf_counter() - started) * 1000, 3)
+    traces.add(span)
+
+@contextmanager
+def start_trace(name: str, trace_id: Optional[str] = None, parent_id: Optional[str] = None, **attrs) -> Iterator[Optional[Span]]:
+    """Root span of this process: continues a remote trace or starts a sampled one"""
+    if traces is None or (trace_id is None and random.random() >= settings.trace_sample_rate):
+        yield None
+        return
+    span = Span(
+        trace_id=trace_id or _new_id(16),
+        span_id=_new_id(8),
+        parent_id=parent_id,
+        name=name,
+        process=_process,
+        start=time.time(),
+        local_root=True,
+        attrs=attrs
+    )
+    token = _current.set(span)
+    started = time.perf_counter()
+    try:
+        yield span
+    finally:
+        _current.reset(token)
+        _finish(span, started)
+
+@contextmanager
+def start_span(name: str, **attrs) -> Iterator[Optional[Span]]:
+    """Child span of the current one; does nothing outside a trace"""
+    parent = _current.get()
+    if parent is None:
+        yield None
+        return
+    span = Span(
+        trace_id=parent.trace_id,
+        span_id=_new_id(8),
+        parent_id=parent.span_id,
+        name=name,
+        process=_process,
+        start=time.time(),
+        attrs=attrs
+    )
+    token = _current.set(span)
+    started = time.perf_counter()
+    try:
+        yield span
+    finally:
+        _current.reset(token)
+        _finish(span, started)
+
+def record_span(name: str, duration: float, **attrs) -> None:
+    """Add an already finished child span (e.g. an SQL statement)"""
+    parent = _current.get()
+    if parent is None:
+        return
+    traces.add(Span(
+        trace_id=parent.trace_id,
+        span_id=_new_id(8),
+        parent_id=parent.span_id,
+        name=name,
+        process=_process,
+        start=time.time() - duration,
+        duration_ms=round(duration * 1000, 3),
+        attrs=attrs
+    ))
+
+def traced_methods(prefix: str):
+    """Class decorator: wrap public methods in child spans named prefix.method"""
+    def decorate(cls):
+        for name, method in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.isfunction(method):
+                continue
+            setattr(cls, name, _traced(f"{prefix}.{name}", method))
+        return cls
+    return decorate
+
+def _traced(span_name: str, method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        if _current.get() is None:
+            return method(*args, **kwargs)
+        with start_span(span_name):
+            return method(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,167 @@
+"""Async load driver for the public quiz API
+
+Registers synthetic users and runs concurrent full sessions through
+/public/sessions/start, /next, /answer and /finish. Reports throughput,
+latency percentiles and error rates per endpoint; --json writes a report
+with sorted keys so runs on different commits can be diffed directly.
+
+    python -m bench.api_load --users 2000 --questions 10 --concurrency 200 --json api_load.json
+    python -m bench.api_load --users 2000 --compare api_load.json
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+from .fixtures import create_quiz_test, start_api_in_thread
+from .stats import LatencyRecorder, print_summary
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Load the public quiz API with concurrent sessions")
+    parser.add_argument("--users", type=int, default=1000, help="Number of synthetic users")
+    parser.add_argument("--questions", type=int, default=10, help="Questions in the synthetic test")
+    parser.add_argument("--concurrency", type=int, default=100, help="Users running at the same time")
+    parser.add_argument("--api-base", help="Base URL of a running API; starts one in process if omitted")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Request timeout in seconds")
+    parser.add_argument("--json", help="Write the report to this file")
+    parser.add_argument("--compare", help="Previous report to print p95 and throughput deltas against")
+    return parser.parse_args()
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+class ApiClient:
+    """Times every request under a route label and counts failures"""
+
+    def __init__(self, http: aiohttp.ClientSession, api_base: str, recorder: LatencyRecorder):
+        self.http = http
+        self.api_base = api_base
+        self.recorder = recorder
+
+    async def call(self, label: str, method: str, path: str, **kwargs) -> Any:
+        started = time.perf_counter()
+        try:
+            async with self.http.request(method, f"{self.api_base}{path}", **kwargs) as response:
+                payload = await response.json()
+                response.raise_for_status()
+        except Exception:
+            self.recorder.error(label)
+            raise
+        self.recorder.record(label, time.perf_counter() - started)
+        return payload
+
+async def run_user(client: ApiClient, telegram_id: int, test_id: str) -> None:
+    """Register and walk one full session answering randomly"""
+    await client.call("POST /users/register", "POST", "/public/users/register", json={
+        "telegram_id": telegram_id, "first_name": "Load", "last_name": f"User{telegram_id}"
+    })
+    session = await client.call("POST /sessions/start", "POST", "/public/sessions/start", json={
+        "telegram_id": telegram_id, "test_id": test_id
+    })
+    session_id = session["session_id"]
+
+    for _ in range(session["total"]):
+        question = await client.call("GET /sessions/{id}/next", "GET", f"/public/sessions/{session_id}/next")
+        if not question:
+            break
+        option = random.choice(question["options"])
+        await client.call("POST /sessions/{id}/answer", "POST", f"/public/sessions/{session_id}/answer", json={
+            "option_id": option["id"]
+        })
+
+    await client.call("POST /sessions/{id}/finish", "POST", f"/public/sessions/{session_id}/finish")
+
+async def main_async(args: argparse.Namespace, api_base: str, admin_key: str) -> Dict[str, Any]:
+    test_id = await create_quiz_test(api_base, admin_key, args.questions)
+
+    recorder = LatencyRecorder()
+    limiter = asyncio.Semaphore(args.concurrency)
+    base_user_id = random.randint(1_000_000_000, 2_000_000_000)
+    failed_users = 0
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=args.timeout)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as http:
+        client = ApiClient(http, api_base, recorder)
+
+        async def limited(user_id: int) -> None:
+            nonlocal failed_users
+            async with limiter:
+                try:
+                    await run_user(client, user_id, test_id)
+                except Exception as e:
+                    failed_users += 1
+                    print(f"User {user_id} failed: {e!r}", file=sys.stderr)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(limited(base_user_id + i) for i in range(args.users)))
+        elapsed = time.perf_counter() - started
+
+    summary = recorder.summary()
+    requests_total = sum(row["count"] for row in summary.values())
+    errors_total = sum(row["errors"] for row in summary.values())
+    return {
+        "commit": git_commit(),
+        "users": args.users,
+        "questions": args.questions,
+        "concurrency": args.concurrency,
+        "failed_users": failed_users,
+        "elapsed_s": round(elapsed, 3),
+        "requests": requests_total,
+        "requests_per_s": round(requests_total / elapsed, 1) if elapsed else 0.0,
+        "sessions_per_s": round((args.users - failed_users) / elapsed, 2) if elapsed else 0.0,
+        "error_rate": round(errors_total / requests_total, 4) if requests_total else 0.0,
+        "endpoints": summary
+    }
+
+def print_comparison(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print throughput and per-endpoint p95 change against a previous report"""
+    def delta(new: float, old: float) -> str:
+        return f"{(new - old) / old * 100:+.1f}%" if old else "n/a"
+
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    print(f"{'requests/s':<32}{baseline['requests_per_s']:>10} -> {report['requests_per_s']:<10}"
+          f"{delta(report['requests_per_s'], baseline['requests_per_s'])}")
+    for label, row in report["endpoints"].items():
+        old = baseline.get("endpoints", {}).get(label)
+        if old:
+            print(f"{label + ' p95 ms':<32}{old['p95_ms']:>10} -> {row['p95_ms']:<10}{delta(row['p95_ms'], old['p95_ms'])}")
+
+def main() -> None:
+    args = parse_args()
+
+    from app.core.config import settings
+    api_base = args.api_base
+    if not api_base:
+        start_api_in_thread("127.0.0.1", settings.api_port)
+        api_base = f"http://127.0.0.1:{settings.api_port}"
+
+    report = asyncio.run(main_async(args, api_base, settings.admin_api_key))
+
+    print(f"{report['requests']} requests in {report['elapsed_s']}s: {report['requests_per_s']} requests/s, "
+          f"{report['sessions_per_s']} sessions/s, error rate {report['error_rate']}, "
+          f"{report['failed_users']} failed users")
+    print_summary(report["endpoints"])
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            print_comparison(report, json.load(f))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+if __name__ == "__main__":
+    main()
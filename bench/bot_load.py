@@ -0,0 +1,254 @@
+"""Bot load generator: synthetic Telegram updates fed straight to the Dispatcher
+
+Every simulated user goes through /start, registration, test selection and
+answers every question, with the real handlers, API and database. Outgoing
+Bot API calls are answered by a stub session, so no Telegram account or
+network is needed.
+
+    python -m bench.bot_load --users 200 --questions 10 --concurrency 50
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, List
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import EditMessageText, SendMessage
+from aiogram.types import Chat, Message, Update
+
+from .fixtures import create_quiz_test, start_api_in_thread
+from .stats import LatencyRecorder, print_summary
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Drive the bot Dispatcher with synthetic updates")
+    parser.add_argument("--users", type=int, default=100, help="Number of simulated users")
+    parser.add_argument("--questions", type=int, default=10, help="Questions in the synthetic test")
+    parser.add_argument("--concurrency", type=int, default=50, help="Users running at the same time")
+    parser.add_argument("--fsm", choices=["postgres", "memory"], default="postgres", help="FSM storage")
+    parser.add_argument("--no-rate-limit", action="store_true", help="Bypass the outbound send scheduler")
+    parser.add_argument("--external-api", action="store_true", help="Use an already running API on API_PORT")
+    parser.add_argument("--json", help="Write the report to this file")
+    return parser.parse_args()
+
+class StubSession(BaseSession):
+    """Bot session that answers Bot API methods locally and records keyboards"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls: Counter = Counter()
+        self.keyboards: Dict[int, Any] = {}  # chat_id -> last reply_markup
+        self.message_ids: Dict[int, int] = {}  # chat_id -> last bot message_id
+        self._ids = itertools.count(1)
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if isinstance(method, SendMessage):
+            message_id = next(self._ids)
+        elif isinstance(method, EditMessageText):
+            message_id = method.message_id
+        else:
+            return True
+
+        self.message_ids[method.chat_id] = message_id
+        self.keyboards[method.chat_id] = method.reply_markup
+        return Message(
+            message_id=message_id,
+            date=datetime.now(),
+            chat=Chat(id=method.chat_id, type="private"),
+            text=method.text
+        )
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        """File downloads get empty content; the quiz flow makes none"""
+        self.calls["stream_content"] += 1
+        yield b""
+
+    async def close(self):
+        pass
+
+class UpdateFactory:
+    """Builds synthetic updates for one simulated user"""
+
+    _update_ids = itertools.count(int(time.time()) % 1_000_000 * 1000)
+
+    def __init__(self, bot, user_id: int):
+        self.bot = bot
+        self.user = {"id": user_id, "is_bot": False, "first_name": "Load"}
+        self.chat = {"id": user_id, "type": "private"}
+
+    def message(self, text: str):
+        message = {
+            "message_id": next(self._update_ids),
+            "date": int(time.time()),
+            "chat": self.chat,
+            "from": self.user,
+            "text": text
+        }
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        return Update.model_validate(
+            {"update_id": next(self._update_ids), "message": message},
+            context={"bot": self.bot}
+        )
+
+    def callback(self, data: str, message_id: int):
+        return Update.model_validate({
+            "update_id": next(self._update_ids),
+            "callback_query": {
+                "id": str(next(self._update_ids)),
+                "from": self.user,
+                "chat_instance": str(self.user["id"]),
+                "data": data,
+                "message": {
+                    "message_id": message_id,
+                    "date": int(time.time()),
+                    "chat": self.chat,
+                    "from": {"id": 1, "is_bot": True, "first_name": "QuizBot"},
+                    "text": "…"
+                }
+            }
+        }, context={"bot": self.bot})
+
+def update_label(update) -> str:
+    """Handler-level label of an update"""
+    if update.callback_query:
+        return update.callback_query.data.split(":", 1)[0]
+    text = update.message.text or ""
+    return text.split()[0] if text.startswith("/") else "name"
+
+def buttons_data(markup, prefix: str) -> List[str]:
+    """callback_data of keyboard buttons starting with prefix"""
+    if markup is None:
+        return []
+    return [
+        button.callback_data
+        for row in markup.inline_keyboard
+        for button in row
+        if button.callback_data and button.callback_data.startswith(prefix)
+    ]
+
+async def run_user(dp, bot, session, outbound, recorder: LatencyRecorder, user_id: int, test_id: str) -> None:
+    """Full quiz flow for one user"""
+    factory = UpdateFactory(bot, user_id)
+
+    async def feed(update) -> None:
+        label = update_label(update)
+        started = time.perf_counter()
+        try:
+            await dp.feed_update(bot, update)
+        except Exception:
+            recorder.error(label)
+            raise
+        recorder.record(label, time.perf_counter() - started)
+        # Handlers only queue their replies; the user clicks again after seeing them
+        await outbound.wait_sent(user_id)
+
+    def current_message_id() -> int:
+        return session.message_ids.get(user_id, 1)
+
+    await feed(factory.message("/start"))
+    await feed(factory.message("Нагрузочный Пользователь"))
+    await feed(factory.callback("select_test", current_message_id()))
+    await feed(factory.callback(f"start_test:{test_id}", current_message_id()))
+
+    # Answer until the bot stops offering answers or a next question
+    for _ in range(10_000):
+        markup = session.keyboards.get(user_id)
+        answers = buttons_data(markup, "answer:")
+        if answers:
+            await feed(factory.callback(random.choice(answers), current_message_id()))
+        elif buttons_data(markup, "next_question"):
+            await feed(factory.callback("next_question", current_message_id()))
+        else:
+            break
+
+async def main_async(args: argparse.Namespace) -> Dict[str, Any]:
+    # App modules read settings at import, after main() adjusted the environment
+    from app.bot.handlers import register_handlers
+    from app.bot.outbound import outbound
+    from app.core.config import settings
+
+    api_base = f"http://127.0.0.1:{settings.api_port}"
+    test_id = await create_quiz_test(api_base, settings.admin_api_key, args.questions)
+
+    session = StubSession()
+    bot = Bot(token="123456:LOAD-TEST", session=session, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+
+    if args.fsm == "postgres":
+        from app.bot.storage import PostgreSQLStorage
+        fsm_storage = PostgreSQLStorage()
+    else:
+        fsm_storage = MemoryStorage()
+    dp = Dispatcher(storage=fsm_storage)
+    register_handlers(dp)
+
+    recorder = LatencyRecorder()
+    limiter = asyncio.Semaphore(args.concurrency)
+    base_user_id = random.randint(1_000_000_000, 2_000_000_000)
+    failed_users = 0
+
+    async def limited(user_id: int) -> None:
+        nonlocal failed_users
+        async with limiter:
+            try:
+                await run_user(dp, bot, session, outbound, recorder, user_id, test_id)
+            except Exception as e:
+                failed_users += 1
+                print(f"User {user_id} failed: {e}", file=sys.stderr)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited(base_user_id + i) for i in range(args.users)))
+    elapsed = time.perf_counter() - started
+
+    await outbound.close()
+    await fsm_storage.close()
+
+    summary = recorder.summary()
+    updates = sum(row["count"] for row in summary.values())
+    return {
+        "users": args.users,
+        "questions": args.questions,
+        "concurrency": args.concurrency,
+        "fsm": args.fsm,
+        "rate_limited": not args.no_rate_limit,
+        "failed_users": failed_users,
+        "elapsed_s": round(elapsed, 3),
+        "updates": updates,
+        "updates_per_s": round(updates / elapsed, 1) if elapsed else 0.0,
+        "bot_api_calls": dict(session.calls),
+        "handlers": summary
+    }
+
+def main() -> None:
+    args = parse_args()
+    if args.no_rate_limit:
+        os.environ["BOT_SEND_SCHEDULER_ENABLED"] = "false"
+
+    from app.core.config import settings
+    if not args.external_api:
+        start_api_in_thread("127.0.0.1", settings.api_port)
+
+    report = asyncio.run(main_async(args))
+
+    print(f"{report['updates']} updates in {report['elapsed_s']}s: {report['updates_per_s']} updates/s, "
+          f"{report['failed_users']} failed users")
+    print_summary(report["handlers"])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
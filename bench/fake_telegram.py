@@ -0,0 +1,371 @@
+"""Local stand-in for the Telegram Bot API for offline soak tests
+
+Implements getMe, deleteWebhook, getUpdates (long polling), sendMessage,
+editMessageText and answerCallbackQuery with configurable latency and 429
+flood responses. With --users it also simulates users: each one reacts to
+the bot's replies by pushing the next update, so the real polling bot from
+app/bot/bot.py runs the whole quiz flow against it.
+
+    python -m bench.fake_telegram --port 8081
+        serve only; start the bot with TELEGRAM_API_SERVER=http://127.0.0.1:8081
+
+    python -m bench.fake_telegram --users 100 --questions 5 --latency-ms 40 --flood-probability 0.01
+        serve, run the API and the polling bot in process and report results
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict, deque
+from typing import Any, Deque, Dict, List, Optional
+
+from aiohttp import web
+
+from .fixtures import create_quiz_test, start_api_in_thread
+from .stats import LatencyRecorder, print_summary
+
+FAKE_BOT_ID = 123456
+FAKE_TOKEN = f"{FAKE_BOT_ID}:FAKE-TELEGRAM"
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Base latency of every Bot API call")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Random extra latency up to this value")
+    parser.add_argument("--flood-probability", type=float, default=0.0, help="Chance of a 429 on sends and edits")
+    parser.add_argument("--global-limit", type=int, default=30, help="Sends per second before 429, 0 disables")
+    parser.add_argument("--chat-limit", type=int, default=0, help="Sends per chat per second before 429, 0 disables")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after value of 429 responses")
+    parser.add_argument("--users", type=int, default=0, help="Simulated users; 0 only serves the API")
+    parser.add_argument("--questions", type=int, default=5, help="Questions in the synthetic test")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="Pause of a simulated user between steps")
+    parser.add_argument("--step-timeout", type=float, default=60.0, help="Seconds to wait for a bot reply")
+    parser.add_argument("--external-api", action="store_true", help="Use an already running API on API_PORT")
+    parser.add_argument("--json", help="Write the report to this file")
+    return parser.parse_args()
+
+class FakeTelegramServer:
+    """aiohttp application emulating the Bot API methods used by the bot"""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        flood_probability: float = 0.0,
+        global_limit: int = 0,
+        chat_limit: int = 0,
+        retry_after: int = 1
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.flood_probability = flood_probability
+        self.global_limit = global_limit
+        self.chat_limit = chat_limit
+        self.retry_after = retry_after
+
+        self._updates: Deque[Dict[str, Any]] = deque()
+        self._updates_changed = asyncio.Condition()
+        self._next_update_id = 1
+        self._next_message_id = 1
+        self._window_second = 0
+        self._window_global = 0
+        self._window_chats: Counter = Counter()
+
+        # Replies of the bot per chat: (message_id, text, reply_markup)
+        self.replies: Dict[int, asyncio.Queue] = defaultdict(asyncio.Queue)
+        self.polling_started = asyncio.Event()
+
+        # Metrics
+        self.calls: Counter = Counter()
+        self.flood_responses = 0
+
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle)
+        self.app.router.add_get("/bot{token}/{method}", self.handle)
+
+    async def push_update(self, update: Dict[str, Any]) -> None:
+        """Queue update for getUpdates, assigning its update_id"""
+        update["update_id"] = self._next_update_id
+        self._next_update_id += 1
+        async with self._updates_changed:
+            self._updates.append(update)
+            self._updates_changed.notify_all()
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params = await self._params(request)
+
+        if method == "getUpdates":
+            return self._ok(await self._get_updates(params))
+
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + random.random() * self.jitter)
+
+        if method == "getMe":
+            return self._ok({"id": FAKE_BOT_ID, "is_bot": True, "first_name": "FakeQuizBot", "username": "fake_quiz_bot"})
+        if method in ("deleteWebhook", "answerCallbackQuery"):
+            return self._ok(True)
+        if method in ("sendMessage", "editMessageText"):
+            chat_id = int(params.get("chat_id", 0))
+            if self._flooded(chat_id):
+                self.flood_responses += 1
+                return web.json_response({
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after}
+                }, status=429)
+            return self._ok(self._bot_message(method, chat_id, params))
+        return self._ok(True)
+
+    async def _params(self, request: web.Request) -> Dict[str, Any]:
+        if request.content_type == "application/json":
+            return await request.json()
+        params = dict(request.query)
+        if request.can_read_body:
+            params.update(await request.post())
+        return params
+
+    def _ok(self, result: Any) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        self.polling_started.set()
+        offset = int(params.get("offset", 0) or 0)
+        limit = int(params.get("limit", 100) or 100)
+        timeout = float(params.get("timeout", 0) or 0)
+
+        async with self._updates_changed:
+            # Updates below offset are confirmed by the bot
+            while self._updates and self._updates[0]["update_id"] < offset:
+                self._updates.popleft()
+            if not self._updates and timeout:
+                try:
+                    await asyncio.wait_for(self._updates_changed.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+            return list(self._updates)[:limit]
+
+    def _flooded(self, chat_id: int) -> bool:
+        second = int(time.monotonic())
+        if second != self._window_second:
+            self._window_second = second
+            self._window_global = 0
+            self._window_chats.clear()
+
+        if self.flood_probability and random.random() < self.flood_probability:
+            return True
+        if self.global_limit and self._window_global >= self.global_limit:
+            return True
+        if self.chat_limit and self._window_chats[chat_id] >= self.chat_limit:
+            return True
+
+        self._window_global += 1
+        self._window_chats[chat_id] += 1
+        return False
+
+    def _bot_message(self, method: str, chat_id: int, params: Dict[str, Any]) -> Dict[str, Any]:
+        if method == "sendMessage":
+            message_id = self._next_message_id
+            self._next_message_id += 1
+        else:
+            message_id = int(params["message_id"])
+
+        markup = params.get("reply_markup")
+        if isinstance(markup, str):
+            markup = json.loads(markup)
+        text = params.get("text", "")
+        self.replies[chat_id].put_nowait((message_id, text, markup))
+
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": FAKE_BOT_ID, "is_bot": True, "first_name": "FakeQuizBot"},
+            "text": text
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": dict(self.calls),
+            "flood_responses": self.flood_responses,
+            "pending_updates": len(self._updates)
+        }
+
+class SimulatedUser:
+    """Quiz participant that reacts to bot replies through the fake server"""
+
+    def __init__(self, server: FakeTelegramServer, recorder: LatencyRecorder, user_id: int, think: float, timeout: float):
+        self.server = server
+        self.recorder = recorder
+        self.user = {"id": user_id, "is_bot": False, "first_name": "Soak"}
+        self.chat = {"id": user_id, "type": "private"}
+        self.think = think
+        self.timeout = timeout
+        self.message_id = 0
+        self.markup: Optional[Dict[str, Any]] = None
+        self._ids = 0
+
+    async def step(self, label: str, update: Dict[str, Any]) -> None:
+        """Push update and wait for the bot's reply"""
+        if self.think:
+            await asyncio.sleep(self.think)
+        started = time.perf_counter()
+        await self.server.push_update(update)
+        try:
+            self.message_id, _, self.markup = await asyncio.wait_for(
+                self.server.replies[self.user["id"]].get(), self.timeout
+            )
+        except asyncio.TimeoutError:
+            self.recorder.error(label)
+            raise
+        self.recorder.record(label, time.perf_counter() - started)
+
+    def message(self, text: str) -> Dict[str, Any]:
+        self._ids += 1
+        message = {"message_id": self._ids, "date": int(time.time()), "chat": self.chat, "from": self.user, "text": text}
+        if text.startswith("/"):
+            message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+        return {"message": message}
+
+    def callback(self, data: str) -> Dict[str, Any]:
+        self._ids += 1
+        return {"callback_query": {
+            "id": f"{self.user['id']}-{self._ids}",
+            "from": self.user,
+            "chat_instance": str(self.user["id"]),
+            "data": data,
+            "message": {
+                "message_id": self.message_id,
+                "date": int(time.time()),
+                "chat": self.chat,
+                "from": {"id": FAKE_BOT_ID, "is_bot": True, "first_name": "FakeQuizBot"},
+                "text": "…"
+            }
+        }}
+
+    def buttons(self, prefix: str) -> List[str]:
+        if not self.markup:
+            return []
+        return [
+            button["callback_data"]
+            for row in self.markup.get("inline_keyboard", [])
+            for button in row
+            if button.get("callback_data", "").startswith(prefix)
+        ]
+
+    async def run(self, test_id: str) -> None:
+        await self.step("/start", self.message("/start"))
+        await self.step("name", self.message("Соак Тест"))
+        await self.step("select_test", self.callback("select_test"))
+        await self.step("start_test", self.callback(f"start_test:{test_id}"))
+        while True:
+            answers = self.buttons("answer:")
+            if answers:
+                await self.step("answer", self.callback(random.choice(answers)))
+            elif self.buttons("next_question"):
+                await self.step("next_question", self.callback("next_question"))
+            else:
+                break
+
+async def soak(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the polling bot against the fake server with simulated users"""
+    from app.bot.bot import main as bot_main
+    from app.bot.outbound import outbound
+    from app.core.config import settings
+
+    server = FakeTelegramServer(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        flood_probability=args.flood_probability,
+        global_limit=args.global_limit,
+        chat_limit=args.chat_limit,
+        retry_after=args.retry_after
+    )
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+
+    test_id = await create_quiz_test(f"http://127.0.0.1:{settings.api_port}", settings.admin_api_key, args.questions)
+
+    bot_task = asyncio.create_task(bot_main())
+    await asyncio.wait_for(server.polling_started.wait(), 30)
+
+    recorder = LatencyRecorder()
+    base_user_id = random.randint(1_000_000_000, 2_000_000_000)
+    users = [
+        SimulatedUser(server, recorder, base_user_id + i, args.think_ms / 1000, args.step_timeout)
+        for i in range(args.users)
+    ]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(user.run(test_id) for user in users), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+
+    outbound_stats = outbound.stats()
+    bot_task.cancel()
+    await asyncio.gather(bot_task, return_exceptions=True)
+    await runner.cleanup()
+
+    summary = recorder.summary()
+    steps = sum(row["count"] for row in summary.values())
+    return {
+        "users": args.users,
+        "questions": args.questions,
+        "latency_ms": args.latency_ms,
+        "flood_probability": args.flood_probability,
+        "failed_users": sum(1 for result in results if isinstance(result, Exception)),
+        "elapsed_s": round(elapsed, 3),
+        "steps": steps,
+        "steps_per_s": round(steps / elapsed, 1) if elapsed else 0.0,
+        "server": server.stats(),
+        "outbound": outbound_stats,
+        "steps_latency": summary
+    }
+
+async def serve(args: argparse.Namespace) -> None:
+    server = FakeTelegramServer(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        flood_probability=args.flood_probability,
+        global_limit=args.global_limit,
+        chat_limit=args.chat_limit,
+        retry_after=args.retry_after
+    )
+    runner = web.AppRunner(server.app)
+    await runner.setup()
+    await web.TCPSite(runner, args.host, args.port).start()
+    print(f"Fake Bot API on http://{args.host}:{args.port} (token {FAKE_TOKEN})")
+    await asyncio.Event().wait()
+
+def main() -> None:
+    args = parse_args()
+    if not args.users:
+        asyncio.run(serve(args))
+        return
+
+    # The in-process bot polls the fake server
+    os.environ["BOT_TOKEN"] = FAKE_TOKEN
+    os.environ["TELEGRAM_API_SERVER"] = f"http://{args.host}:{args.port}"
+
+    from app.core.config import settings
+    if not args.external_api:
+        start_api_in_thread("127.0.0.1", settings.api_port)
+
+    report = asyncio.run(soak(args))
+
+    print(f"{report['steps']} steps in {report['elapsed_s']}s: {report['steps_per_s']} steps/s, "
+          f"{report['failed_users']} failed users, {report['server']['flood_responses']} flood responses")
+    print_summary(report["steps_latency"])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
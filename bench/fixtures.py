@@ -0,0 +1,75 @@
+"""Shared setup for load tools: in-process API and synthetic quiz data"""
+
+import threading
+import time
+import urllib.request
+import uuid
+from typing import Any, Dict, List
+
+import aiohttp
+
+def make_questions(prefix: str, count: int, options: int = 4) -> List[Dict[str, Any]]:
+    """Questions in the import format with one correct option each"""
+    questions = []
+    for q in range(count):
+        question_id = f"{prefix}Q{q}"
+        questions.append({
+            "ID вопроса": question_id,
+            "Формулировка вопроса": f"Вопрос {q}",
+            "Текст вопроса": f"Текст синтетического вопроса {q}",
+            "Ответы": [
+                {
+                    "ID ответа": f"{question_id}O{o}",
+                    "Текст ответа": f"Вариант {o}",
+                    "Правильный-неправильный ответ": o == 0,
+                    "Комментарий к ответу": f"Комментарий к варианту {o}"
+                }
+                for o in range(options)
+            ]
+        })
+    return questions
+
+async def create_quiz_test(api_base: str, admin_key: str, questions: int, options: int = 4) -> str:
+    """Create a test with synthetic questions through the admin API"""
+    prefix = f"LOAD{uuid.uuid4().hex[:8]}"
+    headers = {"X-API-Key": admin_key}
+    async with aiohttp.ClientSession() as session:
+        async with session.post(
+            f"{api_base}/admin/tests",
+            json={"name": f"Load {prefix}", "description": "synthetic load test"},
+            headers=headers
+        ) as response:
+            response.raise_for_status()
+            test_id = (await response.json())["id"]
+
+        async with session.post(
+            f"{api_base}/admin/tests/{test_id}/questions/import",
+            json=make_questions(prefix, questions, options),
+            headers=headers
+        ) as response:
+            response.raise_for_status()
+    return test_id
+
+def start_api_in_thread(host: str, port: int, timeout: float = 10.0) -> None:
+    """Run the FastAPI app with uvicorn in a daemon thread and wait until it answers"""
+    import uvicorn
+    from app.api.main import app
+
+    thread = threading.Thread(
+        target=uvicorn.run,
+        args=(app,),
+        kwargs={"host": host, "port": port, "log_level": "error"},
+        daemon=True
+    )
+    thread.start()
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(f"http://{host}:{port}/") as response:
+                if response.status == 200:
+                    return
+        except Exception:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"API did not start on {host}:{port}")
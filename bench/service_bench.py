@@ -0,0 +1,254 @@
+"""Microbenchmarks of the quiz services over the storage backends
+
+Times QuizService.start_session, get_next_question, submit_answer,
+finish_session, UserService.get_user_stats and QuestionService.import_questions
+against InMemoryStorage and PostgreSQLStorage at several data sizes. The
+PostgreSQL storage runs either on DATABASE_URL (use a dedicated database: the
+run seeds users and sessions into it) or on a temporary SQLite file as an
+embedded stand-in.
+
+    python -m bench.service_bench --backends memory,sqlite --save bench/baselines/services.json
+    python -m bench.service_bench --backends memory,sqlite --check bench/baselines/services.json --threshold 0.25
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Tuple
+
+from .fixtures import make_questions
+from .stats import percentile
+
+DB_BACKENDS = ("sqlite", "postgres")
+SEED_USERS = 100
+# Operations timed fewer times than this are reported but not gated by --check
+MIN_CHECK_SAMPLES = 5
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark services against storage backends")
+    parser.add_argument("--backends", default="memory,sqlite", help="Comma-separated: memory, sqlite, postgres")
+    parser.add_argument("--questions", default="10,1000,10000", help="Comma-separated questions per test")
+    parser.add_argument("--sessions", default="100,100000", help="Comma-separated finished sessions seeded")
+    parser.add_argument("--repeat", type=int, default=100, help="Timed quiz flows per case")
+    parser.add_argument("--import-repeat", type=int, default=MIN_CHECK_SAMPLES,
+                        help="Timed question imports per case, each into a fresh test")
+    parser.add_argument("--no-storage-cache", action="store_true", help="Disable PostgreSQLStorage caches")
+    parser.add_argument("--save", help="Write results as a baseline to this file")
+    parser.add_argument("--check", help="Compare p50 against this baseline and fail on regressions")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed p50 slowdown, 0.25 = 25%%")
+    return parser.parse_args()
+
+def parse_sizes(value: str) -> List[int]:
+    return [int(size) for size in value.split(",") if size]
+
+class Timings:
+    """Samples in seconds per operation"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+
+    def measure(self, op: str, call: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = call()
+        self.samples.setdefault(op, []).append(time.perf_counter() - started)
+        return result
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for op, values in sorted(self.samples.items()):
+            values = sorted(values)
+            result[op] = {
+                "count": len(values),
+                "mean_us": round(sum(values) / len(values) * 1e6, 1),
+                "p50_us": round(percentile(values, 50) * 1e6, 1),
+                "p95_us": round(percentile(values, 95) * 1e6, 1)
+            }
+        return result
+
+def seed_memory_sessions(storage, test_id: str, users: List[int], sessions: int) -> None:
+    from app.core.storage import QuizSession
+
+    for user_id in users:
+        storage.create_or_update_user(user_id, "Bench", str(user_id))
+    now = datetime.now()
+    for i in range(sessions):
+        session = QuizSession(
+            id=str(uuid.uuid4()),
+            user_id=users[i % len(users)],
+            test_id=test_id,
+            started_at=now,
+            finished_at=now,
+            current_question_index=10,
+            correct_count=random.randint(0, 10),
+            total_count=10
+        )
+        storage.quiz_sessions[session.id] = session
+
+def seed_db_sessions(storage, test_id: str, users: List[int], sessions: int) -> None:
+    from sqlalchemy import insert
+    from app.core.database import QuizSession as DBQuizSession
+
+    for user_id in users:
+        storage.create_or_update_user(user_id, "Bench", str(user_id))
+    now = datetime.now()
+    db = storage.get_db()
+    try:
+        for start in range(0, sessions, 5000):
+            db.execute(insert(DBQuizSession), [
+                {
+                    "id": str(uuid.uuid4()),
+                    "user_telegram_id": users[i % len(users)],
+                    "test_id": test_id,
+                    "started_at": now,
+                    "finished_at": now,
+                    "question_order": "[]",
+                    "current_question_index": 10,
+                    "correct_count": random.randint(0, 10),
+                    "total_count": 10
+                }
+                for i in range(start, min(start + 5000, sessions))
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+def run_case(backend: str, questions: int, sessions: int, repeat: int,
+             import_repeat: int) -> Dict[str, Dict[str, float]]:
+    """Seed one backend and time the service calls"""
+    from app.core import services
+    from app.core.models import AnswerRequest, QuestionInput, SessionStartRequest
+
+    if backend == "memory":
+        from app.core.storage import InMemoryStorage
+        storage = InMemoryStorage()
+        seed_sessions = seed_memory_sessions
+    else:
+        from app.core.db_storage import PostgreSQLStorage
+        storage = PostgreSQLStorage()
+        seed_sessions = seed_db_sessions
+    # Services resolve the module-level storage on every call
+    services.storage = storage
+
+    timings = Timings()
+
+    def import_test():
+        prefix = f"B{uuid.uuid4().hex[:8]}"
+        test = services.TestService.create_test(f"Bench {prefix}", "microbenchmark")
+        data = [QuestionInput(**question) for question in make_questions(prefix, questions)]
+        result = timings.measure("QuestionService.import_questions", lambda: services.QuestionService.import_questions(data, test.id))
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+        return test
+
+    # Question IDs are unique across tests, so every import gets a fresh test
+    test = import_test()
+    for _ in range(import_repeat - 1):
+        import_test()
+
+    base_user_id = random.randint(1_000_000_000, 2_000_000_000)
+    users = [base_user_id + i for i in range(SEED_USERS)]
+    seed_sessions(storage, test.id, users, sessions)
+
+    for i in range(repeat):
+        user_id = users[i % len(users)]
+        started = timings.measure(
+            "QuizService.start_session",
+            lambda: services.QuizService.start_session(SessionStartRequest(telegram_id=user_id, test_id=test.id))
+        )
+        session_id = started["session_id"]
+        question = timings.measure("QuizService.get_next_question", lambda: services.QuizService.get_next_question(session_id))
+        option_id = random.choice(question["options"])["id"]
+        timings.measure(
+            "QuizService.submit_answer",
+            lambda: services.QuizService.submit_answer(session_id, AnswerRequest(option_id=option_id))
+        )
+        timings.measure("QuizService.finish_session", lambda: services.QuizService.finish_session(session_id))
+        timings.measure("UserService.get_user_stats", lambda: services.UserService.get_user_stats(user_id))
+
+    if backend != "memory":
+        storage.clear_caches()
+    return timings.summary()
+
+def flatten(results: Dict[str, Dict[str, Dict[str, float]]]) -> Dict[str, float]:
+    """case/op -> p50 in microseconds"""
+    return {
+        f"{case}/{op}": row["p50_us"]
+        for case, ops in results.items()
+        for op, row in ops.items()
+    }
+
+def check_regressions(results, baseline, threshold: float) -> List[Tuple[str, float, float]]:
+    """Operations whose p50 grew by more than threshold
+
+    A p50 of a handful of samples is noise, so operations timed fewer than
+    MIN_CHECK_SAMPLES times are not compared.
+    """
+    current = flatten(results)
+    previous = flatten(baseline["results"])
+    counts = {
+        f"{case}/{op}": row["count"]
+        for case, ops in results.items()
+        for op, row in ops.items()
+    }
+    return [
+        (key, previous[key], value)
+        for key, value in sorted(current.items())
+        if key in previous and counts[key] >= MIN_CHECK_SAMPLES and value > previous[key] * (1 + threshold)
+    ]
+
+def main() -> None:
+    args = parse_args()
+    backends = [backend for backend in args.backends.split(",") if backend]
+    db_backends = [backend for backend in backends if backend in DB_BACKENDS]
+    if len(db_backends) > 1:
+        sys.exit("The database engine is bound at import: run sqlite and postgres in separate invocations")
+
+    # Bench processes never talk to other processes through the bus
+    os.environ["CACHE_INVALIDATION_ENABLED"] = "false"
+    if args.no_storage_cache:
+        os.environ["STORAGE_CACHE_ENABLED"] = "false"
+    if "sqlite" in db_backends:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+    elif "postgres" in db_backends and not os.getenv("DATABASE_URL"):
+        sys.exit("DATABASE_URL is required for the postgres backend")
+
+    if db_backends:
+        from app.core.database import create_tables
+        create_tables()
+
+    results = {}
+    for backend in backends:
+        for questions in parse_sizes(args.questions):
+            for sessions in parse_sizes(args.sessions):
+                case = f"{backend}/q={questions}/s={sessions}"
+                print(f"Running {case}...", file=sys.stderr)
+                results[case] = run_case(backend, questions, sessions, args.repeat, args.import_repeat)
+
+    print(f"{'case':<28}{'operation':<36}{'p50 us':>12}{'p95 us':>12}{'mean us':>12}")
+    for case, ops in results.items():
+        for op, row in ops.items():
+            print(f"{case:<28}{op:<36}{row['p50_us']:>12}{row['p95_us']:>12}{row['mean_us']:>12}")
+
+    if args.save:
+        os.makedirs(os.path.dirname(args.save) or ".", exist_ok=True)
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"repeat": args.repeat, "results": results}, f, indent=2, sort_keys=True)
+
+    if args.check:
+        with open(args.check, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = check_regressions(results, baseline, args.threshold)
+        for key, old, new in regressions:
+            print(f"REGRESSION {key}: p50 {old} -> {new} us", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No p50 regressions above {args.threshold:.0%}")
+
+if __name__ == "__main__":
+    main()
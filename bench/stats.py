@@ -0,0 +1,52 @@
+"""Latency recording and percentile reports"""
+
+from collections import defaultdict
+from typing import Any, Dict, List
+
+def percentile(sorted_values: List[float], percent: float) -> float:
+    """Nearest-rank percentile of already sorted values"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(percent / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+class LatencyRecorder:
+    """Collects latency samples and error counts per label"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    def record(self, label: str, seconds: float) -> None:
+        self.samples[label].append(seconds)
+
+    def error(self, label: str) -> None:
+        self.errors[label] += 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """Count, error rate and latency percentiles in milliseconds per label"""
+        result = {}
+        for label in sorted(set(self.samples) | set(self.errors)):
+            values = sorted(self.samples.get(label, []))
+            errors = self.errors.get(label, 0)
+            total = len(values) + errors
+            result[label] = {
+                "count": total,
+                "errors": errors,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "mean_ms": round(sum(values) / len(values) * 1000, 2) if values else 0.0,
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+                "max_ms": round(values[-1] * 1000, 2) if values else 0.0
+            }
+        return result
+
+def print_summary(summary: Dict[str, Dict[str, Any]]) -> None:
+    """Print per-label latency table"""
+    print(f"{'label':<24}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for label, row in summary.items():
+        print(
+            f"{label:<24}{row['count']:>8}{row['errors']:>8}"
+            f"{row['p50_ms']:>10}{row['p95_ms']:>10}{row['p99_ms']:>10}{row['max_ms']:>10}"
+        )
@@ -21,7 +21,9 @@ def run_api():
         "app.api.main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=False
+        workers=settings.api_workers,
+        reload=False,
+        access_log=False  # AccessLogMiddleware writes the access log
     )
 
 def run_bot():
@@ -13,5 +13,7 @@ if __name__ == "__main__":
         "app.api.main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=False
+        workers=settings.api_workers,
+        reload=False,
+        access_log=False  # AccessLogMiddleware writes the access log
     )
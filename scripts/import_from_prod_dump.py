@@ -8,7 +8,7 @@
 import argparse
 import json
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set
 
 from dotenv import load_dotenv
 
@@ -28,6 +28,14 @@ from app.core.database import (
 def ensure_tables() -> None:
     Base.metadata.create_all(bind=engine)
 
+def existing_ids(db, model, ids: List[str]) -> Set[str]:
+    """ID из списка, уже присутствующие в таблице"""
+    found: Set[str] = set()
+    for start in range(0, len(ids), 1000):
+        chunk = ids[start:start + 1000]
+        found.update(row[0] for row in db.query(model.id).filter(model.id.in_(chunk)))
+    return found
+
 def import_from_dump(file_path: str) -> None:
     with open(file_path, "r", encoding="utf-8") as f:
         data = json.load(f)
@@ -38,10 +46,10 @@ def import_from_dump(file_path: str) -> None:
 
     db = SessionLocal()
     try:
-        # Импорт тестов
+        # Импорт тестов (существующие ID одним запросом на таблицу)
+        existing = existing_ids(db, DBTest, [t["id"] for t in tests])
         for t in tests:
-            exists = db.query(DBTest).filter(DBTest.id == t["id"]).first()
-            if not exists:
+            if t["id"] not in existing:
                 db.add(DBTest(
                     id=t["id"],
                     name=t["name"],
@@ -51,9 +59,9 @@ def import_from_dump(file_path: str) -> None:
         db.commit()
 
         # Импорт вопросов
+        existing = existing_ids(db, DBQuestion, [q["id"] for q in questions])
         for q in questions:
-            exists = db.query(DBQuestion).filter(DBQuestion.id == q["id"]).first()
-            if not exists:
+            if q["id"] not in existing:
                 db.add(DBQuestion(
                     id=q["id"],
                     test_id=q["test_id"],
@@ -64,9 +72,9 @@ def import_from_dump(file_path: str) -> None:
         db.commit()
 
         # Импорт ответов
+        existing = existing_ids(db, DBAnswerOption, [a["id"] for a in answer_options])
         for a in answer_options:
-            exists = db.query(DBAnswerOption).filter(DBAnswerOption.id == a["id"]).first()
-            if not exists:
+            if a["id"] not in existing:
                 db.add(DBAnswerOption(
                     id=a["id"],
                     question_id=a["question_id"],
@@ -0,0 +1,78 @@
+import os
+import threading
+import uuid
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL is not set")
+
+SESSIONS = 20
+
+
+def question(question_id):
+    return {
+        "ID вопроса": question_id,
+        "Формулировка вопроса": "Вопрос",
+        "Текст вопроса": "Текст",
+        "Ответы": [
+            {
+                "ID ответа": f"{question_id}-{i}",
+                "Текст ответа": f"Ответ {i}",
+                "Правильный-неправильный ответ": i == 0,
+                "Комментарий к ответу": "",
+            }
+            for i in range(2)
+        ],
+    }
+
+
+def test_racing_finishes_record_one_attempt():
+    from app.core.database import LeaderboardEntry, ScoreHistogram, SessionLocal, create_tables
+    from app.core.db_storage import storage
+    from app.core.invalidation import bus
+    from app.core.models import QuestionInput
+
+    create_tables()
+    prefix = uuid.uuid4().hex[:8]
+    test_id = f"race-{prefix}"
+    storage.create_test(test_id, f"Race {prefix}")
+    storage.add_question(QuestionInput(**question(f"RACE{prefix}")), test_id)
+
+    finished_events = []
+
+    def on_finished(key, version):
+        if key == test_id:
+            finished_events.append(version)
+
+    bus.subscribe("quiz_finished", on_finished)
+
+    base_user_id = 700_000_000 + uuid.uuid4().int % 100_000_000
+    session_ids = []
+    for i in range(SESSIONS):
+        storage.create_or_update_user(base_user_id + i, "Race", str(i))
+        session_ids.append(storage.create_quiz_session(base_user_id + i, test_id).id)
+
+    # Two finishes of every session race each other
+    start = threading.Barrier(2 * SESSIONS)
+
+    def finish(session_id):
+        start.wait()
+        storage.finish_quiz_session(session_id)
+
+    threads = [threading.Thread(target=finish, args=(session_id,)) for session_id in session_ids for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    db = SessionLocal()
+    try:
+        histogram_total = sum(
+            sessions for sessions, in db.query(ScoreHistogram.sessions).filter(ScoreHistogram.test_id == test_id)
+        )
+        entries = db.query(LeaderboardEntry).filter(LeaderboardEntry.test_id == test_id).count()
+    finally:
+        db.close()
+    assert histogram_total == SESSIONS
+    assert entries == SESSIONS
+    assert len(finished_events) == SESSIONS
@@ -0,0 +1,152 @@
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+API_PORT = 5002
+API_BASE = f"http://127.0.0.1:{API_PORT}"
+FAKE_TELEGRAM_PORT = 5003
+BOT_TOKEN = "123456:TEST-multiworker"
+
+pytestmark = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL is not set")
+
+# chat_id -> number of sendMessage calls
+sent_messages = {}
+sent_lock = threading.Lock()
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    """Answers every Bot API method with a minimal successful result"""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        method = self.path.rsplit("/", 1)[-1]
+        fields = self._parse_fields(body)
+        chat_id = int(fields.get("chat_id", 0) or 0)
+
+        if method == "sendMessage":
+            with sent_lock:
+                sent_messages[chat_id] = sent_messages.get(chat_id, 0) + 1
+
+        result = True
+        if method in ("sendMessage", "editMessageText"):
+            result = {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private"},
+                "text": fields.get("text", ""),
+            }
+        payload = json.dumps({"ok": True, "result": result}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _parse_fields(self, body):
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.startswith("application/json"):
+            return json.loads(body or b"{}")
+        message = BytesParser().parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+        if not message.is_multipart():
+            return {}
+        return {
+            part.get_param("name", header="content-disposition"): part.get_payload(decode=True).decode()
+            for part in message.get_payload()
+        }
+
+    def log_message(self, *args):
+        pass
+
+
+def message_update(update_id, user_id, text):
+    update = {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": int(time.time()),
+            "chat": {"id": user_id, "type": "private"},
+            "from": {"id": user_id, "is_bot": False, "first_name": "Worker"},
+            "text": text,
+        },
+    }
+    if text.startswith("/"):
+        update["message"]["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text)}]
+    return update
+
+
+def setup_module(module):
+    module.telegram = ThreadingHTTPServer(("127.0.0.1", FAKE_TELEGRAM_PORT), FakeTelegramHandler)
+    threading.Thread(target=module.telegram.serve_forever, daemon=True).start()
+
+    env = dict(
+        os.environ,
+        API_PORT=str(API_PORT),
+        API_WORKERS="2",
+        BOT_WEBHOOK_ENABLED="true",
+        BOT_TOKEN=BOT_TOKEN,
+        TELEGRAM_API_SERVER=f"http://127.0.0.1:{FAKE_TELEGRAM_PORT}",
+    )
+    subprocess.run([sys.executable, "init_db.py"], env=env, check=True)
+    module.server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.api.main:app",
+         "--host", "127.0.0.1", "--port", str(API_PORT), "--workers", "2", "--log-level", "error"],
+        env=env,
+    )
+    for _ in range(300):
+        if module.server.poll() is not None:
+            raise RuntimeError(f"API exited with code {module.server.returncode}")
+        try:
+            if requests.get(f"{API_BASE}/ready").status_code == 200:
+                break
+        except Exception:
+            pass
+        time.sleep(0.1)
+    else:
+        module.server.terminate()
+        raise RuntimeError("API is not ready after 30 s")
+
+
+def teardown_module(module):
+    module.server.terminate()
+    module.server.wait(timeout=15)
+    module.telegram.shutdown()
+
+
+def test_registration_across_workers():
+    base_update_id = int(time.time() * 1000) % 1_000_000_000
+    users = [900_000_000 + (uuid.uuid4().int % 100_000_000) for _ in range(20)]
+
+    # /start leaves each user in waiting_for_name; the name reply may land on another worker
+    for i, user_id in enumerate(users):
+        update = message_update(base_update_id + i, user_id, "/start")
+        assert requests.post(f"{API_BASE}/webhook", json=update).json()["ok"] is True
+        # Redelivery of the same update must be skipped
+        assert requests.post(f"{API_BASE}/webhook", json=update).json()["ok"] is True
+
+    time.sleep(2)
+
+    for i, user_id in enumerate(users):
+        update = message_update(base_update_id + len(users) + i, user_id, "Multi Worker")
+        assert requests.post(f"{API_BASE}/webhook", json=update).json()["ok"] is True
+
+    deadline = time.time() + 20
+    pending = set(users)
+    while pending and time.time() < deadline:
+        for user_id in list(pending):
+            if requests.get(f"{API_BASE}/public/users/{user_id}/stats").status_code == 200:
+                pending.discard(user_id)
+        time.sleep(0.2)
+
+    assert not pending, f"Users not registered: {sorted(pending)}"
+    # Welcome and registration messages only: duplicates were dropped
+    with sent_lock:
+        assert all(sent_messages.get(user_id) == 2 for user_id in users), sent_messages
@@ -0,0 +1,168 @@
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+import pytest
+import requests
+
+API_PORT = 5004
+API_BASE = f"http://127.0.0.1:{API_PORT}"
+ADMIN_HEADERS = {"X-API-Key": os.getenv("ADMIN_API_KEY", "admin_secret_key_123")}
+
+pytestmark = pytest.mark.skipif(not os.getenv("DATABASE_URL"), reason="DATABASE_URL is not set")
+
+
+def assert_max_queries(response, limit):
+    """N+1 guard: the API reports queries issued for the request in X-DB-Queries"""
+    assert response.status_code == 200, response.text
+    count = int(response.headers["X-DB-Queries"])
+    assert count <= limit, f"{response.request.method} {response.request.path_url}: {count} queries > {limit}"
+
+
+def question(question_id, correct=0):
+    return {
+        "ID вопроса": question_id,
+        "Формулировка вопроса": "Вопрос",
+        "Текст вопроса": "Текст",
+        "Ответы": [
+            {
+                "ID ответа": f"{question_id}-{i}",
+                "Текст ответа": f"Ответ {i}",
+                "Правильный-неправильный ответ": i == correct,
+                "Комментарий к ответу": "",
+            }
+            for i in range(3)
+        ],
+    }
+
+
+def setup_module(module):
+    # Storage caches off so every request reaches the database
+    env = dict(os.environ, API_PORT=str(API_PORT), STORAGE_CACHE_ENABLED="false")
+    subprocess.run([sys.executable, "init_db.py"], env=env, check=True)
+    module.server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.api.main:app",
+         "--host", "127.0.0.1", "--port", str(API_PORT), "--log-level", "error"],
+        env=env,
+    )
+    for _ in range(100):
+        try:
+            if requests.get(f"{API_BASE}/").status_code == 200:
+                break
+        except Exception:
+            pass
+        time.sleep(0.1)
+
+    # Several tests with several questions each, so per-test queries would show up
+    prefix = uuid.uuid4().hex[:8]
+    module.test_ids = []
+    for t in range(5):
+        test = requests.post(f"{API_BASE}/admin/tests", json={"name": f"QC {prefix} {t}"}, headers=ADMIN_HEADERS).json()
+        requests.post(
+            f"{API_BASE}/admin/tests/{test['id']}/questions/import",
+            json=[question(f"QC{prefix}-{t}-{q}") for q in range(4)],
+            headers=ADMIN_HEADERS,
+        ).raise_for_status()
+        module.test_ids.append(test["id"])
+
+
+def teardown_module(module):
+    module.server.terminate()
+    module.server.wait(timeout=15)
+
+
+def test_test_lists_are_constant_queries():
+    assert_max_queries(requests.get(f"{API_BASE}/public/tests"), 2)
+    assert_max_queries(requests.get(f"{API_BASE}/admin/tests", headers=ADMIN_HEADERS), 2)
+
+
+def test_quiz_flow_query_budget():
+    telegram_id = 800_000_000 + uuid.uuid4().int % 100_000_000
+    assert_max_queries(requests.post(f"{API_BASE}/public/users/register", json={
+        "telegram_id": telegram_id, "first_name": "Query", "last_name": "Count"
+    }), 4)
+
+    response = requests.post(f"{API_BASE}/public/sessions/start", json={
+        "telegram_id": telegram_id, "test_id": test_ids[0]
+    })
+    assert_max_queries(response, 6)
+    session_id = response.json()["session_id"]
+
+    response = requests.get(f"{API_BASE}/public/sessions/{session_id}/next")
+    assert_max_queries(response, 3)
+    option_id = response.json()["options"][0]["id"]
+
+    # Includes the two analytics counter upserts
+    assert_max_queries(requests.post(f"{API_BASE}/public/sessions/{session_id}/answer", json={"option_id": option_id}), 10)
+    # Includes the leaderboard and histogram upserts, their NOTIFY and the histogram read
+    response = requests.post(f"{API_BASE}/public/sessions/{session_id}/finish")
+    assert_max_queries(response, 8)
+    assert "percentile" in response.json()
+    # User, finished sessions and the histogram (storage caches are off)
+    response = requests.get(f"{API_BASE}/public/users/{telegram_id}/stats")
+    assert_max_queries(response, 3)
+    assert "last_score_percentile" in response.json()
+
+
+def test_question_pages_are_constant_queries():
+    seen = []
+    cursor = None
+    while True:
+        params = {"test_id": test_ids[1], "limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = requests.get(f"{API_BASE}/admin/questions", params=params, headers=ADMIN_HEADERS)
+        assert_max_queries(response, 2)  # page + options of the page
+        page = response.json()
+        seen.extend(q["id"] for q in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert len(seen) == 4 and seen == sorted(seen)
+
+    streamed = requests.get(f"{API_BASE}/admin/questions", params={"test_id": test_ids[1]}, headers=ADMIN_HEADERS).json()
+    assert [q["id"] for q in streamed] == seen
+
+
+def test_question_analytics_are_constant_queries():
+    telegram_id = 800_000_000 + uuid.uuid4().int % 100_000_000
+    requests.post(f"{API_BASE}/public/users/register", json={
+        "telegram_id": telegram_id, "first_name": "Analytics", "last_name": "Count"
+    }).raise_for_status()
+    session_id = requests.post(f"{API_BASE}/public/sessions/start", json={
+        "telegram_id": telegram_id, "test_id": test_ids[2]
+    }).json()["session_id"]
+    question = requests.get(f"{API_BASE}/public/sessions/{session_id}/next").json()
+    option_id = question["options"][0]["id"]
+    requests.post(f"{API_BASE}/public/sessions/{session_id}/answer", json={"option_id": option_id}).raise_for_status()
+
+    response = requests.get(f"{API_BASE}/admin/tests/{test_ids[2]}/analytics", headers=ADMIN_HEADERS)
+    assert_max_queries(response, 4)  # test, questions with options, two counter tables
+    answered = {q["question_id"]: q for q in response.json()}[question["question_id"]]
+    assert answered["attempts"] >= 1
+    assert {o["option_id"]: o["choices"] for o in answered["options"]}[option_id] >= 1
+
+
+def test_leaderboard_reads_are_constant_queries():
+    telegram_id = 800_000_000 + uuid.uuid4().int % 100_000_000
+    requests.post(f"{API_BASE}/public/users/register", json={
+        "telegram_id": telegram_id, "first_name": "Leader", "last_name": "Board"
+    }).raise_for_status()
+    session_id = requests.post(f"{API_BASE}/public/sessions/start", json={
+        "telegram_id": telegram_id, "test_id": test_ids[3]
+    }).json()["session_id"]
+    for _ in range(4):
+        question = requests.get(f"{API_BASE}/public/sessions/{session_id}/next").json()
+        requests.post(f"{API_BASE}/public/sessions/{session_id}/answer", json={
+            "option_id": question["options"][0]["id"]
+        }).raise_for_status()
+    requests.post(f"{API_BASE}/public/sessions/{session_id}/finish").raise_for_status()
+
+    url = f"{API_BASE}/public/tests/{test_ids[3]}/leaderboard"
+    board = requests.get(url, params={"telegram_id": telegram_id}).json()
+    assert board["me"]["rank"] >= 1
+    assert board["me"]["full_name"] == "Leader Board"
+    # Storage caches are off, so the top is read from the ranking index: test lookup and one range scan
+    assert_max_queries(requests.get(url, params={"limit": 5}), 2)